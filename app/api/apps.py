@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    name = "api"
+
+    def ready(self):
+        # Keep the Elasticsearch outbox in step with MutualFund changes
+        from api import signals  # noqa: F401
@@ -0,0 +1,198 @@
+# api/benchmarks/fake_upstream.py
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ISIN_PREFIX = "INFBENCH"
+SCHEME_CODE_BASE = 9_000_000
+
+
+def bench_isin(index):
+    return f"{ISIN_PREFIX}{index:06d}"
+
+
+def business_days(start, end):
+    """
+    Weekdays from `start` to `end` inclusive, oldest first.
+    """
+    days = []
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+class FakeUpstream:
+    """
+    Local stand-in for api.mfapi.in, mf.captnemo.in (kuvera) and the AMFI NAVAll
+    file, serving deterministic synthetic data for `funds` schemes with `years`
+    of daily NAV history each.
+
+        /mf                 scheme list
+        /mf/<code>          NAV history, newest first (DD-MM-YYYY dates)
+        /kuvera/<isin>      kuvera metadata
+        /NAVAll.txt         all-schemes NAV file for the day after the last history date
+
+    `latency` (seconds) is added to every response to mimic network round trips.
+    """
+
+    def __init__(self, funds, years, latency=0.0, end_date=None):
+        self.funds = funds
+        self.latency = latency
+        self.end_date = end_date or date.today() - timedelta(days=1)
+        self.dates = business_days(self.end_date - timedelta(days=int(365 * years)), self.end_date)
+        self.navall_date = self.end_date + timedelta(days=1)
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def scheme_code(self, index):
+        return SCHEME_CODE_BASE + index
+
+    def _navs(self, index):
+        # Deterministic random walk per fund
+        rng = random.Random(index)
+        nav = rng.uniform(10, 100)
+        navs = []
+        for _ in self.dates:
+            nav *= 1 + rng.gauss(0.0004, 0.01)
+            navs.append(round(nav, 4))
+        return navs
+
+    def nav_history_payload(self, index):
+        with self._lock:
+            payload = self._payloads.get(index)
+        if payload is None:
+            data = [
+                {"date": d.strftime("%d-%m-%Y"), "nav": f"{nav:.5f}"}
+                for d, nav in zip(reversed(self.dates), reversed(self._navs(index)))
+            ]
+            payload = json.dumps(
+                {
+                    "meta": {
+                        "scheme_code": self.scheme_code(index),
+                        "scheme_name": f"Bench Fund {index} - Direct Growth",
+                        "isin_growth": bench_isin(index),
+                    },
+                    "data": data,
+                    "status": "SUCCESS",
+                }
+            ).encode()
+            with self._lock:
+                self._payloads[index] = payload
+        return payload
+
+    def scheme_list_payload(self):
+        return json.dumps(
+            [
+                {
+                    "schemeCode": self.scheme_code(i),
+                    "schemeName": f"Bench Fund {i} - Direct Growth",
+                    "isinGrowth": bench_isin(i),
+                    "isinDivReinvestment": None,
+                }
+                for i in range(self.funds)
+            ]
+        ).encode()
+
+    def kuvera_payload(self, index):
+        rng = random.Random(index)
+        return json.dumps(
+            [
+                {
+                    "name": f"Bench Fund {index} Direct Growth",
+                    "slug": f"bench-fund-{index}-direct-growth",
+                    "start_date": self.dates[0].isoformat(),
+                    "expense_ratio": f"{rng.uniform(0.1, 2.0):.2f}",
+                    "expense_ratio_date": self.end_date.isoformat(),
+                    "aum": round(rng.uniform(100, 50000), 2),
+                    "fund_type": rng.choice(["Equity", "Debt", "Hybrid"]),
+                    "fund_category": "Bench Category",
+                }
+            ]
+        ).encode()
+
+    def navall_payload(self):
+        lines = [
+            "Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date",
+            "",
+            "Open Ended Schemes(Equity Scheme - Bench)",
+            "",
+            "Bench Mutual Fund",
+            "",
+        ]
+        navall_date = self.navall_date.strftime("%d-%b-%Y")
+        for i in range(self.funds):
+            last_nav = self._navs(i)[-1]
+            lines.append(
+                f"{self.scheme_code(i)};{bench_isin(i)};-;Bench Fund {i} - Direct Growth;"
+                f"{last_nav * 1.001:.4f};{navall_date}"
+            )
+        return ("\n".join(lines) + "\n").encode()
+
+    def _fund_index(self, code_or_isin):
+        try:
+            if code_or_isin.startswith(ISIN_PREFIX):
+                index = int(code_or_isin[len(ISIN_PREFIX):])
+            else:
+                index = int(code_or_isin) - SCHEME_CODE_BASE
+        except ValueError:
+            return None
+        return index if 0 <= index < self.funds else None
+
+    def route(self, path):
+        """
+        Return (status, content_type, body) for a request path.
+        """
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if parts == ["mf"]:
+            return 200, "application/json", self.scheme_list_payload()
+        if parts == ["NAVAll.txt"]:
+            return 200, "text/plain", self.navall_payload()
+        if len(parts) == 2 and parts[0] in ("mf", "kuvera"):
+            index = self._fund_index(parts[1])
+            if index is None:
+                return 404, "application/json", b'{"error": "Not found"}'
+            if parts[0] == "mf":
+                return 200, "application/json", self.nav_history_payload(index)
+            return 200, "application/json", self.kuvera_payload(index)
+        return 404, "application/json", b'{"error": "Not found"}'
+
+    def start(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if upstream.latency:
+                    time.sleep(upstream.latency)
+                status, content_type, body = upstream.route(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
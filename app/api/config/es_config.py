@@ -4,10 +4,6 @@ NAV_INDEX_MAPPING = {
         "properties": {
             "isin": {"type": "keyword"},
             "last_updated_date": {"type": "date"},
-            "history": {
-                "type": "nested",  # Use 'nested' to query array objects independently
-                "properties": {"date": {"type": "date"}, "nav": {"type": "float"}},
-            },
             "returns": {
                 "type": "object",
                 "properties": {
@@ -23,6 +19,26 @@ NAV_INDEX_MAPPING = {
     }
 }
 
+# One document per (isin, date), id "<isin>:<date>", routed by ISIN so a fund's
+# points live on one shard. Replaces the nested `history` array of NAV_INDEX_NAME.
+NAV_POINTS_INDEX_NAME = "fund_nav_points"
+NAV_POINTS_INDEX_MAPPING = {
+    "settings": {
+        "index": {
+            "sort.field": ["isin", "date"],
+            "sort.order": ["asc", "asc"],
+        }
+    },
+    "mappings": {
+        "_routing": {"required": True},
+        "properties": {
+            "isin": {"type": "keyword"},
+            "date": {"type": "date"},
+            "nav": {"type": "float"},
+        },
+    },
+}
+
 MUTUALFUND_INDEX_NAME = "mutualfund_list"
 MUTUALFUND_INDEX_MAPPING = {
     "mappings": {
@@ -48,6 +64,24 @@ MUTUALFUND_INDEX_MAPPING = {
                     "xirr_all": {"type": "float"},
                 },
             },
+            # Written by sync_historical_data_es (api/utils/risk_metrics.py)
+            "risk_metrics": {
+                "type": "object",
+                "properties": {
+                    "volatility": {"type": "float"},
+                    "downside_deviation": {"type": "float"},
+                    "annualised_return": {"type": "float"},
+                    "sharpe_ratio": {"type": "float"},
+                    "sortino_ratio": {"type": "float"},
+                    "max_drawdown": {"type": "float"},
+                    "max_drawdown_peak_date": {"type": "date"},
+                    "max_drawdown_trough_date": {"type": "date"},
+                    "max_drawdown_recovery_date": {"type": "date"},
+                    "risk_free_rate": {"type": "float"},
+                    "period_start": {"type": "date"},
+                    "period_end": {"type": "date"},
+                },
+            },
         }
     }
 }
@@ -0,0 +1,188 @@
+import io
+import json
+import resource
+import time
+from datetime import date
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from elasticsearch import Elasticsearch
+from api.benchmarks.fake_upstream import FakeUpstream, bench_isin
+from api.models import MutualFund, FundHistoricalNAV
+from api.utils.es_indices import INDEX_DEFINITIONS, create_version, next_generation
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper that counts queries without keeping them in memory.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """
+    Runs the ingestion commands against a local fake mfapi/kuvera/AMFI server and
+    reports throughput per step. Everything is written to a throwaway test database
+    and, with --with-es, throwaway index versions (created and destroyed by this
+    command), so real fund data is never touched.
+    Run with: python manage.py benchmark_ingestion --funds 500 --years 10
+    """
+
+    help = "Benchmark NAV ingestion and ES sync commands against a local fake upstream."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--funds", type=int, default=200, help="Number of synthetic funds.")
+        parser.add_argument("--years", type=float, default=5, help="Years of daily NAV history per fund.")
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Artificial delay in seconds added to every fake upstream response.",
+        )
+        parser.add_argument("--workers", type=int, default=8, help="--workers passed to update_navs.")
+        parser.add_argument(
+            "--with-es",
+            action="store_true",
+            help=(
+                "Also run the Elasticsearch sync commands. They write into a new, unaliased "
+                "'<index>_v<N>' version of each index, which is deleted afterwards."
+            ),
+        )
+        parser.add_argument(
+            "--output",
+            default="ingestion_benchmark.json",
+            help="Path of the JSON results file.",
+        )
+
+    def handle(self, *args, **options):
+        funds = options["funds"]
+        upstream = FakeUpstream(funds, options["years"], latency=options["latency"]).start()
+        self.stdout.write(
+            f"Fake upstream on {upstream.base_url}: {funds} funds x {len(upstream.dates)} NAV days."
+        )
+
+        old_db_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        steps = []
+        try:
+            self._seed_funds(upstream)
+            with override_settings(
+                MFAPI_BASE_URL=upstream.base_url, KUVERA_BASE_URL=upstream.base_url
+            ):
+                steps.append(self._run_step("update_kuvera_names", funds))
+                steps.append(self._run_step("update_mf_details", funds))
+                steps.append(
+                    self._run_step(
+                        "update_navs", funds, label="update_navs (full history)",
+                        workers=options["workers"],
+                    )
+                )
+                steps.append(
+                    self._run_step(
+                        "update_navs", funds, label="update_navs --navall",
+                        navall=f"{upstream.base_url}/NAVAll.txt",
+                    )
+                )
+                if options["with_es"]:
+                    steps.extend(self._run_es_steps(funds))
+        finally:
+            connection.creation.destroy_test_db(old_db_name, verbosity=0)
+            upstream.stop()
+
+        results = {
+            "generated_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "parameters": {
+                "funds": funds,
+                "years": options["years"],
+                "nav_days": len(upstream.dates),
+                "latency": options["latency"],
+                "workers": options["workers"],
+                "with_es": options["with_es"],
+            },
+            "steps": steps,
+        }
+        with open(options["output"], "w") as fh:
+            json.dump(results, fh, indent=2)
+
+        for step in steps:
+            self.stdout.write(
+                f"{step['step']:<32} {step['seconds']:>8.2f}s {step['funds_per_sec']:>9.1f} funds/s "
+                f"{step['rows_per_sec']:>10.0f} rows/s {step['queries']:>8} queries "
+                f"{step['peak_rss_mb']:>8.1f} MB peak RSS"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _seed_funds(self, upstream):
+        MutualFund.objects.bulk_create(
+            [
+                MutualFund(
+                    mf_name=f"Bench Fund {i} - Direct Growth",
+                    mf_schema_code=upstream.scheme_code(i),
+                    start_date=date(2000, 1, 1),
+                    AUM=0,
+                    exit_load="0%",
+                    isin_growth=bench_isin(i),
+                )
+                for i in range(upstream.funds)
+            ],
+            batch_size=1000,
+        )
+
+    def _run_step(self, command, funds, label=None, **kwargs):
+        label = label or command
+        self.stdout.write(f"Running {label}...")
+        rows_before = FundHistoricalNAV.objects.count()
+        counter = QueryCounter()
+        output = io.StringIO()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            call_command(command, stdout=output, stderr=output, **kwargs)
+        seconds = time.perf_counter() - started
+        rows = FundHistoricalNAV.objects.count() - rows_before
+        # ru_maxrss is in KiB on Linux
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {
+            "step": label,
+            "seconds": round(seconds, 3),
+            "funds": funds,
+            "funds_per_sec": round(funds / seconds, 2) if seconds else None,
+            "rows": rows,
+            "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+            "queries": counter.count,
+            "peak_rss_mb": round(peak_rss_mb, 1),
+        }
+
+    def _run_es_steps(self, funds):
+        """
+        Time the sync commands against throwaway versioned indices, the way
+        rebuild_es_indices loads a new version, so the live aliases and the
+        documents behind them are never written to.
+        """
+        es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://localhost:9200")
+        es = Elasticsearch(es_host)
+        version = next_generation(es)
+        indices = []
+        try:
+            for name in INDEX_DEFINITIONS:
+                indices.append(create_version(es, name, version))
+            return [
+                self._run_step("sync_mutual_funds_data_es", funds, index_version=version),
+                self._run_step("sync_historical_data_es", funds, index_version=version),
+            ]
+        finally:
+            for index in indices:
+                try:
+                    es.indices.delete(index=index, ignore_unavailable=True)
+                except Exception as e:
+                    self.stderr.write(f"Could not delete benchmark index '{index}': {e}")
@@ -0,0 +1,168 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from elasticsearch import Elasticsearch
+from api.models import EsOutbox, MutualFund
+from api.utils.batching import iter_keyset_batches
+from api.utils.es_indices import running_rebuild, write_target
+from api.utils.response_cache import bump_catalogue_version
+from api.utils.es_sync import (
+    bulk_results,
+    mutual_fund_actions,
+    risk_metric_actions,
+    sync_nav_batch,
+)
+import time
+from api.config.es_config import (
+    NAV_INDEX_NAME,
+    NAV_POINTS_INDEX_NAME,
+    MUTUALFUND_INDEX_NAME,
+)
+
+
+class Command(BaseCommand):
+    """
+    Pushes the funds queued in the Elasticsearch outbox (by NAV ingestion and
+    MutualFund changes) to the fund and NAV indices, then removes them from the queue.
+    While rebuild_es_indices runs, the queue is kept for the version it is loading.
+    Run with: python manage.py drain_es_outbox
+    Use --watch SECONDS to keep draining as a worker.
+    """
+
+    help = "Sync only the funds that changed since the last drain to Elasticsearch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Outbox entries synced together.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Documents per Elasticsearch bulk request.",
+        )
+        parser.add_argument(
+            "--watch",
+            type=float,
+            default=None,
+            metavar="SECONDS",
+            help="Keep running, draining the outbox every SECONDS.",
+        )
+
+    def handle(self, *args, **options):
+        es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200")
+        es = Elasticsearch(es_host)
+        while True:
+            self._drain(es, options["batch_size"], options["chunk_size"])
+            if options["watch"] is None:
+                break
+            time.sleep(options["watch"])
+
+    def _drain(self, es, batch_size, chunk_size):
+        start_time = time.time()
+        # The write aliases still point at the version being replaced, so entries
+        # drained now would never reach the rebuilt one
+        rebuild = running_rebuild()
+        if rebuild is not None:
+            self.stdout.write(
+                f"Index rebuild #{rebuild.id} in progress; the outbox is left until it finishes."
+            )
+            return
+        fund_index = write_target(es, MUTUALFUND_INDEX_NAME)
+        nav_index = write_target(es, NAV_INDEX_NAME)
+        points_index = write_target(es, NAV_POINTS_INDEX_NAME)
+
+        # Entries queued after this point are left for the next drain
+        snapshot = timezone.now()
+        pending = EsOutbox.objects.filter(enqueued_at__lte=snapshot)
+        drained = failed = 0
+        for entries in iter_keyset_batches(pending, batch_size):
+            isins = {entry.isin for entry in entries}
+            revised_since = {
+                entry.isin: entry.revised_since for entry in entries if entry.revised_since
+            }
+            funds = list(
+                MutualFund.objects.filter(isin_growth__in=isins).select_related("returns_snapshot")
+            )
+
+            failed_isins = set()
+            for ok, item in bulk_results(
+                es,
+                mutual_fund_actions(funds, fund_index),
+                chunk_size,
+                self._report_error,
+            ):
+                if not ok:
+                    failed_isins.add(item["update"]["_id"])
+            nav_synced, nav_failed = sync_nav_batch(
+                es,
+                nav_index,
+                points_index,
+                funds,
+                chunk_size,
+                self._report_error,
+                revised_since=revised_since,
+            )
+            failed_isins |= nav_failed
+            for ok, item in bulk_results(
+                es,
+                risk_metric_actions(
+                    [f for f in funds if f.isin_growth in nav_synced], fund_index
+                ),
+                chunk_size,
+                self._report_error,
+            ):
+                if not ok:
+                    failed_isins.add(item["update"]["_id"])
+
+            removed = isins - {f.isin_growth for f in funds}
+            if removed:
+                failed_isins |= self._delete_documents(
+                    es, removed, fund_index, nav_index, points_index, chunk_size
+                )
+
+            done = isins - failed_isins
+            EsOutbox.objects.filter(isin__in=done, enqueued_at__lte=snapshot).delete()
+            drained += len(done)
+            failed += len(failed_isins)
+
+        if drained:
+            # Cached responses may have been built from the documents just replaced
+            bump_catalogue_version()
+        if drained or failed:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Drained {drained} ISINs from the ES outbox ({failed} failed, kept for retry) "
+                    f"in {time.time() - start_time:.1f}s."
+                )
+            )
+
+    def _delete_documents(self, es, isins, fund_index, nav_index, points_index, chunk_size):
+        """
+        Remove every document of funds that no longer exist. Returns the ISINs that failed.
+        """
+        actions = (
+            {"_op_type": "delete", "_index": index, "_id": isin}
+            for isin in isins
+            for index in (fund_index, nav_index)
+        )
+        failed = set()
+        for ok, item in bulk_results(es, actions, chunk_size):
+            # Deleting a document that was never indexed is fine
+            if not ok and item["delete"].get("status") != 404:
+                self._report_error(item["delete"])
+                failed.add(item["delete"]["_id"])
+        es.delete_by_query(
+            index=points_index,
+            query={"terms": {"isin": sorted(isins)}},
+            conflicts="proceed",
+        )
+        return failed
+
+    def _report_error(self, result):
+        self.stderr.write(
+            self.style.ERROR(f"Failed to sync {result.get('_id')}: {result.get('error')}")
+        )
@@ -0,0 +1,151 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan, streaming_bulk
+from api.models import MutualFund
+from api.utils.batching import iter_keyset_batches
+from api.utils.es_indices import write_target
+from api.utils.nav_points import nav_point_actions
+from api.utils.returns import load_nav_histories
+import time
+from api.config.es_config import NAV_INDEX_NAME, NAV_POINTS_INDEX_NAME
+
+DROP_HISTORY_SCRIPT = "ctx._source.remove('history')"
+
+
+class Command(BaseCommand):
+    """
+    Moves NAV history from the nested `history` array of the NAV index into the
+    time-series points index (one document per ISIN and date).
+    Run with: python manage.py migrate_nav_history_es
+    Use --from-db to rebuild the points from FundHistoricalNAV instead, and
+    --drop-history to strip the migrated arrays from the NAV index afterwards.
+    """
+
+    help = "Copy NAV history into the time-series NAV points index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from-db",
+            action="store_true",
+            help="Read the history from FundHistoricalNAV instead of the nested ES arrays.",
+        )
+        parser.add_argument(
+            "--drop-history",
+            action="store_true",
+            help="Remove the nested history array from every NAV index document that was migrated.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Points per Elasticsearch bulk request.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Funds whose history is read from the database together (with --from-db).",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200")
+        es = Elasticsearch(es_host)
+
+        if not es.indices.exists(index=NAV_POINTS_INDEX_NAME):
+            self.stderr.write(
+                self.style.ERROR(
+                    f"Index '{NAV_POINTS_INDEX_NAME}' does not exist. Run 'setup_es_indices' first."
+                )
+            )
+            return
+        points_index_name = write_target(es, NAV_POINTS_INDEX_NAME)
+
+        migrated_isins = set()
+        if options["from_db"]:
+            actions = self._actions_from_db(
+                options["batch_size"], points_index_name, migrated_isins
+            )
+        else:
+            actions = self._actions_from_es(es, points_index_name, migrated_isins)
+
+        written = failed = 0
+        for ok, item in streaming_bulk(
+            es, actions, chunk_size=options["chunk_size"], raise_on_error=False
+        ):
+            if ok:
+                written += 1
+                continue
+            failed += 1
+            migrated_isins.discard(item["index"]["_id"].split(":", 1)[0])
+            if failed <= 20:
+                self.stderr.write(
+                    self.style.ERROR(
+                        f"Failed to write point {item['index']['_id']}: {item['index'].get('error')}"
+                    )
+                )
+
+        self.stdout.write(
+            f"Wrote {written} NAV points for {len(migrated_isins)} ISINs, {failed} failed."
+        )
+
+        if options["drop_history"] and not options["from_db"]:
+            self._drop_history(es, migrated_isins, options["chunk_size"])
+
+        minutes, seconds = divmod(int(time.time() - start_time), 60)
+        self.stdout.write(
+            self.style.SUCCESS(f"NAV history migration completed in {minutes}m {seconds}s.")
+        )
+
+    def _actions_from_es(self, es, points_index_name, migrated_isins):
+        for doc in scan(
+            es,
+            index=NAV_INDEX_NAME,
+            query={
+                "query": {
+                    "nested": {
+                        "path": "history",
+                        "query": {"exists": {"field": "history.date"}},
+                        "ignore_unmapped": True,
+                    }
+                }
+            },
+            source_includes=["history"],
+            size=50,
+        ):
+            isin = doc["_id"]
+            history = doc["_source"].get("history") or []
+            migrated_isins.add(isin)
+            yield from nav_point_actions(
+                isin,
+                ((point["date"], point["nav"]) for point in history),
+                points_index_name,
+            )
+
+    def _actions_from_db(self, batch_size, points_index_name, migrated_isins):
+        funds = MutualFund.objects.filter(isin_growth__isnull=False)
+        for batch in iter_keyset_batches(funds, batch_size):
+            histories = load_nav_histories(f.isin_growth for f in batch)
+            for isin, rows in histories.items():
+                migrated_isins.add(isin)
+                yield from nav_point_actions(isin, rows, points_index_name)
+
+    def _drop_history(self, es, isins, chunk_size):
+        index_name = write_target(es, NAV_INDEX_NAME)
+        actions = (
+            {
+                "_op_type": "update",
+                "_index": index_name,
+                "_id": isin,
+                "script": {"source": DROP_HISTORY_SCRIPT, "lang": "painless"},
+            }
+            for isin in isins
+        )
+        dropped = 0
+        for ok, item in streaming_bulk(
+            es, actions, chunk_size=chunk_size, raise_on_error=False
+        ):
+            if ok:
+                dropped += 1
+        self.stdout.write(f"Removed the nested history array from {dropped} documents.")
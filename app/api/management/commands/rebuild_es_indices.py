@@ -0,0 +1,150 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from elasticsearch import Elasticsearch
+from api.models import JobRun
+from api.utils.es_indices import (
+    INDEX_DEFINITIONS,
+    REBUILD_JOB_NAME,
+    create_version,
+    drop_old_versions,
+    finish_bulk_load,
+    next_generation,
+    number_of_replicas,
+    swap_alias_actions,
+)
+from api.utils.job_runs import JobRunTracker
+import time
+
+
+class Command(BaseCommand):
+    """
+    Builds a new version of every Elasticsearch index from the database while the
+    current version keeps serving reads and incremental syncs, then moves the read
+    and write aliases to the new version in one atomic request.
+    Run with: python manage.py rebuild_es_indices
+    The run is recorded as a JobRun, and drain_es_outbox leaves the outbox alone
+    until it finishes: NAV writes, revisions, fund updates and deletions queued
+    while the new version loads are drained into it after the swap instead of
+    into the old version.
+    """
+
+    help = "Rebuild the Elasticsearch indices into a new version and swap aliases without downtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=1,
+            help="Number of previous index versions to keep for rollback.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Documents per Elasticsearch bulk request while loading.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Bulk threads used to load the fund index.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Swap even if a new index holds fewer documents than the live one.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Load the NAV indices with this many sync_historical_data_es worker processes.",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200")
+        es = Elasticsearch(es_host)
+
+        tracker = JobRunTracker.start(REBUILD_JOB_NAME)
+        try:
+            self._rebuild(es, options)
+        except BaseException as e:
+            tracker.finish(JobRun.STATUS_FAILED, error=repr(e))
+            raise
+        tracker.finish()
+
+        minutes, seconds = divmod(int(time.time() - start_time), 60)
+        self.stdout.write(
+            self.style.SUCCESS(f"Index rebuild completed in {minutes}m {seconds}s.")
+        )
+
+    def _rebuild(self, es, options):
+        version = next_generation(es)
+        replicas = {name: number_of_replicas(es, name) for name in INDEX_DEFINITIONS}
+        new_indices = {}
+        for name in INDEX_DEFINITIONS:
+            new_indices[name] = create_version(es, name, version, bulk_load=True)
+            self.stdout.write(f"Created '{new_indices[name]}' for bulk loading.")
+
+        try:
+            call_command(
+                "sync_mutual_funds_data_es",
+                index_version=version,
+                chunk_size=options["chunk_size"],
+                threads=options["threads"],
+                stdout=self.stdout,
+                stderr=self.stderr,
+            )
+            sync_options = {"index_version": version, "chunk_size": options["chunk_size"]}
+            if options["processes"]:
+                sync_options["processes"] = options["processes"]
+            call_command(
+                "sync_historical_data_es",
+                stdout=self.stdout,
+                stderr=self.stderr,
+                **sync_options,
+            )
+            for name, index in new_indices.items():
+                finish_bulk_load(es, index, replicas[name])
+            if not options["force"]:
+                self._check_counts(es, new_indices)
+        except BaseException:
+            self.stderr.write(
+                self.style.ERROR(
+                    f"Rebuild of version {version} failed; the live indices were not touched."
+                )
+            )
+            for index in new_indices.values():
+                es.indices.delete(index=index, ignore_unavailable=True)
+            raise
+
+        actions = []
+        for name, index in new_indices.items():
+            actions.extend(swap_alias_actions(es, name, index))
+        es.indices.update_aliases(actions=actions)
+        self.stdout.write(
+            self.style.SUCCESS(f"Aliases now point to version {version}.")
+        )
+
+        for name in INDEX_DEFINITIONS:
+            for index in drop_old_versions(es, name, options["keep"]):
+                self.stdout.write(f"Deleted old index '{index}'.")
+
+    def _check_counts(self, es, new_indices):
+        """
+        Refuse to swap when a rebuilt index has fewer documents than the live one,
+        which usually means part of the load failed.
+        """
+        for name, index in new_indices.items():
+            if not es.indices.exists(index=name):
+                continue
+            live_count = es.count(index=name)["count"]
+            new_count = es.count(index=index)["count"]
+            self.stdout.write(f"'{index}': {new_count} documents (live: {live_count}).")
+            if new_count < live_count:
+                raise CommandError(
+                    f"'{index}' has {new_count} documents but '{name}' has {live_count}. "
+                    "Use --force to swap anyway."
+                )
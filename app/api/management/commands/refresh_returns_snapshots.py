@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from api.models import MutualFund
+from api.utils.batching import iter_keyset_batches
+from api.utils.returns import refresh_returns_snapshots
+import time
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the FundReturnsSnapshot of every fund from its stored NAV history.
+    update_navs keeps snapshots current for the funds it touches; run this once to
+    backfill, or after changing how returns are calculated.
+    Run with: python manage.py refresh_returns_snapshots
+    """
+
+    help = "Recompute the precomputed returns of every fund."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Funds whose NAV histories are read and whose snapshots are written together.",
+        )
+        parser.add_argument(
+            "--stale-only",
+            action="store_true",
+            help="Only refresh funds whose snapshot is missing or older than their latest NAV.",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        funds = MutualFund.objects.filter(
+            isin_growth__isnull=False, latest_nav_date__isnull=False
+        ).only("id", "isin_growth", "latest_nav", "latest_nav_date")
+        if options["stale_only"]:
+            funds = funds.exclude(returns_snapshot__as_of_date=F("latest_nav_date"))
+
+        refreshed = 0
+        for batch in iter_keyset_batches(funds, options["batch_size"]):
+            refreshed += refresh_returns_snapshots(batch)
+
+        elapsed = time.time() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed returns of {refreshed} funds in {elapsed:.1f}s "
+                f"({refreshed / elapsed if elapsed else 0:.0f} funds/sec)."
+            )
+        )
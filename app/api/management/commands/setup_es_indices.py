@@ -2,12 +2,13 @@ from django.core.management.base import BaseCommand
 from django.conf import settings
 from elasticsearch import Elasticsearch
 
-# Import mappings for multiple indices
-from api.config.es_config import (
-    NAV_INDEX_NAME,
-    NAV_INDEX_MAPPING,
-    MUTUALFUND_INDEX_NAME,
-    MUTUALFUND_INDEX_MAPPING,
+from api.utils.es_indices import (
+    INDEX_DEFINITIONS,
+    create_version,
+    index_versions,
+    live_index,
+    swap_alias_actions,
+    versioned_name,
 )
 
 
@@ -15,7 +16,8 @@ class Command(BaseCommand):
     """
     Django management command to create or recreate multiple Elasticsearch indices.
     Run with: python manage.py setup_es_indices
-    Use --recreate to delete and recreate the indices.
+    Use --recreate to delete and recreate the indices (all data is lost; use
+    rebuild_es_indices to rebuild them without downtime).
     """
 
     help = "Creates or recreates Elasticsearch indices for NAV and MutualFund data."
@@ -43,28 +45,29 @@ class Command(BaseCommand):
             )
             return
 
-        # Define indices and their mappings
-        indices = [
-            {"name": NAV_INDEX_NAME, "mapping": NAV_INDEX_MAPPING},
-            {"name": MUTUALFUND_INDEX_NAME, "mapping": MUTUALFUND_INDEX_MAPPING},
-        ]
-
-        for index in indices:
-            index_name = index["name"]
-            index_mapping = index["mapping"]
-
+        for index_name in INDEX_DEFINITIONS:
             index_exists = es.indices.exists(index=index_name)
 
             if index_exists and options["recreate"]:
                 self.stdout.write(
                     self.style.WARNING(f"Recreating index: Deleting '{index_name}'...")
                 )
-                es.indices.delete(index=index_name)
+                legacy_index = live_index(es, index_name)
+                if legacy_index == index_name:
+                    es.indices.delete(index=index_name)
+                for version in index_versions(es, index_name):
+                    es.indices.delete(index=versioned_name(index_name, version))
                 index_exists = False
 
             if not index_exists:
-                self.stdout.write(f"Creating index '{index_name}'...")
-                es.indices.create(index=index_name, body=index_mapping)
+                version = max(index_versions(es, index_name), default=0) + 1
+                self.stdout.write(
+                    f"Creating index '{versioned_name(index_name, version)}' behind alias '{index_name}'..."
+                )
+                physical_index = create_version(es, index_name, version)
+                es.indices.update_aliases(
+                    actions=swap_alias_actions(es, index_name, physical_index)
+                )
                 self.stdout.write(
                     self.style.SUCCESS(f"Index '{index_name}' created successfully.")
                 )
@@ -1,192 +1,169 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from elasticsearch import Elasticsearch, NotFoundError
-from api.models import FundHistoricalNAV, MutualFund
+from elasticsearch import Elasticsearch
+from api.models import MutualFund, JobRun
+from api.utils.batching import iter_keyset_batches
+from api.utils.es_sync import bulk_results, risk_metric_actions, sync_nav_batch
+from api.utils.es_indices import add_index_version_argument, sync_target
+from api.utils.job_runs import JobRunTracker, describe_run
+from api.utils.sharding import (
+    add_shard_arguments,
+    launch_shard_workers,
+    shard_job_name,
+    shard_queryset,
+)
 import time
-from api.utils.xirr import xirr
-from datetime import date, timedelta
-from api.config.es_config import NAV_INDEX_NAME
+from api.config.es_config import (
+    MUTUALFUND_INDEX_NAME,
+    NAV_INDEX_NAME,
+    NAV_POINTS_INDEX_NAME,
+)
+
+BATCH_SIZE = 500
+CHUNK_SIZE = 200
+JOB_NAME = "sync_historical_data_es"
 
 
 class Command(BaseCommand):
     help = (
-        "Intelligently syncs historical NAV data to Elasticsearch, one ISIN at a time."
+        "Intelligently syncs historical NAV data to Elasticsearch in batches of ISINs."
     )
 
-    def _calculate_returns(self, history, mutual_fund_obj):
-        # ... (This helper function remains unchanged) ...
-        if (
-            not history
-            or not mutual_fund_obj.latest_nav
-            or not mutual_fund_obj.latest_nav_date
-        ):
-            return {}
-
-        history.sort(key=lambda x: x["date"])
-
-        latest_nav = float(mutual_fund_obj.latest_nav)
-        latest_nav_date = mutual_fund_obj.latest_nav_date
-
-        returns = {}
-        return_windows = [
-            ("xirr_6m", 182),
-            ("xirr_1y", 365),
-            ("xirr_3y", 1095),
-            ("xirr_5y", 1825),
-            ("xirr_10y", 3650),
-            ("xirr_all", None),
-        ]
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue the most recent unfinished run (or the one given by --run-id) from its last checkpoint.",
+        )
+        parser.add_argument(
+            "--run-id",
+            type=int,
+            default=None,
+            help="Show the progress of a previous run and exit (combine with --resume to continue it).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Funds read, looked up in ES and bulk-updated together.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Documents per Elasticsearch bulk request.",
+        )
+        parser.add_argument(
+            "--recompute-risk",
+            action="store_true",
+            help=(
+                "Recompute the risk metrics of every fund, not only of those with new records "
+                "(backfills fund documents indexed before risk metrics existed)."
+            ),
+        )
+        add_index_version_argument(parser)
+        add_shard_arguments(parser)
 
-        for key, days in return_windows:
-            start_record = None
-            if days is None:
-                if history:
-                    start_record = history[0]
+    def handle(self, *args, **options):
+        if options.get("run_id") is not None and not options.get("resume"):
+            run = JobRun.objects.filter(
+                id=options["run_id"], command__startswith=JOB_NAME
+            ).first()
+            if run is None:
+                self.stderr.write(f"No {JOB_NAME} run with id {options['run_id']}.")
             else:
-                d0 = latest_nav_date - timedelta(days=days)
-                for i in range(0, 31):
-                    day_try_str = (d0 + timedelta(days=i)).isoformat()
-                    record = next(
-                        (r for r in history if r["date"] == day_try_str), None
-                    )
-                    if record:
-                        start_record = record
-                        break
-
-            if not start_record:
-                returns[key] = None
-                continue
-
-            start_nav = float(start_record["nav"])
-            start_date = date.fromisoformat(start_record["date"])
-
-            try:
-                if key == "xirr_6m":
-                    if start_nav > 0:
-                        simple_return = ((latest_nav - start_nav) / start_nav) * 100
-                        returns[key] = round(simple_return, 2)
-                    else:
-                        returns[key] = None
-                else:
-                    values = [-start_nav, latest_nav]
-                    dates = [start_date, latest_nav_date]
-                    rate = xirr(cashflows=values, dates=dates)
-                    returns[key] = rate
-            except Exception:
-                returns[key] = None
-
-        return returns
+                self.stdout.write(describe_run(run))
+            return
+        if options.get("processes"):
+            failures = launch_shard_workers(
+                self, options["processes"], options, self.stdout, self.stderr
+            )
+            if failures:
+                raise CommandError(f"{failures} shard worker(s) failed.")
+            return
 
-    def handle(self, *args, **options):
         start_time = time.time()
         self.stdout.write("Starting intelligent NAV data sync with calculations...")
 
         es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200")
-        index_name = NAV_INDEX_NAME
         es = Elasticsearch(es_host)
-
-        if not es.indices.exists(index=index_name):
-            self.stderr.write(
-                self.style.ERROR(
-                    f"Index '{index_name}' does not exist. Run 'setup_es_index' first."
+        version = options.get("index_version")
+        index_name = sync_target(es, NAV_INDEX_NAME, version)
+        points_index_name = sync_target(es, NAV_POINTS_INDEX_NAME, version)
+        fund_index_name = sync_target(es, MUTUALFUND_INDEX_NAME, version)
+
+        for required_index in (index_name, points_index_name, fund_index_name):
+            if not es.indices.exists(index=required_index):
+                self.stderr.write(
+                    self.style.ERROR(
+                        f"Index '{required_index}' does not exist. Run 'setup_es_indices' first."
+                    )
                 )
+                return
+
+        shard = options.get("shard")
+        tracker = JobRunTracker.start(
+            shard_job_name(
+                JOB_NAME if version is None else f"{JOB_NAME}@v{version}", shard
+            ),
+            resume=options.get("resume"),
+            run_id=options.get("run_id"),
+        )
+        if tracker.resumed:
+            self.stdout.write(
+                f"Resuming run #{tracker.run.id} after fund id {tracker.run.last_processed_id}."
             )
-            return
-
-        # --- OPTIMIZATION: Fetch all funds into a dictionary for fast lookups ---
-        self.stdout.write("Fetching all MutualFund objects into memory...")
-        # Create a map of {isin: mutual_fund_object}
-        mutual_funds_map = {
-            mf.isin_growth: mf
-            for mf in MutualFund.objects.filter(isin_growth__isnull=False)
-        }
-        total_isins = len(mutual_funds_map)
-        self.stdout.write(f"Found {total_isins} unique ISINs to process.")
-        count = 0
-        # --- Loop over the in-memory dictionary keys ---
-        for i, isin in enumerate(mutual_funds_map.keys()):
-            # Get the fund object from the dictionary (no DB query)
-            mutual_fund_obj = mutual_funds_map[isin]
 
-            self.stdout.write(f"Processing {i+1}/{total_isins}: {isin}...")
-
-            existing_history = []
-            last_updated_date = None
-            try:
-                doc = es.get(index=index_name, id=isin)
-                last_updated_date = doc["_source"]["last_updated_date"]
-                existing_history = doc["_source"].get("history", [])
-            except NotFoundError:
-                pass
-
-            if last_updated_date:
-                records_to_sync = FundHistoricalNAV.objects.filter(
-                    isin_growth=isin, date__gt=last_updated_date
-                ).order_by("date")
-            else:
-                records_to_sync = FundHistoricalNAV.objects.filter(
-                    isin_growth=isin
-                ).order_by("date")
-
-            if not records_to_sync and last_updated_date:
-                self.stdout.write(self.style.WARNING(f"  -> No new records. Skipping."))
-                continue
-
-            new_history_items = [
-                {"date": rec.date.isoformat(), "nav": float(rec.nav)}
-                for rec in records_to_sync
-            ]
-            full_history = existing_history + new_history_items
-
-            if not full_history:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"  -> No historical data found for {isin}. Skipping."
-                    )
+        funds_queryset = shard_queryset(
+            MutualFund.objects.filter(isin_growth__isnull=False).select_related(
+                "returns_snapshot"
+            ),
+            shard,
+        )
+        processed = tracker.counts.get("processed", 0)
+        total_isins = processed + funds_queryset.filter(id__gt=tracker.load() or 0).count()
+        self.stdout.write(f"Found {total_isins} ISINs to process.")
+
+        try:
+            for funds in iter_keyset_batches(
+                funds_queryset, options["batch_size"], checkpoint=tracker
+            ):
+                synced, skipped, failed, risk_updated = self._sync_batch(
+                    es,
+                    index_name,
+                    points_index_name,
+                    fund_index_name,
+                    funds,
+                    options["chunk_size"],
+                    options.get("recompute_risk", False),
                 )
-                continue
-
-            calculated_returns = self._calculate_returns(full_history, mutual_fund_obj)
-            new_last_updated_date = full_history[-1]["date"]
-
-            script = {
-                "source": """
-                    if (ctx._source.history == null) { ctx._source.history = []; }
-                    ctx._source.history.addAll(params.new_history);
-                    ctx._source.last_updated_date = params.new_date;
-                    ctx._source.returns = params.new_returns;
-                """,
-                "lang": "painless",
-                "params": {
-                    "new_history": new_history_items,
-                    "new_date": new_last_updated_date,
-                    "new_returns": calculated_returns,
-                },
-            }
-
-            es.update(
-                index=index_name,
-                id=isin,
-                script=script,
-                upsert={
-                    "isin": isin,
-                    "last_updated_date": new_last_updated_date,
-                    "history": full_history,
-                    "returns": calculated_returns,
-                },
-            )
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"  -> Synced {len(new_history_items)} new records and updated returns for {isin}."
+                processed += len(funds)
+                tracker.add(
+                    processed=len(funds),
+                    synced=synced,
+                    skipped=skipped,
+                    failed=failed,
+                    risk_metrics_updated=risk_updated,
+                )
+                self.stdout.write(
+                    f"Processed {processed}/{total_isins}: {synced} synced, "
+                    f"{skipped} without new records, {failed} failed."
                 )
+        except BaseException as e:
+            tracker.finish(JobRun.STATUS_FAILED, error=repr(e))
+            self.stderr.write(
+                f"Run #{tracker.run.id} failed; continue it with --resume --run-id {tracker.run.id}."
             )
-            count += 1
+            raise
+        tracker.finish()
 
         end_time = time.time()
         minutes, seconds = divmod(int(end_time - start_time), 60)
         self.stdout.write(
             self.style.SUCCESS(
-                "Sync complete. A total of {} ISINs processed.".format(count)
+                "Sync complete. A total of {} ISINs processed.".format(
+                    tracker.counts.get("synced", 0)
+                )
             )
         )
         self.stdout.write(
@@ -194,3 +171,41 @@ class Command(BaseCommand):
                 f"Total time taken: {minutes} minutes and {seconds} seconds."
             )
         )
+
+    def _sync_batch(
+        self,
+        es,
+        index_name,
+        points_index_name,
+        fund_index_name,
+        funds,
+        chunk_size,
+        recompute_risk=False,
+    ):
+        """
+        Returns (synced, skipped, failed, risk_updated) counts for a batch of funds.
+        Risk metrics are recomputed for the funds that received new records, or
+        with `recompute_risk` for every fund whose NAVs did not fail to sync.
+        """
+        synced_isins, failed_isins = sync_nav_batch(
+            es, index_name, points_index_name, funds, chunk_size, self._report_error
+        )
+        skipped = sum(
+            1 for f in funds if f.isin_growth not in synced_isins | failed_isins
+        )
+        if recompute_risk:
+            risk_funds = [f for f in funds if f.isin_growth not in failed_isins]
+        else:
+            risk_funds = [f for f in funds if f.isin_growth in synced_isins]
+        risk_actions = risk_metric_actions(risk_funds, fund_index_name)
+        risk_updated = sum(
+            ok for ok, _ in bulk_results(es, risk_actions, chunk_size, self._report_error)
+        )
+        return len(synced_isins), skipped, len(failed_isins), risk_updated
+
+    def _report_error(self, result):
+        self.stderr.write(
+            self.style.ERROR(
+                f"  -> Failed to sync {result.get('_id')}: {result.get('error')}"
+            )
+        )
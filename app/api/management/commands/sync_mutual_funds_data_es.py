@@ -1,20 +1,49 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
 from api.models import MutualFund
-from api.serializers.mutual_fund_detail_serializer import MutualFundDetailSerializer
+from api.utils.batching import iter_keyset_batches
+from api.utils.es_indices import add_index_version_argument, sync_target
+from api.utils.es_sync import mutual_fund_actions
 import time
 from api.config.es_config import MUTUALFUND_INDEX_NAME
 
+# Funds read from the database (and whose histories are loaded together) per batch
+DB_BATCH_SIZE = 200
+# Failed items echoed to stderr; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
 
 class Command(BaseCommand):
     help = "Sync MutualFund data to Elasticsearch."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Documents per Elasticsearch bulk request.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=1,
+            help="Send bulk requests from this many threads (uses parallel_bulk when > 1).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DB_BATCH_SIZE,
+            help="Funds whose NAV histories are read from the database in one query.",
+        )
+        add_index_version_argument(parser)
+
     def handle(self, *args, **options):
         start_time = time.time()
         es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200")
-        index_name = MUTUALFUND_INDEX_NAME
         es = Elasticsearch(es_host)
+        index_name = sync_target(es, MUTUALFUND_INDEX_NAME, options.get("index_version"))
 
         if not es.indices.exists(index=index_name):
             self.stderr.write(
@@ -24,48 +53,45 @@ class Command(BaseCommand):
             )
             return
 
-        mutual_funds = MutualFund.objects.all()
-        for fund in mutual_funds:
-            # Use the serializer to calculate XIRRs
-            serializer = MutualFundDetailSerializer(fund)
-            returns_xirr = serializer.get_returns_xirr(fund, False)
-
-            # Prepare the document for Elasticsearch
-            doc = {
-                "isin": fund.isin_growth,
-                "mf_name": fund.mf_name,
-                "mf_schema_code": fund.mf_schema_code,
-                "start_date": fund.start_date.isoformat() if fund.start_date else None,
-                "aum": float(fund.AUM) if fund.AUM else None,
-                "exit_load": fund.exit_load,
-                "expense_ratio": fund.expense_ratio if fund.expense_ratio else None,
-                "type": fund.type,
-                "latest_nav": float(fund.latest_nav) if fund.latest_nav else None,
-                "latest_nav_date": fund.latest_nav_date.isoformat()
-                if fund.latest_nav_date
-                else None,
-                "returns": returns_xirr,  # Use the calculated XIRRs
-            }
+        actions = self._actions(index_name, options["batch_size"])
+        bulk_kwargs = {"chunk_size": options["chunk_size"], "raise_on_error": False}
+        if options["threads"] > 1:
+            results = parallel_bulk(
+                es, actions, thread_count=options["threads"], **bulk_kwargs
+            )
+        else:
+            results = streaming_bulk(es, actions, **bulk_kwargs)
 
-            try:
-                # Index the document in Elasticsearch (overwrite if exists)
-                es.index(index=index_name, id=fund.isin_growth, body=doc)
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"Synced MutualFund: {fund.mf_name} (ISIN: {fund.isin_growth})"
-                    )
-                )
-            except Exception as e:
+        synced = failed = 0
+        for ok, item in results:
+            if ok:
+                synced += 1
+                continue
+            failed += 1
+            if failed <= MAX_REPORTED_ERRORS:
+                result = item.get("update", item)
                 self.stderr.write(
                     self.style.ERROR(
-                        f"Failed to sync MutualFund: {fund.mf_name} (ISIN: {fund.isin_growth}). Error: {e}"
+                        f"Failed to sync MutualFund {result.get('_id')}: {result.get('error')}"
                     )
                 )
 
-        end_time = time.time()
-        minutes, seconds = divmod(int(end_time - start_time), 60)
+        elapsed = time.time() - start_time
+        minutes, seconds = divmod(int(elapsed), 60)
+        docs_per_sec = (synced + failed) / elapsed if elapsed else 0
+        summary = f"Synced {synced} funds, {failed} failed ({docs_per_sec:.1f} docs/sec)."
+        if failed:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
         self.stdout.write(
             self.style.SUCCESS(
                 f"Elasticsearch data sync completed in {minutes}m {seconds}s."
             )
         )
+
+    def _actions(self, index_name, batch_size):
+        for funds in iter_keyset_batches(
+            MutualFund.objects.select_related("returns_snapshot"), batch_size
+        ):
+            yield from mutual_fund_actions(funds, index_name)
@@ -1,8 +1,10 @@
 from time import time
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import models
 from api.models import MutualFund
-import requests
+from api.utils.http_client import get_http_client
+from api.utils.batching import FileCheckpoint, iter_keyset_batches
 
 BATCH_SIZE = 10
 
@@ -18,10 +20,19 @@ class Command(BaseCommand):
             action='store_true',
             help='Edit existing records where kuvera_name is not null or blank.'
         )
+        parser.add_argument(
+            '--checkpoint',
+            metavar='PATH',
+            default=None,
+            help='File used to remember the last processed fund id, so a crashed run resumes there.'
+        )
         
     def handle(self, *args, **kwargs):
         # Record the start time
         start_time = time()
+        http = get_http_client()
+        http.reset_stats()
+        kuvera_base_url = getattr(settings, "KUVERA_BASE_URL", "https://mf.captnemo.in")
         edit_mode = kwargs.get('edit', False)
         if edit_mode:
             # Query funds with non-null kuvera_name, excluding blank and "N/A" labels
@@ -43,20 +54,16 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f"Running in CREATE mode. Total funds to process: {total_funds}"))
         # Process funds in batches
         processed_count = 0
+        checkpoint = FileCheckpoint(kwargs['checkpoint']) if kwargs.get('checkpoint') else None
 
-        while True:
-            funds = funds_queryset[:BATCH_SIZE]
-            if not funds:
-                self.stdout.write(self.style.SUCCESS("No more funds to process!"))
-                break
-
+        for funds in iter_keyset_batches(funds_queryset, BATCH_SIZE, checkpoint=checkpoint):
             for fund in funds:
                 processed_count += 1
                 self.stdout.write(self.style.WARNING(f"Processing {processed_count}/{total_funds}"))
                 isin = fund.isin_growth
-                url = f"https://mf.captnemo.in/kuvera/{isin}"
+                url = f"{kuvera_base_url}/kuvera/{isin}"
                 try:
-                    resp = requests.get(url, timeout=8)
+                    resp = http.get(url, timeout=8)
                     if resp.status_code == 404:
                         self._mark_na(fund, isin, "404 Not Found")
                         continue
@@ -94,6 +101,8 @@ class Command(BaseCommand):
                 except Exception as e:
                     self.stderr.write(f"Error for ISIN {isin}: {e}")
 
+        self.stdout.write(self.style.SUCCESS("No more funds to process!"))
+
         # Record the end time
         end_time = time()
         elapsed_time = end_time - start_time
@@ -106,6 +115,7 @@ class Command(BaseCommand):
                 f"Script completed in {elapsed_minutes} minutes and {elapsed_seconds} seconds."
             )
         )
+        self.stdout.write(http.summary())
         
     def _mark_na(self, fund, isin, reason):
         # Mark kuvera_name as 'N/A' to skip on future runs
@@ -1,7 +1,10 @@
 import json
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from api.models import MutualFund
-import requests
+from api.utils.http_client import get_http_client
+from api.utils.batching import FileCheckpoint, iter_keyset_batches
+from api.utils.sharding import add_shard_arguments, launch_shard_workers, shard_queryset
 from time import time
 from datetime import datetime
 
@@ -47,37 +50,54 @@ class Command(BaseCommand):
         "Update start_date, expense_ratio (as JSON list), and aum for all MutualFunds."
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--checkpoint",
+            metavar="PATH",
+            default=None,
+            help="File used to remember the last processed fund id, so a crashed run resumes there.",
+        )
+        add_shard_arguments(parser)
+
     def handle(self, *args, **kwargs):
+        if kwargs.get("processes"):
+            failures = launch_shard_workers(
+                self, kwargs["processes"], kwargs, self.stdout, self.stderr
+            )
+            if failures:
+                raise CommandError(f"{failures} shard worker(s) failed.")
+            return
+
         # Record the start time
         start_time = time()
+        http = get_http_client()
+        http.reset_stats()
+        kuvera_base_url = getattr(settings, "KUVERA_BASE_URL", "https://mf.captnemo.in")
         exclude_isins = set()
-        updated_isins = set()
-        total_funds = MutualFund.objects.exclude(
+        funds_queryset = MutualFund.objects.exclude(
             isin_growth__exact=""
         ).exclude(
             kuvera_name__isnull=True
         ).exclude(
             kuvera_name__exact="N/A"
-        ).count()
+        )
+        funds_queryset = shard_queryset(funds_queryset, kwargs.get("shard"))
+        total_funds = funds_queryset.count()
+        checkpoint = None
+        if kwargs.get("checkpoint"):
+            checkpoint_path = kwargs["checkpoint"]
+            if kwargs.get("shard"):
+                # Each shard keeps its own position
+                checkpoint_path += ".shard{}-of-{}".format(*kwargs["shard"])
+            checkpoint = FileCheckpoint(checkpoint_path)
         
         self.stdout.write(self.style.WARNING(f"Total funds to process: {total_funds}"))
 
         processed_count = 0
         
-        while True:
-            funds = (
-                MutualFund.objects.exclude(isin_growth__in=exclude_isins)
-                .exclude(isin_growth__in=updated_isins)
-                .exclude(isin_growth__exact="")
-                .exclude(kuvera_name__isnull=True)
-                .exclude(kuvera_name__exact="N/A")[:BATCH_SIZE]
-            )
-            if not funds:
-                self.stdout.write(
-                    self.style.SUCCESS("All funds processed for metadata update!")
-                )
-                break
-
+        for funds in iter_keyset_batches(
+            funds_queryset, BATCH_SIZE, checkpoint=checkpoint
+        ):
             for fund in funds:
                 processed_count += 1
                 self.stdout.write(
@@ -85,9 +105,9 @@ class Command(BaseCommand):
                 )
                 
                 isin = fund.isin_growth
-                url = f"https://mf.captnemo.in/kuvera/{isin}"
+                url = f"{kuvera_base_url}/kuvera/{isin}"
                 try:
-                    resp = requests.get(url, timeout=8)
+                    resp = http.get(url, timeout=8)
                     if resp.status_code == 404:
                         self.stdout.write(
                             self.style.WARNING(f"ISIN {isin}: 404 Not found. Skipped.")
@@ -173,7 +193,6 @@ class Command(BaseCommand):
 
                     if updated_fields:
                         fund.save(update_fields=updated_fields)
-                        updated_isins.add(isin)
                         self.stdout.write(
                             self.style.SUCCESS(
                                 f"ISIN {isin}: Updated fields: {', '.join(updated_fields)}"
@@ -188,7 +207,9 @@ class Command(BaseCommand):
 
                 except Exception as e:
                     self.stderr.write(f"Error for ISIN {isin}: {e}")
-        
+
+        self.stdout.write(self.style.SUCCESS("All funds processed for metadata update!"))
+
         # Record the end time
         end_time = time()
         elapsed_time = end_time - start_time
@@ -203,6 +224,7 @@ class Command(BaseCommand):
                 f"Total processed: {processed_count}/{total_funds}"
             )
         )
+        self.stdout.write(http.summary())
         
         if exclude_isins:
             self.stdout.write(
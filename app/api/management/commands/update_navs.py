@@ -1,24 +1,145 @@
-from django.core.management.base import BaseCommand
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
 from django.utils import timezone
-from api.models import MutualFund, FundHistoricalNAV
-import requests
-from datetime import datetime, timedelta
-from django.db import models, IntegrityError
+from api.models import MutualFund, FundHistoricalNAV, JobRun
+from api.utils.concurrent_fetch import RateLimiter, fetch_in_order
+from api.utils.nav_writer import bulk_upsert_navs, upsert_navs_row_by_row
+from api.utils.returns import refresh_returns_snapshots
+from api.utils.mfapi import iter_nav_entries, parse_nav_date, parse_nav_value
+from api.utils.amfi import open_navall, iter_navall_rows
+from api.utils.http_client import get_http_client
+from api.utils.batching import iter_keyset_batches
+from api.utils.job_runs import JobRunTracker, describe_run
+from api.utils.sharding import (
+    add_shard_arguments,
+    launch_shard_workers,
+    shard_job_name,
+    shard_queryset,
+)
+from datetime import timedelta
+from decimal import Decimal
+from time import time
+from django.db import models
 
 BATCH_SIZE = 10
+NAVALL_FLUSH_SIZE = 5000
+# NAVs are stored with 4 decimal places
+NAV_PRECISION = Decimal("0.0001")
+JOB_NAME = "update_navs"
+NAVALL_JOB_NAME = "update_navs:navall"
 
 
 class Command(BaseCommand):
     help = "Updates NAV and stores historical NAVs in a separate table."
 
-    def handle(self, *args, **kwargs):
-        updated_total, failed_total, deleted_total = 0, 0, 0
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of NAV histories fetched concurrently (DB writes stay sequential).",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            default=None,
+            help="Maximum requests per second sent to the NAV API host.",
+        )
+        parser.add_argument(
+            "--no-bulk",
+            action="store_true",
+            help="Write historical NAVs one row at a time (old path, for comparison).",
+        )
+        parser.add_argument(
+            "--full-history",
+            action="store_true",
+            help=(
+                "Re-parse every NAV history in full, even when its payload is unchanged, and "
+                "overwrite NAVs that were revised upstream (backfills and reconciliation). "
+                "Changed payloads of funds already fetched once are always reconciled."
+            ),
+        )
+        parser.add_argument(
+            "--navall",
+            nargs="?",
+            const=getattr(
+                settings, "AMFI_NAVALL_URL", "https://www.amfiindia.com/spages/NAVAll.txt"
+            ),
+            default=None,
+            metavar="URL_OR_PATH",
+            help="Update latest NAVs from a single AMFI NAVAll file instead of one request per fund.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue the most recent unfinished run (or the one given by --run-id) from its last checkpoint.",
+        )
+        parser.add_argument(
+            "--run-id",
+            type=int,
+            default=None,
+            help="Show the progress of a previous run and exit (combine with --resume to continue it).",
+        )
+        add_shard_arguments(parser)
+
+    def handle(self, *args, **options):
+        start_time = time()
+        if options.get("run_id") is not None and not options.get("resume"):
+            self._show_run(options["run_id"])
+            return
+        if options.get("navall") and options.get("processes"):
+            # Every worker would download, parse and write the whole file
+            raise CommandError(
+                "--navall reads a single file; run it without --processes (use --shard to split it)."
+            )
+        if options.get("processes"):
+            failures = launch_shard_workers(
+                self, options["processes"], options, self.stdout, self.stderr
+            )
+            if failures:
+                raise CommandError(f"{failures} shard worker(s) failed.")
+            return
+
+        workers = max(1, options.get("workers") or 1)
+        self.rate_limiter = RateLimiter(options.get("rate_limit"))
+        self.base_url = getattr(settings, "MFAPI_BASE_URL", "https://api.mfapi.in")
+        self.full_history = options.get("full_history", False)
+        self.http = get_http_client()
+        self.http.reset_stats()
+        write_navs = upsert_navs_row_by_row if options.get("no_bulk") else bulk_upsert_navs
+
+        if options.get("navall"):
+            shard = options.get("shard")
+            tracker = JobRunTracker.start(shard_job_name(NAVALL_JOB_NAME, shard))
+            with self._tracked(tracker):
+                self._ingest_navall(options["navall"], write_navs, tracker, shard)
+            self.stdout.write(self.http.summary())
+            return
+
+        shard = options.get("shard")
+        tracker = JobRunTracker.start(
+            shard_job_name(JOB_NAME, shard),
+            resume=options.get("resume"),
+            run_id=options.get("run_id"),
+        )
+        if tracker.resumed:
+            self.stdout.write(
+                f"Resuming run #{tracker.run.id} after fund id {tracker.run.last_processed_id}."
+            )
+        else:
+            self.stdout.write(f"Started run #{tracker.run.id}.")
+
+        # Fetch enough funds per batch to keep every worker busy
+        batch_size = max(BATCH_SIZE, workers * 4)
         today_start = timezone.localtime(timezone.now()).replace(
             hour=0, minute=0, second=0, microsecond=0
         )
         ten_days_ago = timezone.localdate() - timedelta(days=10)
 
-        total_funds = (
+        funds_queryset = (
             MutualFund.objects.filter(isin_growth__isnull=False)
             .exclude(isin_growth="")
             .filter(
@@ -29,123 +150,290 @@ class Command(BaseCommand):
                 models.Q(latest_nav_date__gte=ten_days_ago)
                 | models.Q(latest_nav_date__isnull=True)
             )
-            .count()
         )
-        fund_counter = 0
+        funds_queryset = shard_queryset(funds_queryset, shard)
+        self.fund_counter = tracker.counts.get("processed", 0)
+        self.total_funds = self.fund_counter + funds_queryset.filter(
+            id__gt=tracker.load() or 0
+        ).count()
 
-        while True:
-            funds = (
-                MutualFund.objects.filter(isin_growth__isnull=False)
-                .exclude(isin_growth="")
-                .filter(
-                    models.Q(nav_last_updated__lt=today_start)
-                    | models.Q(nav_last_updated__isnull=True)
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            with self._tracked(tracker):
+                for funds in iter_keyset_batches(
+                    funds_queryset, batch_size, checkpoint=tracker
+                ):
+                    self._process_batch(funds, executor, write_navs, tracker)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        counts = tracker.counts
+        self.stdout.write(
+            f"All funds processed. {counts.get('updated', 0)} updated, "
+            f"{counts.get('unchanged', 0)} unchanged, {counts.get('failed', 0)} failed, "
+            f"{counts.get('deleted', 0)} deleted, {counts.get('rows_revised', 0)} NAVs revised."
+        )
+        elapsed = time() - start_time
+        minutes, seconds = divmod(int(elapsed), 60)
+        self.stdout.write(
+            f"Completed in {minutes}m {seconds}s with {workers} worker(s) "
+            f"({self.fund_counter / elapsed if elapsed else 0:.2f} funds/sec)."
+        )
+        self._write_throughput(tracker, options.get("no_bulk"))
+        self.stdout.write(self.http.summary())
+
+    def _process_batch(self, funds, executor, write_navs, tracker):
+        updated, unchanged, failed, deleted = 0, 0, 0, 0
+        nav_rows, revised_rows, updated_funds, changed_funds = [], [], [], []
+        # HTTP fetches overlap on the pool; results come back in order and
+        # are processed one fund at a time on this thread.
+        for fund, resp, error in fetch_in_order(
+            funds, self._fetch_nav_history, executor
+        ):
+            self.fund_counter += 1  # Increment for each fund processed
+            try:
+                if error is not None:
+                    raise error
+                outcome, new_rows, revised = self._process_fund(fund, resp)
+                if outcome == "deleted":
+                    deleted += 1
+                    continue
+                nav_rows.extend(new_rows)
+                revised_rows.extend(revised)
+                updated_funds.append(fund)
+                if outcome == "unchanged":
+                    unchanged += 1
+                else:
+                    updated += 1
+                    changed_funds.append(fund)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(
+                    f"Error updating {fund.mf_name} (ISIN: {fund.isin_growth}): {e}"
                 )
-                .filter(
-                    models.Q(latest_nav_date__gte=ten_days_ago)
-                    | models.Q(latest_nav_date__isnull=True)
-                )[:BATCH_SIZE]
+
+        # History goes in before the funds are marked as updated, so a crash
+        # in between only causes the batch to be fetched again.
+        write_started = time()
+        rows_written = write_navs(nav_rows)
+        rows_written += write_navs(revised_rows, update_existing=True)
+        tracker.add_time("write_seconds", time() - write_started)
+        MutualFund.objects.bulk_update(
+            updated_funds,
+            ["latest_nav", "latest_nav_date", "nav_last_updated", "nav_history_digest"],
+        )
+        self._refresh_returns(changed_funds, tracker)
+        tracker.add(
+            processed=len(funds),
+            updated=updated,
+            unchanged=unchanged,
+            failed=failed,
+            deleted=deleted,
+            rows_written=rows_written,
+            rows_revised=len(revised_rows),
+        )
+
+    def _refresh_returns(self, funds, tracker):
+        """
+        Recompute the returns snapshots of funds whose NAV history just changed.
+        """
+        started = time()
+        refreshed = refresh_returns_snapshots(funds)
+        tracker.add_time("returns_seconds", time() - started)
+        tracker.add(returns_refreshed=refreshed)
+
+    @contextmanager
+    def _tracked(self, tracker):
+        """
+        Mark the run completed on success, or failed (keeping its checkpoint) on error.
+        """
+        try:
+            yield
+        except BaseException as e:
+            tracker.finish(JobRun.STATUS_FAILED, error=repr(e))
+            self.stderr.write(
+                f"Run #{tracker.run.id} failed; continue it with --resume --run-id {tracker.run.id}."
             )
+            raise
+        tracker.finish()
 
-            if not funds:
-                self.stdout.write(
-                    f"All funds processed. {updated_total} updated, {failed_total} failed, {deleted_total} deleted."
-                )
-                break
-
-            updated, failed, deleted = 0, 0, 0
-            for fund in funds:
-                fund_counter += 1  # Increment for each fund processed
-                try:
-                    url = f"https://api.mfapi.in/mf/{fund.mf_schema_code}"
-                    resp = requests.get(url, timeout=12)
-                    if resp.status_code != 200:
-                        self.stderr.write(
-                            f"Failed to fetch NAV ({resp.status_code}) for {fund.mf_name} (ISIN: {fund.isin_growth}). Deleting fund."
-                        )
-                        fund.delete()
-                        deleted += 1
-                        continue
-
-                    data = resp.json()
-                    historical_nav = data.get("data", [])
-                    latest_nav_record = historical_nav[0]
-                    latest_nav_date_str = latest_nav_record.get("date")
-                    latest_nav_val_str = latest_nav_record.get("nav")
-
-                    # Parse latest NAV/date (from DD-MM-YYYY)
-                    nav_date = datetime.strptime(latest_nav_date_str, "%d-%m-%Y").date()
-                    nav = nav_val = float(latest_nav_val_str.replace(",", ""))
-                    last_updated = fund.nav_last_updated  # Can be None!
-
-                    # Store historical NAVs
-                    for entry in historical_nav:
-                        # entry: {'date': '24-07-2025', 'nav': '52.18300'}
-                        dt_str = entry.get("date")
-                        nav_str = entry.get("nav")
-                        if not (dt_str and nav_str):
-                            continue  # skip incomplete entries
-                        try:
-                            dt_obj = datetime.strptime(dt_str, "%d-%m-%Y").date()
-                            nav_val = float(
-                                nav_str.replace(",", "")
-                            )  # in case commas present
-                        except Exception:
-                            continue  # skip malformed data
-                        if last_updated and dt_obj <= last_updated.date():
-                            continue  # Already processed
-                        try:
-                            FundHistoricalNAV.objects.get_or_create(
-                                isin_growth=fund.isin_growth,
-                                date=dt_obj,
-                                defaults={"nav": nav_val},
-                            )
-                        except IntegrityError:
-                            # Already exists
-                            pass
-
-                    # Optionally save yesterday's NAV
-                    if (
-                        fund.latest_nav is not None
-                        and fund.latest_nav_date
-                        and nav_date
-                    ):
-                        latest_fund_date = fund.latest_nav_date
-                        if latest_fund_date < nav_date:
-                            FundHistoricalNAV.objects.get_or_create(
-                                isin_growth=fund.isin_growth,
-                                date=latest_fund_date,
-                                defaults={"nav": fund.latest_nav},
-                            )
-
-                    # Update or delete
-                    if nav and nav_date:
-                        fund.latest_nav = nav
-                        fund.latest_nav_date = nav_date
-                        fund.nav_last_updated = timezone.now()
-                        fund.save(
-                            update_fields=[
-                                "latest_nav",
-                                "latest_nav_date",
-                                "nav_last_updated",
-                            ]
-                        )
-                        updated += 1
-                        self.stdout.write(
-                            f"Fund {fund_counter}/{total_funds} Updated {fund.mf_name}: NAV={nav} Date={nav_date} ISIN={fund.isin_growth}"
-                        )
-                    else:
-                        fund.delete()
-                        self.stderr.write(
-                            f"Failed updating {fund.mf_name}: NAV={nav} Date={nav_date} ISIN={fund.isin_growth}"
-                        )
-                        deleted += 1
-                except Exception as e:
-                    failed += 1
-                    self.stderr.write(
-                        f"Error updating {fund.mf_name} (ISIN: {fund.isin_growth}): {e}"
-                    )
-
-            updated_total += updated
-            failed_total += failed
-            deleted_total += deleted
+    def _write_throughput(self, tracker, no_bulk=False):
+        rows_written = tracker.counts.get("rows_written", 0)
+        write_seconds = tracker.timings.get("write_seconds", 0)
+        self.stdout.write(
+            f"Wrote {rows_written} historical NAV rows in {write_seconds:.2f}s "
+            f"({rows_written / write_seconds if write_seconds else 0:.0f} rows/sec, "
+            f"{'row-by-row' if no_bulk else 'bulk'} writes)."
+        )
+
+    def _show_run(self, run_id):
+        run = JobRun.objects.filter(id=run_id, command__startswith=JOB_NAME).first()
+        if run is None:
+            self.stderr.write(f"No update_navs run with id {run_id}.")
+            return
+        self.stdout.write(describe_run(run))
+
+    def _ingest_navall(self, source, write_navs, tracker, shard=None):
+        """
+        Stream an all-schemes NAVAll file and update every matching fund in one pass.
+        Funds are matched by scheme code first, then by either ISIN on the row.
+        With `shard`, only the funds of that shard are updated.
+        """
+        self.stdout.write(f"Reading NAVAll data from {source}...")
+        by_code, by_isin = {}, {}
+        funds = MutualFund.objects.only(
+            "id", "mf_name", "mf_schema_code", "isin_growth", "latest_nav", "latest_nav_date"
+        )
+        for fund in shard_queryset(funds, shard):
+            by_code[fund.mf_schema_code] = fund
+            if fund.isin_growth:
+                by_isin[fund.isin_growth] = fund
+
+        rows_seen, matched, updated = 0, 0, 0
+        nav_rows, updated_funds = [], []
+
+        def flush():
+            write_started = time()
+            tracker.add(rows_written=write_navs(nav_rows))
+            tracker.add_time("write_seconds", time() - write_started)
+            MutualFund.objects.bulk_update(
+                updated_funds, ["latest_nav", "latest_nav_date", "nav_last_updated"]
+            )
+            self._refresh_returns(updated_funds, tracker)
+            nav_rows.clear()
+            updated_funds.clear()
+
+        now = timezone.now()
+        for row in iter_navall_rows(open_navall(source)):
+            rows_seen += 1
+            fund = by_code.get(row.scheme_code)
+            if fund is None:
+                fund = next((by_isin[i] for i in row.isins if i in by_isin), None)
+            if fund is None or not fund.isin_growth:
+                continue
+            matched += 1
+            if fund.latest_nav_date and row.nav_date <= fund.latest_nav_date:
+                continue  # Already up to date
+
+            # Keep the previous latest NAV in history, as the per-fund path does
+            if fund.latest_nav is not None and fund.latest_nav_date:
+                nav_rows.append((fund.isin_growth, fund.latest_nav_date, fund.latest_nav))
+            nav_rows.append((fund.isin_growth, row.nav_date, row.nav))
+            fund.latest_nav = row.nav
+            fund.latest_nav_date = row.nav_date
+            fund.nav_last_updated = now
+            updated_funds.append(fund)
+            updated += 1
+            if len(nav_rows) >= NAVALL_FLUSH_SIZE:
+                flush()
+        flush()
+
+        tracker.add(rows_read=rows_seen, matched=matched, updated=updated)
+        self.stdout.write(
+            f"NAVAll: {rows_seen} rows read, {matched} matched funds, {updated} updated."
+        )
+        self._write_throughput(tracker)
+
+    def _fetch_nav_history(self, fund):
+        """
+        Runs on a worker thread: network only, no DB access.
+        """
+        url = f"{self.base_url}/mf/{fund.mf_schema_code}"
+        self.rate_limiter.wait(url)
+        return self.http.get(url, timeout=12)
+
+    def _process_fund(self, fund, resp):
+        """
+        Parse the fetched NAV history for a fund and update its latest NAV in memory.
+
+        Returns (outcome, new_rows, revised_rows) where outcome is "updated",
+        "unchanged" or "deleted", and the rows are (isin, date, nav) tuples to insert
+        or to overwrite. The caller writes the rows and saves the fund.
+        """
+        if resp.status_code != 200:
+            self.stderr.write(
+                f"Failed to fetch NAV ({resp.status_code}) for {fund.mf_name} (ISIN: {fund.isin_growth}). Deleting fund."
+            )
+            fund.delete()
+            return "deleted", [], []
+
+        # Identical payload to last time: nothing new and nothing revised upstream
+        digest = hashlib.sha256(resp.content).hexdigest()
+        if digest == fund.nav_history_digest and not self.full_history:
+            fund.nav_last_updated = timezone.now()
+            self.stdout.write(
+                f"Fund {self.fund_counter}/{self.total_funds} Unchanged {fund.mf_name} ISIN={fund.isin_growth}"
+            )
+            return "unchanged", [], []
+
+        data = resp.json()
+        historical_nav = data.get("data", [])
+        latest_nav_record = historical_nav[0]
+        latest_nav_date_str = latest_nav_record.get("date")
+        latest_nav_val_str = latest_nav_record.get("nav")
+
+        # Parse latest NAV/date (from DD-MM-YYYY)
+        nav_date = parse_nav_date(latest_nav_date_str)
+        nav = parse_nav_value(latest_nav_val_str)
+        last_updated = fund.nav_last_updated  # Can be None!
+        # A payload that differs from a stored digest may revise past NAVs, so it
+        # is parsed in full and diffed against the DB. Funds without a digest yet
+        # stop at the last processed date.
+        reconcile = self.full_history or bool(fund.nav_history_digest)
+        since = None
+        if last_updated and not reconcile:
+            since = last_updated.date()
+
+        # Collect historical NAVs; the payload is newest-first, so parsing stops
+        # as soon as it reaches a date that was already processed.
+        rows = [
+            (fund.isin_growth, dt_obj, nav_val)
+            for dt_obj, nav_val in iter_nav_entries(historical_nav, since)
+        ]
+
+        # Optionally save yesterday's NAV
+        if fund.latest_nav is not None and fund.latest_nav_date and nav_date:
+            latest_fund_date = fund.latest_nav_date
+            if latest_fund_date < nav_date:
+                rows.append((fund.isin_growth, latest_fund_date, fund.latest_nav))
+
+        revised_rows = []
+        if reconcile:
+            rows, revised_rows = self._diff_against_stored(fund, rows)
+
+        # Update or delete
+        if nav and nav_date:
+            fund.latest_nav = nav
+            fund.latest_nav_date = nav_date
+            fund.nav_last_updated = timezone.now()
+            fund.nav_history_digest = digest
+            self.stdout.write(
+                f"Fund {self.fund_counter}/{self.total_funds} Updated {fund.mf_name}: NAV={nav} Date={nav_date} ISIN={fund.isin_growth}"
+            )
+            return "updated", rows, revised_rows
+
+        fund.delete()
+        self.stderr.write(
+            f"Failed updating {fund.mf_name}: NAV={nav} Date={nav_date} ISIN={fund.isin_growth}"
+        )
+        return "deleted", [], []
+
+    def _diff_against_stored(self, fund, rows):
+        """
+        Split fully parsed rows into dates missing from the DB and dates whose NAV
+        was revised upstream; rows that match the stored NAV are dropped.
+        """
+        stored = dict(
+            FundHistoricalNAV.objects.filter(isin_growth=fund.isin_growth).values_list(
+                "date", "nav"
+            )
+        )
+        new_rows, revised_rows = [], []
+        for row in rows:
+            stored_nav = stored.get(row[1])
+            if stored_nav is None:
+                new_rows.append(row)
+            elif Decimal(str(row[2])).quantize(NAV_PRECISION) != stored_nav:
+                revised_rows.append(row)
+        return new_rows, revised_rows
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 from api.models import MutualFund
+from api.utils.batching import FileCheckpoint, iter_keyset_batches
 
 BATCH_SIZE = 100
 
@@ -8,21 +9,24 @@ BATCH_SIZE = 100
 class Command(BaseCommand):
     help = "Update the slug field in the MutualFund model using the mf_name field."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--checkpoint",
+            metavar="PATH",
+            default=None,
+            help="File used to remember the last processed fund id, so a crashed run resumes there.",
+        )
+
     def handle(self, *args, **kwargs):
         query_set = MutualFund.objects.exclude(mf_name__isnull=True, mf_name__exact="")
         total_funds = query_set.count()
         self.stdout.write(self.style.WARNING(f"Total funds to process: {total_funds}"))
 
         processed_count = 0
+        checkpoint = FileCheckpoint(kwargs["checkpoint"]) if kwargs.get("checkpoint") else None
 
-        while True:
-            # Fetch funds with non-empty mf_name in batches
-            funds = query_set[:BATCH_SIZE]
-
-            if not funds:
-                self.stdout.write(self.style.SUCCESS("No more funds to process!"))
-                break
-
+        # Fetch funds with non-empty mf_name in batches
+        for funds in iter_keyset_batches(query_set, BATCH_SIZE, checkpoint=checkpoint):
             for fund in funds:
                 processed_count += 1
                 self.stdout.write(self.style.WARNING(f"Processing {processed_count}/{total_funds}"))
@@ -37,9 +41,7 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS(f"Updated slug for fund {fund.isin_growth}: {slug}")
                 )
-                
-            # Update the query_set to exclude already processed records    
-            query_set = query_set.exclude(id__in=[fund.id for fund in funds])
 
+        self.stdout.write(self.style.SUCCESS("No more funds to process!"))
 
         self.stdout.write(self.style.SUCCESS("Slug update completed!"))
\ No newline at end of file
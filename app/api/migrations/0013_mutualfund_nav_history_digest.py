@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0012_jobrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mutualfund",
+            name="nav_history_digest",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:11
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0013_mutualfund_nav_history_digest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EsOutbox",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("isin", models.CharField(max_length=20, unique=True)),
+                (
+                    "enqueued_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+        ),
+    ]
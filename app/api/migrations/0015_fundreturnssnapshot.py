@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0014_esoutbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FundReturnsSnapshot",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("as_of_date", models.DateField()),
+                ("xirr_6m", models.FloatField(blank=True, null=True)),
+                ("xirr_1y", models.FloatField(blank=True, null=True)),
+                ("xirr_3y", models.FloatField(blank=True, null=True)),
+                ("xirr_5y", models.FloatField(blank=True, null=True)),
+                ("xirr_10y", models.FloatField(blank=True, null=True)),
+                ("xirr_all", models.FloatField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "fund",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="returns_snapshot",
+                        to="api.mutualfund",
+                    ),
+                ),
+            ],
+        ),
+    ]
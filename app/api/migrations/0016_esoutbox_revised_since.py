@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0015_fundreturnssnapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="esoutbox",
+            name="revised_since",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
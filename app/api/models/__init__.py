@@ -5,3 +5,6 @@ from .fund_historical_nav import FundHistoricalNAV
 from .income_tax_slabs import IncomeTaxYear, IncomeTaxSlab
 from .equity_tax_rules import EquityTaxRates
 from .account import Account
+from .job_run import JobRun
+from .es_outbox import EsOutbox
+from .fund_returns_snapshot import FundReturnsSnapshot
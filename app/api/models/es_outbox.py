@@ -0,0 +1,20 @@
+from django.db import models
+from django.utils import timezone
+
+
+class EsOutbox(models.Model):
+    """
+    ISINs whose fund or NAV data changed since they were last pushed to
+    Elasticsearch. One row per ISIN; enqueueing again only moves enqueued_at.
+    Drained by the drain_es_outbox command.
+    """
+
+    id = models.AutoField(primary_key=True)
+    isin = models.CharField(max_length=20, unique=True)
+    enqueued_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # Earliest NAV date overwritten since the last drain; the drain re-sends the
+    # fund's points from here instead of only those after its last synced date
+    revised_since = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.isin} ({self.enqueued_at})"
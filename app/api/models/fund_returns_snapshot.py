@@ -0,0 +1,31 @@
+from django.db import models
+from api.models.mutual_fund import MutualFund
+
+
+class FundReturnsSnapshot(models.Model):
+    """
+    Every return window of a fund as of its latest NAV, recomputed in bulk
+    after NAV ingestion so readers do not have to touch the NAV history.
+    """
+
+    WINDOW_FIELDS = ["xirr_6m", "xirr_1y", "xirr_3y", "xirr_5y", "xirr_10y", "xirr_all"]
+
+    id = models.AutoField(primary_key=True)
+    fund = models.OneToOneField(
+        MutualFund, on_delete=models.CASCADE, related_name="returns_snapshot"
+    )
+    # latest_nav_date of the fund when the returns were computed
+    as_of_date = models.DateField()
+    xirr_6m = models.FloatField(null=True, blank=True)
+    xirr_1y = models.FloatField(null=True, blank=True)
+    xirr_3y = models.FloatField(null=True, blank=True)
+    xirr_5y = models.FloatField(null=True, blank=True)
+    xirr_10y = models.FloatField(null=True, blank=True)
+    xirr_all = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.WINDOW_FIELDS}
+
+    def __str__(self):
+        return f"Returns of {self.fund_id} as of {self.as_of_date}"
@@ -0,0 +1,32 @@
+from django.db import models
+
+
+class JobRun(models.Model):
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    command = models.CharField(max_length=100)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING
+    )
+    # Primary key of the last fund whose batch was fully processed
+    last_processed_id = models.BigIntegerField(null=True, blank=True)
+    counts = models.JSONField(default=dict, blank=True)
+    timings = models.JSONField(default=dict, blank=True)
+    error = models.TextField(null=True, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-started_at", "-id"]
+
+    def __str__(self):
+        return f"{self.command} #{self.id} ({self.status})"
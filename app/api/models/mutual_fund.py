@@ -30,6 +30,8 @@ class MutualFund(models.Model):
     kuvera_slug = models.CharField(max_length=255, null=True, blank=True)
     slug = models.CharField(max_length=255, null=True, blank=True)
     category = models.CharField(max_length=50, null=True, blank=True)
+    # sha256 of the last upstream NAV history payload, used to skip unchanged funds
+    nav_history_digest = models.CharField(max_length=64, null=True, blank=True)
 
     def __str__(self):
         return self.mf_name
@@ -0,0 +1,34 @@
+from rest_framework import serializers
+
+# Largest number of scenarios evaluated by one request
+MAX_SCENARIOS = 500
+
+
+class ScenarioSerializer(serializers.Serializer):
+    isin = serializers.CharField(max_length=20)
+    type = serializers.ChoiceField(choices=["sip", "lumpsum"])
+    start_date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=1)
+    stepup = serializers.DecimalField(
+        max_digits=6, decimal_places=2, min_value=0, required=False, default=0
+    )
+    end_date = serializers.DateField(required=False, default=None)
+
+    def validate(self, attrs):
+        if attrs["end_date"] and attrs["end_date"] < attrs["start_date"]:
+            raise serializers.ValidationError(
+                {"end_date": "end_date must not be before start_date."}
+            )
+        return attrs
+
+
+class ScenarioBatchSerializer(serializers.Serializer):
+    scenarios = ScenarioSerializer(many=True, allow_empty=False)
+    include_growth = serializers.BooleanField(required=False, default=False)
+
+    def validate_scenarios(self, value):
+        if len(value) > MAX_SCENARIOS:
+            raise serializers.ValidationError(
+                f"At most {MAX_SCENARIOS} scenarios can be evaluated per request."
+            )
+        return value
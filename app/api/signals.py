@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from api.models import MutualFund
+from api.utils.es_outbox import enqueue_es_sync, touches_es_document
+from api.utils.response_cache import bump_catalogue_version
+
+
+@receiver(post_save, sender=MutualFund)
+def enqueue_saved_fund(sender, instance, update_fields=None, **kwargs):
+    if instance.isin_growth and touches_es_document(update_fields):
+        enqueue_es_sync([instance.isin_growth])
+        bump_catalogue_version()
+
+
+@receiver(post_delete, sender=MutualFund)
+def enqueue_deleted_fund(sender, instance, **kwargs):
+    if instance.isin_growth:
+        enqueue_es_sync([instance.isin_growth])
+        bump_catalogue_version()
@@ -1,7 +1,61 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework.test import APITestCase
 from rest_framework import status
-from api.models import User
+from api.models import User, MutualFund, FundHistoricalNAV, FundReturnsSnapshot, JobRun, EsOutbox
+from api.utils.mfapi import iter_nav_entries, parse_nav_date
+from api.utils.http_client import HttpClient
+from api.utils.batching import FileCheckpoint, iter_keyset_batches
+from api.utils.job_runs import JobRunTracker
+from api.utils.sharding import parse_shard, shard_queryset
+from api.utils.returns import (
+    calculate_returns,
+    calculate_returns_batch,
+    load_nav_histories,
+    refresh_returns_snapshots,
+    returns_for_funds,
+    snapshot_returns,
+)
+from api.utils.rolling_returns import parse_period, rolling_returns
+from api.utils.risk_metrics import calculate_risk_metrics, calculate_risk_metrics_batch
+from api.utils.sip_simulation import NavSeries, monthly_growth, simulate_sip, sip_schedule, valuation
+from api.serializers.mutual_fund_detail_serializer import MutualFundDetailSerializer
+from api.utils.xirr import xirr
+from api.utils.es_indices import REBUILD_JOB_NAME, swap_alias_actions, write_target
+from api.utils.es_outbox import enqueue_es_sync
+from api.utils.es_client import CircuitBreaker, ElasticsearchUnavailable, es_guard
+from elasticsearch import ConnectionError as EsConnectionError
+from elastic_transport import JsonSerializer
+from api.config.es_config import MUTUALFUND_INDEX_NAME, NAV_INDEX_NAME, NAV_POINTS_INDEX_NAME
+from api.utils.nav_writer import bulk_upsert_navs
+from api.utils.nav_points import search_nav_points
+from api.utils.nav_store import DbNavBackend, EsNavBackend, NavSeriesStore, nav_store
+from api.utils.es_sync import (
+    load_new_nav_rows,
+    mutual_fund_actions,
+    nav_point_batch_actions,
+    nav_summary_actions,
+    risk_metric_actions,
+)
 
 
 class UserTestCase(APITestCase):
@@ -317,3 +371,1648 @@ class DocsTestCase(APITestCase):
         """
         response = self.client.get("/")
         self.assertContains(response, "<title>Django REST API</title>")
+
+
+class StubMfApiHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for api.mfapi.in: /mf/<code> returns three days of NAVs
+    after an artificial network delay, recording the peak number of requests
+    in flight.
+    """
+
+    delay = 0.1
+    in_flight = 0
+    peak_in_flight = 0
+    counter_lock = threading.Lock()
+    navs = [
+        {"date": "03-01-2024", "nav": "12.50000"},
+        {"date": "02-01-2024", "nav": "12.25000"},
+        {"date": "01-01-2024", "nav": "12.00000"},
+    ]
+
+    def do_GET(self):
+        handler = StubMfApiHandler
+        with handler.counter_lock:
+            handler.in_flight += 1
+            handler.peak_in_flight = max(handler.peak_in_flight, handler.in_flight)
+        try:
+            time.sleep(self.delay)
+        finally:
+            with handler.counter_lock:
+                handler.in_flight -= 1
+        body = json.dumps({"data": self.navs}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpdateNavsTestCase(TestCase):
+
+    """
+    Test suite for the update_navs management command against a local stub server
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubMfApiHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def create_funds(self, count):
+        MutualFund.objects.all().delete()
+        FundHistoricalNAV.objects.all().delete()
+        for i in range(count):
+            MutualFund.objects.create(
+                mf_name=f"Fund {i}",
+                mf_schema_code=100000 + i,
+                start_date=date(2020, 1, 1),
+                AUM=1000,
+                exit_load="0%",
+                isin_growth=f"INF000000{i:03d}",
+            )
+
+    def run_update_navs(self, workers):
+        with self.settings(MFAPI_BASE_URL=self.base_url):
+            call_command("update_navs", workers=workers, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_update_navs_stores_history(self):
+        """
+        Test command: NAV history and latest NAV are stored for every fund.
+        """
+        self.create_funds(3)
+        self.run_update_navs(workers=2)
+        self.assertEqual(FundHistoricalNAV.objects.count(), 9)
+        fund = MutualFund.objects.get(mf_schema_code=100000)
+        self.assertEqual(fund.latest_nav_date, date(2024, 1, 3))
+        self.assertEqual(float(fund.latest_nav), 12.5)
+        self.assertEqual(fund.returns_snapshot.as_of_date, date(2024, 1, 3))
+
+    def test_update_navs_workers_fetch_concurrently(self):
+        """
+        Test command: several workers overlap their fetches, never exceeding --workers.
+        """
+        self.create_funds(8)
+        StubMfApiHandler.peak_in_flight = 0
+        self.run_update_navs(workers=1)
+        self.assertEqual(StubMfApiHandler.peak_in_flight, 1)
+
+        self.create_funds(8)
+        StubMfApiHandler.peak_in_flight = 0
+        self.run_update_navs(workers=4)
+        self.assertGreater(StubMfApiHandler.peak_in_flight, 1)
+        self.assertLessEqual(StubMfApiHandler.peak_in_flight, 4)
+        self.assertEqual(FundHistoricalNAV.objects.count(), 24)
+
+
+    def test_unchanged_payload_is_skipped_and_revisions_applied(self):
+        """
+        Test command: an identical payload is skipped by digest; --full-history fixes revised NAVs.
+        """
+        self.create_funds(1)
+        self.run_update_navs(workers=1)
+        MutualFund.objects.update(nav_last_updated=None, latest_nav_date=None)
+        FundHistoricalNAV.objects.filter(date=date(2024, 1, 2)).update(nav=99)
+
+        out = io.StringIO()
+        with self.settings(MFAPI_BASE_URL=self.base_url):
+            call_command("update_navs", stdout=out)
+        self.assertIn("1 unchanged", out.getvalue())
+        self.assertEqual(FundHistoricalNAV.objects.get(date=date(2024, 1, 2)).nav, 99)
+
+        MutualFund.objects.update(nav_last_updated=None, latest_nav_date=None)
+        out = io.StringIO()
+        with self.settings(MFAPI_BASE_URL=self.base_url):
+            call_command("update_navs", full_history=True, stdout=out)
+        self.assertIn("1 NAVs revised", out.getvalue())
+        self.assertEqual(float(FundHistoricalNAV.objects.get(date=date(2024, 1, 2)).nav), 12.25)
+        self.assertEqual(FundHistoricalNAV.objects.count(), 3)
+
+    def test_changed_payload_revises_past_navs(self):
+        """
+        Test command: a normal run reconciles a changed payload and overwrites only the revised NAV.
+        """
+        self.create_funds(1)
+        self.run_update_navs(workers=1)
+        # Processed after 3 Jan, so a since-based parse would stop before 2 Jan
+        MutualFund.objects.update(
+            nav_last_updated=timezone.make_aware(datetime(2024, 1, 3, 18)),
+            latest_nav_date=None,
+        )
+        revised = [
+            {"date": "04-01-2024", "nav": "12.75000"},
+            {"date": "03-01-2024", "nav": "12.50000"},
+            {"date": "02-01-2024", "nav": "12.30000"},
+            {"date": "01-01-2024", "nav": "12.00000"},
+        ]
+        out = io.StringIO()
+        with mock.patch.object(StubMfApiHandler, "navs", revised), self.settings(
+            MFAPI_BASE_URL=self.base_url
+        ):
+            call_command("update_navs", stdout=out)
+
+        self.assertIn("1 NAVs revised", out.getvalue())
+        navs = dict(FundHistoricalNAV.objects.values_list("date", "nav"))
+        self.assertEqual(
+            {d: float(n) for d, n in navs.items()},
+            {
+                date(2024, 1, 1): 12.0,
+                date(2024, 1, 2): 12.3,
+                date(2024, 1, 3): 12.5,
+                date(2024, 1, 4): 12.75,
+            },
+        )
+
+    def test_navall_ingestion(self):
+        """
+        Test command: a NAVAll file updates matching funds and their history in one pass.
+        """
+        MutualFund.objects.create(
+            mf_name="Fund A",
+            mf_schema_code=119551,
+            start_date=date(2020, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF209KA12Z1",
+            latest_nav=100,
+            latest_nav_date=date(2025, 10, 14),
+        )
+        MutualFund.objects.create(
+            mf_name="Fund B",
+            mf_schema_code=1,
+            start_date=date(2020, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000B",
+        )
+        content = (
+            "Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date\n"
+            "\n"
+            "Open Ended Schemes(Debt Scheme - Banking and PSU Fund)\n"
+            "\n"
+            "119551;INF209KA12Z1;-;Fund A - Growth;105.1700;15-Oct-2025\n"
+            "999999;-;INF000B;Fund B - Growth;12.5;15-Oct-2025\n"
+            "888888;INF000C;-;Unknown;N.A.;15-Oct-2025\n"
+        )
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as fh:
+            fh.write(content)
+        self.addCleanup(os.remove, fh.name)
+        call_command("update_navs", navall=fh.name, stdout=io.StringIO())
+
+        fund_a = MutualFund.objects.get(mf_schema_code=119551)
+        self.assertEqual(fund_a.latest_nav_date, date(2025, 10, 15))
+        self.assertEqual(float(fund_a.latest_nav), 105.17)
+        self.assertEqual(
+            FundHistoricalNAV.objects.filter(isin_growth="INF209KA12Z1").count(), 2
+        )
+        self.assertEqual(
+            MutualFund.objects.get(isin_growth="INF000B").latest_nav_date,
+            date(2025, 10, 15),
+        )
+
+    def test_navall_respects_shard(self):
+        """
+        Test command: --navall updates only the funds of --shard and refuses --processes.
+        """
+        funds = [
+            MutualFund.objects.create(
+                mf_name=f"Fund {code}",
+                mf_schema_code=code,
+                start_date=date(2020, 1, 1),
+                AUM=1000,
+                exit_load="0%",
+                isin_growth=f"INF000SH{code}",
+            )
+            for code in (501, 502)
+        ]
+        content = (
+            "Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date\n"
+            "501;INF000SH501;-;Fund 501;10.5;15-Oct-2025\n"
+            "502;INF000SH502;-;Fund 502;20.5;15-Oct-2025\n"
+        )
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as fh:
+            fh.write(content)
+        self.addCleanup(os.remove, fh.name)
+        shard = (funds[0].id % 2, 2)
+        call_command("update_navs", navall=fh.name, shard=shard, stdout=io.StringIO())
+
+        funds = [MutualFund.objects.get(id=f.id) for f in funds]
+        self.assertEqual(funds[0].latest_nav_date, date(2025, 10, 15))
+        self.assertIsNone(funds[1].latest_nav_date)
+        with self.assertRaises(CommandError):
+            call_command("update_navs", navall=fh.name, processes=2, stdout=io.StringIO())
+
+
+class MfApiParsingTestCase(TestCase):
+
+    """
+    Test suite for mfapi payload parsing helpers
+    """
+
+    def test_parse_nav_date(self):
+        """
+        Test parser: fixed-format DD-MM-YYYY dates.
+        """
+        self.assertEqual(parse_nav_date("24-07-2025"), date(2025, 7, 24))
+        with self.assertRaises(ValueError):
+            parse_nav_date("2025-07-24")
+
+    def test_iter_nav_entries_stops_at_since(self):
+        """
+        Test parser: incremental parsing stops at the last known date and skips bad entries.
+        """
+        entries = [
+            {"date": "05-01-2024", "nav": "1,010.5"},
+            {"date": "04-01-2024", "nav": ""},
+            {"date": "bad-date", "nav": "10"},
+            {"date": "03-01-2024", "nav": "1000"},
+            {"date": "02-01-2024", "nav": "990"},
+            {"date": "01-01-2024", "nav": "980"},
+        ]
+        self.assertEqual(
+            list(iter_nav_entries(entries, since=date(2024, 1, 2))),
+            [(date(2024, 1, 5), 1010.5), (date(2024, 1, 3), 1000.0)],
+        )
+        self.assertEqual(len(list(iter_nav_entries(entries))), 4)
+
+
+class StubEtagHandler(BaseHTTPRequestHandler):
+    """
+    Serves a fixed body with an ETag and answers 304 when it is revalidated.
+    """
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b'{"data": []}'
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpClientTestCase(TestCase):
+
+    """
+    Test suite for the shared HTTP client
+    """
+
+    def test_etag_revalidation_uses_disk_cache(self):
+        """
+        Test client: a 304 revalidation is served from the on-disk cache.
+        """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubEtagHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/mf/1"
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            client = HttpClient(cache_dir=cache_dir)
+            first = client.get(url)
+            second = client.get(url)
+
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.json(), {"data": []})
+        self.assertEqual(client.stats["requests"], 2)
+        self.assertEqual(client.stats["cache_hits"], 1)
+        self.assertEqual(client.stats["bytes_saved"], len(b'{"data": []}'))
+
+    def test_streamed_response_holds_host_slot_until_closed(self):
+        """
+        Test client: a streamed response keeps its per-host slot until it is closed.
+        """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubEtagHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_port}/navall"
+        client = HttpClient(max_per_host=1)
+        slot = client._host_slot(url)
+
+        with client.get(url, stream=True) as resp:
+            self.assertFalse(slot.acquire(blocking=False))
+            self.assertEqual(resp.json(), {"data": []})
+        resp.close()  # A second close must not release the slot again
+
+        self.assertTrue(slot.acquire(blocking=False))
+        self.assertFalse(slot.acquire(blocking=False))
+        slot.release()
+
+    def test_summary_since_snapshot(self):
+        """
+        Test client: summary(since=...) reports only the requests after the snapshot.
+        """
+        client = HttpClient()
+        client._count(requests=5, bytes_downloaded=2048)
+        before = client.snapshot()
+        client._count(requests=1, bytes_downloaded=1024)
+        self.assertEqual(
+            client.summary(since=before),
+            "HTTP: 1 requests, 0 cache hits (0.0%), 1.0 KiB downloaded, 0.0 KiB saved.",
+        )
+
+
+class KeysetBatchTestCase(TestCase):
+
+    """
+    Test suite for the keyset batch iterator
+    """
+
+    def setUp(self):
+        for i in range(7):
+            MutualFund.objects.create(
+                mf_name=f"Fund {i}",
+                mf_schema_code=i,
+                start_date=date(2020, 1, 1),
+                AUM=1000,
+                exit_load="0%",
+            )
+
+    def test_batches_cover_queryset_once(self):
+        """
+        Test iterator: every row is yielded exactly once, in id order.
+        """
+        batches = list(iter_keyset_batches(MutualFund.objects.all(), 3))
+        self.assertEqual([len(b) for b in batches], [3, 3, 1])
+        ids = [fund.id for batch in batches for fund in batch]
+        self.assertEqual(ids, sorted(MutualFund.objects.values_list("id", flat=True)))
+
+    def test_checkpoint_resumes_after_crash(self):
+        """
+        Test iterator: a checkpointed run resumes after the last completed batch.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = FileCheckpoint(os.path.join(tmp, "checkpoint"))
+            seen = []
+            for batch in iter_keyset_batches(MutualFund.objects.all(), 3, checkpoint=checkpoint):
+                if len(seen) == 3:
+                    break  # Simulated crash while processing the second batch
+                seen.extend(batch)
+            self.assertEqual(checkpoint.load(), seen[-1].id)
+
+            resumed = [
+                fund
+                for batch in iter_keyset_batches(MutualFund.objects.all(), 3, checkpoint=checkpoint)
+                for fund in batch
+            ]
+            self.assertEqual(len(seen) + len(resumed), 7)
+            self.assertIsNone(checkpoint.load())
+
+
+class JobRunTrackerTestCase(TestCase):
+
+    """
+    Test suite for persisted job-run checkpoints
+    """
+
+    def test_resume_continues_unfinished_run(self):
+        """
+        Test tracker: --resume picks up the last unfinished run with its position and counts.
+        """
+        tracker = JobRunTracker.start("update_navs")
+        tracker.add(processed=10, updated=9)
+        tracker.save(42)
+        tracker.finish(JobRun.STATUS_FAILED, error="boom")
+
+        resumed = JobRunTracker.start("update_navs", resume=True)
+        self.assertEqual(resumed.run.id, tracker.run.id)
+        self.assertEqual(resumed.load(), 42)
+        self.assertEqual(resumed.counts["processed"], 10)
+        self.assertEqual(resumed.run.status, JobRun.STATUS_RUNNING)
+        resumed.finish()
+
+        fresh = JobRunTracker.start("update_navs", resume=True)
+        self.assertNotEqual(fresh.run.id, tracker.run.id)
+        self.assertIsNone(fresh.load())
+
+    def test_resume_unknown_or_completed_run_id_fails(self):
+        """
+        Test tracker: --resume --run-id refuses to start over when the run cannot be continued.
+        """
+        tracker = JobRunTracker.start("update_navs")
+        tracker.finish()
+        for run_id in (tracker.run.id, tracker.run.id + 100):
+            with self.assertRaisesMessage(CommandError, f"run {run_id} not found or already completed"):
+                JobRunTracker.start("update_navs", resume=True, run_id=run_id)
+        self.assertEqual(JobRun.objects.count(), 1)
+
+    def test_update_navs_records_run(self):
+        """
+        Test command: every update_navs run is recorded and can be inspected by id.
+        """
+        call_command("update_navs", stdout=io.StringIO())
+        run = JobRun.objects.get(command="update_navs")
+        self.assertEqual(run.status, JobRun.STATUS_COMPLETED)
+        out = io.StringIO()
+        call_command("update_navs", run_id=run.id, stdout=out)
+        self.assertIn(f"Run #{run.id} of update_navs: completed", out.getvalue())
+
+
+class ShardingTestCase(TestCase):
+
+    """
+    Test suite for sharded command execution
+    """
+
+    def test_shards_partition_funds(self):
+        """
+        Test sharding: every fund lands in exactly one shard.
+        """
+        for i in range(10):
+            MutualFund.objects.create(
+                mf_name=f"Fund {i}",
+                mf_schema_code=i,
+                start_date=date(2020, 1, 1),
+                AUM=1000,
+                exit_load="0%",
+            )
+        seen = []
+        for index in range(3):
+            seen.extend(
+                shard_queryset(MutualFund.objects.all(), (index, 3)).values_list("id", flat=True)
+            )
+        self.assertEqual(sorted(seen), sorted(MutualFund.objects.values_list("id", flat=True)))
+
+    def test_parse_shard(self):
+        """
+        Test sharding: --shard values are validated.
+        """
+        self.assertEqual(parse_shard("1/4"), (1, 4))
+        for value in ("4/4", "-1/2", "1", "a/b"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+
+class FundReturnsTestCase(TestCase):
+
+    """
+    Test suite for fund return calculations
+    """
+
+    def setUp(self):
+        self.fund = MutualFund.objects.create(
+            mf_name="Returns Fund",
+            mf_schema_code=1,
+            start_date=date(2020, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000RET001",
+            latest_nav=Decimal("20"),
+            latest_nav_date=date(2024, 1, 1),
+        )
+        # NAV of 10 on every other day for two years, then the latest NAV
+        start = date(2022, 1, 1)
+        FundHistoricalNAV.objects.bulk_create(
+            [
+                FundHistoricalNAV(
+                    isin_growth="INF000RET001", date=start + timedelta(days=i), nav=Decimal("10")
+                )
+                for i in range(0, 730, 2)
+            ]
+            + [FundHistoricalNAV(isin_growth="INF000RET001", date=date(2024, 1, 1), nav=Decimal("20"))]
+        )
+
+    def test_windows_use_first_nav_in_anchor_range(self):
+        """
+        Test returns: each window starts on the first NAV at or after its nominal start.
+        """
+        history = load_nav_histories(["INF000RET001"])["INF000RET001"]
+        returns = calculate_returns(history, Decimal("20"), date(2024, 1, 1))
+        self.assertEqual(returns["xirr_6m"], 100.0)
+        self.assertIsNotNone(returns["xirr_1y"])
+        self.assertIsNotNone(returns["xirr_all"])
+        self.assertIsNone(returns["xirr_3y"])
+        self.assertIsNone(returns["xirr_10y"])
+
+    def test_closed_form_matches_pyxirr(self):
+        """
+        Test returns: annualised windows match a two-cash-flow XIRR.
+        """
+        rng = random.Random(7)
+        start = date(2010, 1, 4)
+        history, nav = [], 10.0
+        for i in range(0, 5000):
+            day = start + timedelta(days=i)
+            if day.weekday() < 5:
+                nav *= 1 + rng.gauss(0.0004, 0.01)
+                history.append((day, Decimal(f"{nav:.4f}")))
+        latest_date, latest_nav = history[-1]
+        returns = calculate_returns(history, latest_nav, latest_date)
+        nav_by_date = dict(history)
+        for key, days in (("xirr_1y", 365), ("xirr_3y", 1095), ("xirr_10y", 3650)):
+            d0 = latest_date - timedelta(days=days)
+            anchor = next(d0 + timedelta(days=i) for i in range(31) if d0 + timedelta(days=i) in nav_by_date)
+            expected = xirr([-float(nav_by_date[anchor]), float(latest_nav)], [anchor, latest_date])
+            self.assertAlmostEqual(returns[key], expected, delta=0.01)
+
+    def test_batch_matches_single_fund(self):
+        """
+        Test returns: a batch gives every fund the same result as computing it alone.
+        """
+        history = load_nav_histories(["INF000RET001"])["INF000RET001"]
+        short = history[-100:]
+        batch = calculate_returns_batch(
+            [
+                ("a", history, Decimal("20"), date(2024, 1, 1)),
+                ("b", short, Decimal("20"), date(2024, 1, 1)),
+                ("c", [], Decimal("20"), date(2024, 1, 1)),
+            ]
+        )
+        self.assertEqual(batch["a"], calculate_returns(history, Decimal("20"), date(2024, 1, 1)))
+        self.assertEqual(batch["b"], calculate_returns(short, Decimal("20"), date(2024, 1, 1)))
+        self.assertIsNone(batch["b"]["xirr_1y"])
+        self.assertEqual(batch["c"], {})
+
+    def test_bulk_actions_read_history_once(self):
+        """
+        Test ES sync: a batch of funds loads its NAV history with one query.
+        """
+        fund = MutualFund.objects.select_related("returns_snapshot").get(id=self.fund.id)
+        with self.assertNumQueries(1):
+            actions = list(mutual_fund_actions([fund], "mutualfund_list"))
+        self.assertEqual(len(actions), 1)
+        self.assertEqual(actions[0]["_id"], "INF000RET001")
+        self.assertTrue(actions[0]["doc_as_upsert"])
+        self.assertEqual(actions[0]["doc"]["returns"]["xirr_6m"], 100.0)
+
+    def test_new_nav_rows_for_a_batch_in_one_query(self):
+        """
+        Test ES sync: rows newer than each ISIN's last synced date are read in one query.
+        """
+        FundHistoricalNAV.objects.create(
+            isin_growth="INF000RET002", date=date(2024, 1, 1), nav=Decimal("5")
+        )
+        last_dates = {"INF000RET001": date(2023, 12, 28), "INF000RET002": None}
+        with self.assertNumQueries(1):
+            new_rows = load_new_nav_rows(last_dates)
+        self.assertEqual(
+            [d for d, _ in new_rows["INF000RET001"]], [date(2023, 12, 30), date(2024, 1, 1)]
+        )
+        self.assertEqual(new_rows["INF000RET002"], [(date(2024, 1, 1), Decimal("5"))])
+
+        actions = list(nav_summary_actions([self.fund], "fund_nav_history", last_dates, new_rows))
+        self.assertEqual(len(actions), 1)
+        doc = actions[0]["doc"]
+        self.assertEqual(doc["last_updated_date"], "2024-01-01")
+        self.assertNotIn("history", doc)
+        # Returns are computed over the full stored history, not just the new rows
+        self.assertIsNotNone(doc["returns"]["xirr_1y"])
+
+    def test_nav_points_are_routed_by_isin(self):
+        """
+        Test ES sync: new rows become one point per ISIN and date, routed by ISIN.
+        """
+        new_rows = {"INF000RET001": [(date(2024, 1, 1), Decimal("20"))]}
+        points = list(nav_point_batch_actions(new_rows, "fund_nav_points"))
+        self.assertEqual(len(points), 1)
+        self.assertEqual(points[0]["_id"], "INF000RET001:2024-01-01")
+        self.assertEqual(points[0]["_routing"], "INF000RET001")
+        self.assertEqual(
+            points[0]["_source"], {"isin": "INF000RET001", "date": "2024-01-01", "nav": 20.0}
+        )
+
+    def test_nav_point_search_pages_past_the_result_window(self):
+        """
+        Test ES reads: ranges longer than one search are paged with search_after instead of truncated.
+        """
+        days = [date(1990, 1, 1) + timedelta(days=i) for i in range(3)]
+        hits = [
+            {"_source": {"date": d.isoformat(), "nav": 10.5 + i}, "sort": [d.toordinal()]}
+            for i, d in enumerate(days)
+        ]
+        es = mock.Mock()
+        es.search.side_effect = [{"hits": {"hits": hits[:2]}}, {"hits": {"hits": hits[2:]}}]
+        with mock.patch("api.utils.nav_points.MAX_POINTS_PER_SEARCH", 2):
+            points = search_nav_points(es, "INF000RET001")
+        self.assertEqual(points, [(d, Decimal(str(10.5 + i))) for i, d in enumerate(days)])
+        self.assertIsNone(es.search.call_args_list[0].kwargs["search_after"])
+        self.assertEqual(es.search.call_args_list[1].kwargs["search_after"], [days[1].toordinal()])
+
+    def test_refresh_upserts_snapshot(self):
+        """
+        Test snapshots: refreshing writes one row per fund and updates it in place.
+        """
+        self.assertEqual(refresh_returns_snapshots([self.fund, self.fund]), 1)
+        snapshot = FundReturnsSnapshot.objects.get(fund=self.fund)
+        self.assertEqual(snapshot.as_of_date, date(2024, 1, 1))
+        self.assertEqual(snapshot.xirr_6m, 100.0)
+        self.assertIsNone(snapshot.xirr_3y)
+
+        FundHistoricalNAV.objects.create(
+            isin_growth="INF000RET001", date=date(2024, 1, 2), nav=Decimal("30")
+        )
+        self.fund.latest_nav, self.fund.latest_nav_date = Decimal("30"), date(2024, 1, 2)
+        self.fund.save()
+        refresh_returns_snapshots([self.fund])
+        snapshot = FundReturnsSnapshot.objects.get(fund=self.fund)
+        self.assertEqual(snapshot.as_of_date, date(2024, 1, 2))
+        self.assertEqual(snapshot.xirr_6m, 200.0)
+
+    def test_readers_use_current_snapshot(self):
+        """
+        Test snapshots: a current snapshot is served without reading NAV history; a stale one is ignored.
+        """
+        refresh_returns_snapshots([self.fund])
+        FundReturnsSnapshot.objects.filter(fund=self.fund).update(xirr_1y=1.5)
+        fund = MutualFund.objects.select_related("returns_snapshot").get(id=self.fund.id)
+        with self.assertNumQueries(0):
+            returns = MutualFundDetailSerializer(fund).data["returns_xirr"]
+            batch = returns_for_funds([fund])
+        self.assertEqual(returns["xirr_1y"], 1.5)
+        self.assertEqual(batch[fund.id]["xirr_1y"], 1.5)
+
+        fund.latest_nav_date = date(2024, 1, 2)
+        self.assertIsNone(snapshot_returns(fund))
+        self.assertNotEqual(returns_for_funds([fund])[fund.id]["xirr_1y"], 1.5)
+
+
+class RollingReturnsTestCase(TestCase):
+
+    """
+    Test suite for the rolling returns distribution
+    """
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.history, nav = [], 10.0
+        day = date(2015, 1, 1)
+        while day <= date(2020, 12, 31):
+            if day.weekday() < 5:
+                nav *= 1 + rng.gauss(0.0004, 0.01)
+                self.history.append((day, Decimal(f"{nav:.4f}")))
+            day += timedelta(days=1)
+
+    def test_periods_match_per_start_calculation(self):
+        """
+        Test rolling returns: each period matches a CAGR computed for its start alone.
+        """
+        starts, ends, values = rolling_returns(self.history, parse_period("3y"))
+        nav_by_date = dict(self.history)
+        dates = [d for d, _ in self.history]
+        expected = []
+        for start_date, start_nav in self.history:
+            target = start_date + timedelta(days=1095)
+            if target > dates[-1]:
+                break
+            end_date = max(d for d in dates if d <= target)
+            if (target - end_date).days >= 31:
+                continue
+            held = (end_date - start_date).days
+            expected.append(
+                (float(nav_by_date[end_date]) / float(start_nav)) ** (365 / held) * 100 - 100
+            )
+        self.assertEqual(len(values), len(expected))
+        for value, want in zip(values, expected):
+            self.assertAlmostEqual(value, want, places=6)
+        self.assertEqual(date.fromordinal(int(starts[0])), date(2015, 1, 1))
+        self.assertTrue(all(e - s >= 1095 - 30 for s, e in zip(starts, ends)))
+
+    def test_parse_period(self):
+        """
+        Test rolling returns: periods are parsed to days and bad values rejected.
+        """
+        self.assertEqual(parse_period("3y"), 1095)
+        self.assertEqual(parse_period("6m"), 182)
+        self.assertEqual(parse_period("2w"), 14)
+        for bad in ("", "0y", "3x", "y"):
+            with self.assertRaises(ValueError):
+                parse_period(bad)
+
+    def test_endpoint_summary(self):
+        """
+        Test endpoint: the distribution, thresholds and downsampled series are returned.
+        """
+        MutualFund.objects.create(
+            mf_name="Rolling Fund",
+            mf_schema_code=2,
+            start_date=date(2015, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000ROL001",
+        )
+        FundHistoricalNAV.objects.bulk_create(
+            [FundHistoricalNAV(isin_growth="INF000ROL001", date=d, nav=n) for d, n in self.history]
+        )
+        client = APIClient()
+        response = client.get(
+            "/api/mutualfund/INF000ROL001/rolling-returns/?window=1y&step=1w&thresholds=0,10&points=5"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()["data"]
+        self.assertTrue(data["annualised"])
+        self.assertGreater(data["count"], 200)
+        self.assertLessEqual(data["min"]["return"], data["percentiles"]["p50"])
+        self.assertLessEqual(data["percentiles"]["p50"], data["max"]["return"])
+        self.assertEqual(set(data["above"]), {"0", "10"})
+        self.assertEqual(len(data["series"]), 5)
+
+        response = client.get("/api/mutualfund/INF000ROL001/rolling-returns/?window=3q")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.get("/api/mutualfund/INF000MISSING/rolling-returns/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class RiskMetricsTestCase(TestCase):
+
+    """
+    Test suite for the risk metrics engine
+    """
+
+    def make_history(self, navs, start=date(2023, 1, 2)):
+        days = [start + timedelta(days=i) for i in range(len(navs))]
+        return [(d, Decimal(str(n))) for d, n in zip(days, navs)]
+
+    def test_drawdown_dates_and_volatility(self):
+        """
+        Test risk metrics: max drawdown, its dates and volatility match a direct calculation.
+        """
+        navs = [10 + i * 0.1 for i in range(30)] + [12.6 - i * 0.3 for i in range(20)]
+        navs += [7.2 + i * 0.5 for i in range(20)]
+        history = self.make_history(navs)
+        metrics = calculate_risk_metrics(history, risk_free_rate=5)
+
+        self.assertEqual(metrics["max_drawdown_peak_date"], history[29][0].isoformat())
+        self.assertEqual(metrics["max_drawdown_trough_date"], history[49][0].isoformat())
+        first_recovered = next(i for i in range(50, len(navs)) if navs[i] >= navs[29])
+        self.assertEqual(metrics["max_drawdown_recovery_date"], history[first_recovered][0].isoformat())
+        self.assertAlmostEqual(metrics["max_drawdown"], (navs[49] / navs[29] - 1) * 100, places=1)
+
+        daily = [float(history[i][1]) / float(history[i - 1][1]) - 1 for i in range(1, len(navs))]
+        mean = sum(daily) / len(daily)
+        stdev = (sum((r - mean) ** 2 for r in daily) / (len(daily) - 1)) ** 0.5
+        self.assertAlmostEqual(metrics["volatility"], stdev * 252**0.5 * 100, places=1)
+        self.assertEqual(metrics["risk_free_rate"], 5)
+
+    def test_batch_matches_single_fund(self):
+        """
+        Test risk metrics: a batch gives every fund the same result as computing it alone.
+        """
+        rng = random.Random(3)
+        histories = {}
+        for key in ("a", "b"):
+            nav, navs = 10.0, []
+            for _ in range(400):
+                nav *= 1 + rng.gauss(0.0005, 0.01)
+                navs.append(round(nav, 4))
+            histories[key] = self.make_history(navs)
+        histories["short"] = self.make_history([10, 11, 12])
+        batch = calculate_risk_metrics_batch(histories.items(), risk_free_rate=6)
+        self.assertEqual(batch["a"], calculate_risk_metrics(histories["a"], risk_free_rate=6))
+        self.assertEqual(batch["b"], calculate_risk_metrics(histories["b"], risk_free_rate=6))
+        self.assertEqual(batch["short"], {})
+
+    def test_actions_and_detail_fallback(self):
+        """
+        Test risk metrics: the fund index update reads history once; the DB fallback exposes them.
+        """
+        history = self.make_history([10 + (i % 7) * 0.2 for i in range(60)])
+        fund = MutualFund.objects.create(
+            mf_name="Risk Fund",
+            mf_schema_code=3,
+            start_date=date(2020, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000RSK001",
+            latest_nav=history[-1][1],
+            latest_nav_date=history[-1][0],
+        )
+        FundHistoricalNAV.objects.bulk_create(
+            [FundHistoricalNAV(isin_growth="INF000RSK001", date=d, nav=n) for d, n in history]
+        )
+        with self.assertNumQueries(1):
+            actions = list(risk_metric_actions([fund], "mutualfund_list"))
+        self.assertEqual(actions[0]["_id"], "INF000RSK001")
+        self.assertIn("sharpe_ratio", actions[0]["doc"]["risk_metrics"])
+
+        # Elasticsearch is not reachable in tests, so the view serves the database
+        response = APIClient().get("/api/mutualfund/INF000RSK001/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["data"]["risk_metrics"], actions[0]["doc"]["risk_metrics"]
+        )
+
+
+class SipSimulationTestCase(TestCase):
+
+    """
+    Test suite for the SIP/lumpsum simulation engine
+    """
+
+    def setUp(self):
+        self.points = []
+        day, nav = date(2020, 1, 1), Decimal("10")
+        while day <= date(2022, 6, 30):
+            if day.weekday() < 5:
+                self.points.append((day, nav))
+                nav += Decimal("0.0125")
+            day += timedelta(days=1)
+        self.series = NavSeries(self.points)
+
+    def test_schedule_clamps_month_end_and_steps_up(self):
+        """
+        Test simulation: a 31st SIP day falls on each month's last day; step-up applies every January.
+        """
+        ordinals, amounts = sip_schedule(date(2020, 1, 31), date(2021, 3, 31), Decimal("1000"), Decimal("10"))
+        dates = [date.fromordinal(int(o)) for o in ordinals]
+        self.assertEqual(dates[:3], [date(2020, 1, 31), date(2020, 2, 29), date(2020, 3, 31)])
+        self.assertEqual(dates[-1], date(2021, 3, 31))
+        self.assertEqual(amounts[11], Decimal("1000"))
+        self.assertEqual(amounts[12], Decimal("1100.00"))
+
+    def test_sip_matches_instalment_loop(self):
+        """
+        Test simulation: units, corpus and monthly growth equal a per-instalment Decimal loop.
+        """
+        simulation = simulate_sip(self.series, date(2020, 1, 4), date(2022, 6, 30), Decimal("500"), Decimal("5"))
+        growth = monthly_growth(simulation)
+        ordinals, amounts = sip_schedule(date(2020, 1, 4), date(2022, 6, 30), Decimal("500"), Decimal("5"))
+        total_units = invested = Decimal("0")
+        for i, (ordinal, amount) in enumerate(zip(ordinals, amounts)):
+            nav_date, nav = next(p for p in self.points if p[0].toordinal() >= ordinal)
+            total_units += amount / nav
+            invested += amount
+            self.assertEqual(growth[i]["date"], nav_date)
+            self.assertEqual(growth[i]["units"], round(float(total_units), 4))
+            self.assertEqual(growth[i]["corpus"], round(float(total_units * nav), 2))
+        self.assertEqual(len(growth), len(ordinals))
+
+        value = valuation(simulation, self.points[-1][1], self.points[-1][0])
+        self.assertEqual(value["invested"], invested)
+        self.assertEqual(value["corpus"], total_units * self.points[-1][1])
+        self.assertGreater(value["xirr"], 0)
+
+    def test_view_handles_month_end_sip_day(self):
+        """
+        Test endpoint: a SIP started on the 31st is simulated instead of failing.
+        """
+        MutualFund.objects.create(
+            mf_name="SIP Fund",
+            mf_schema_code=4,
+            start_date=date(2020, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000SIP001",
+            type="Debt Scheme",
+            latest_nav=self.points[-1][1],
+            latest_nav_date=self.points[-1][0],
+        )
+        FundHistoricalNAV.objects.bulk_create(
+            [FundHistoricalNAV(isin_growth="INF000SIP001", date=d, nav=n) for d, n in self.points]
+        )
+        response = APIClient().get(
+            "/api/historical-profit/",
+            {"isin": "INF000SIP001", "start_date": "2020-01-31", "amount": "1000", "type": "sip"},
+        )
+        data = response.json()["data"]
+        self.assertEqual(data["amount_invested"], 30000.0)
+        self.assertEqual(data["monthly_growth"][1]["date"], "2020-03-02")
+
+    def test_scenario_batch_matches_single_requests(self):
+        """
+        Test endpoint: batched scenarios give the single-request results with two queries,
+        and one once the NAV series is cached.
+        """
+        MutualFund.objects.create(
+            mf_name="SIP Fund",
+            mf_schema_code=4,
+            start_date=date(2020, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000SIP001",
+            type="Debt Scheme",
+            latest_nav=self.points[-1][1],
+            latest_nav_date=self.points[-1][0],
+        )
+        FundHistoricalNAV.objects.bulk_create(
+            [FundHistoricalNAV(isin_growth="INF000SIP001", date=d, nav=n) for d, n in self.points]
+        )
+        client = APIClient()
+        scenarios = [
+            {"isin": "INF000SIP001", "type": "sip", "start_date": "2020-02-10", "amount": "1000", "stepup": "10"},
+            {"isin": "INF000SIP001", "type": "lumpsum", "start_date": "2020-06-06", "amount": "50000"},
+            {"isin": "INF000SIP001", "type": "sip", "start_date": "2020-02-10", "amount": "1000", "end_date": "2020-12-31"},
+            {"isin": "INF000MISSING", "type": "sip", "start_date": "2020-02-10", "amount": "1000"},
+        ]
+        nav_store.clear()
+        with self.assertNumQueries(2):
+            response = client.post(
+                "/api/historical-profit/scenarios/", {"scenarios": scenarios}, format="json"
+            )
+        results = response.json()["data"]["results"]
+        with self.assertNumQueries(1):
+            cached = client.post(
+                "/api/historical-profit/scenarios/", {"scenarios": scenarios}, format="json"
+            )
+        self.assertEqual(cached.json()["data"]["results"], results)
+        for scenario, result in zip(scenarios[:2], results):
+            single = client.get("/api/historical-profit/", scenario).json()["data"]
+            self.assertEqual(result["amount_invested"], single["amount_invested"])
+            self.assertEqual(result["corpus"], single["corpus_now"])
+            self.assertEqual(result["xirr"], single["xirr"])
+        self.assertEqual(results[2]["instalments"], 11)
+        self.assertEqual(results[2]["end_date"], "2020-12-31")
+        self.assertIn("error", results[3])
+
+        response = client.post(
+            "/api/historical-profit/scenarios/",
+            {"scenarios": [{"isin": "INF000SIP001", "type": "weekly", "start_date": "2020-01-01", "amount": "1"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NavSeriesStoreTestCase(TestCase):
+
+    """
+    Test suite for the cached NAV series store
+    """
+
+    def setUp(self):
+        self.points = {}
+        for i in range(3):
+            isin = f"INF000STORE{i}"
+            day, nav = date(2021, 1, 1), Decimal("20.1234") + i
+            self.points[isin] = []
+            while day <= date(2021, 12, 31):
+                if day.weekday() < 5:
+                    self.points[isin].append((day, nav))
+                    nav += Decimal("0.0101")
+                day += timedelta(days=1)
+            MutualFund.objects.create(
+                mf_name=f"Store Fund {i}",
+                mf_schema_code=700 + i,
+                start_date=date(2021, 1, 1),
+                AUM=1000,
+                exit_load="0%",
+                isin_growth=isin,
+                latest_nav=self.points[isin][-1][1],
+                latest_nav_date=self.points[isin][-1][0],
+            )
+            FundHistoricalNAV.objects.bulk_create(
+                [FundHistoricalNAV(isin_growth=isin, date=d, nav=n) for d, n in self.points[isin]]
+            )
+        self.store = NavSeriesStore(backends=[DbNavBackend()], max_bytes=10**6)
+
+    def test_lookups_match_database(self):
+        """
+        Test store: series, exact and on-or-after lookups equal the stored NAVs; hits need no queries.
+        """
+        isin, points = "INF000STORE0", self.points["INF000STORE0"]
+        latest = points[-1][0]
+        self.assertEqual(self.store.get_series(isin, latest_nav_date=latest), points)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.store.get_series(isin, date(2021, 3, 1), date(2021, 3, 31), latest_nav_date=latest),
+                [p for p in points if date(2021, 3, 1) <= p[0] <= date(2021, 3, 31)],
+            )
+            self.assertEqual(self.store.nav_on(isin, date(2021, 1, 4), latest_nav_date=latest), points[1][1])
+            self.assertIsNone(self.store.nav_on(isin, date(2021, 1, 2), latest_nav_date=latest))
+            self.assertEqual(self.store.nav_on_or_after(isin, date(2021, 1, 2), latest_nav_date=latest), points[1])
+            self.assertIsNone(self.store.nav_on_or_after(isin, date(2022, 1, 1), latest_nav_date=latest))
+        self.assertEqual(self.store.snapshot()["hits"], 5)
+
+        # One query for the versions, one for the two histories not yet cached
+        pairs = [(isin, date(2021, 6, 1)), ("INF000STORE1", date(2021, 6, 5)), ("INF000STORE2", date(2021, 6, 7))]
+        with self.assertNumQueries(2):
+            navs = self.store.navs_bulk(pairs)
+        self.assertEqual(navs[pairs[0]], dict(points)[date(2021, 6, 1)])
+        self.assertIsNone(navs[pairs[1]])
+        self.assertEqual(navs[pairs[2]], dict(self.points["INF000STORE2"])[date(2021, 6, 7)])
+
+    def test_new_latest_nav_date_reloads_series(self):
+        """
+        Test store: a cached series is replaced once the fund's latest_nav_date moves on.
+        """
+        isin, points = "INF000STORE0", self.points["INF000STORE0"]
+        self.store.get_series(isin)
+        FundHistoricalNAV.objects.create(isin_growth=isin, date=date(2022, 1, 3), nav=Decimal("30.5"))
+        self.assertIsNone(self.store.nav_on(isin, date(2022, 1, 3)))
+        MutualFund.objects.filter(isin_growth=isin).update(latest_nav_date=date(2022, 1, 3))
+        self.assertEqual(self.store.nav_on(isin, date(2022, 1, 3)), Decimal("30.5"))
+        self.assertEqual(len(self.store.get_series(isin)), len(points) + 1)
+
+    def test_lagging_elasticsearch_series_falls_back_to_database(self):
+        """
+        Test store: points ending before latest_nav_date (outbox not drained) are read from the database.
+        """
+        isin, points = "INF000STORE0", self.points["INF000STORE0"]
+        store = NavSeriesStore(backends=[EsNavBackend(), DbNavBackend()])
+        served = {"INF000STORE0": points[:-1], "INF000STORE1": self.points["INF000STORE1"]}
+        with mock.patch("api.utils.nav_store.es_guard", contextlib.nullcontext), mock.patch(
+            "api.utils.nav_store.search_nav_points", lambda es, isin: served[isin]
+        ):
+            self.assertEqual(store.nav_on(isin, points[-1][0]), points[-1][1])
+            self.assertEqual(store.get_series(isin), points)
+            # Up-to-date points are used without a history query
+            with self.assertNumQueries(1):
+                self.assertEqual(store.get_series("INF000STORE1"), self.points["INF000STORE1"])
+
+    def test_cache_is_bounded_by_size(self):
+        """
+        Test store: least recently used series are evicted to stay under max_bytes.
+        """
+        size = len(self.points["INF000STORE0"]) * 16
+        store = NavSeriesStore(backends=[DbNavBackend()], max_bytes=2 * size)
+        for isin in ["INF000STORE0", "INF000STORE1", "INF000STORE0", "INF000STORE2"]:
+            store.get_series(isin)
+        stats = store.snapshot()
+        self.assertEqual((stats["series"], stats["bytes"], stats["evictions"]), (2, 2 * size, 1))
+        with self.assertNumQueries(1):
+            store.get_series("INF000STORE0")
+        with self.assertNumQueries(2):
+            store.get_series("INF000STORE1")
+
+
+class ResponseCacheTestCase(TestCase):
+
+    """
+    Test suite for the cached public fund endpoints
+    """
+
+    def setUp(self):
+        cache.clear()
+        MutualFund.objects.create(
+            mf_name="Cached Fund",
+            mf_schema_code=801,
+            start_date=date(2021, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000CACHE1",
+            latest_nav=Decimal("12.5"),
+            latest_nav_date=date(2021, 6, 4),
+        )
+        FundHistoricalNAV.objects.bulk_create(
+            [
+                FundHistoricalNAV(isin_growth="INF000CACHE1", date=date(2021, 6, 3), nav=Decimal("12.25")),
+                FundHistoricalNAV(isin_growth="INF000CACHE1", date=date(2021, 6, 4), nav=Decimal("12.5")),
+            ]
+        )
+        self.client = APIClient()
+
+    def get_price(self, **params):
+        return self.client.get("/api/fund-price/", {"isin": "INF000CACHE1", "date": "2021-06-03", **params})
+
+    def test_hits_until_nav_date_changes(self):
+        """
+        Test cache: repeat requests are served from the cache with only the version lookup,
+        and a new latest_nav_date starts a new entry.
+        """
+        self.assertEqual(self.get_price()["X-Cache"], "MISS")
+        with self.assertNumQueries(1):
+            response = self.get_price()
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.json()["data"]["price"], 12.25)
+        self.assertEqual(self.get_price(date="2021-06-04")["X-Cache"], "MISS")
+
+        MutualFund.objects.filter(isin_growth="INF000CACHE1").update(latest_nav_date=date(2021, 6, 7))
+        self.assertEqual(self.get_price()["X-Cache"], "MISS")
+        self.assertEqual(self.get_price(nocache="1")["X-Cache"], "BYPASS")
+
+        stats = self.client.get("/api/health/cache/").json()["data"]["responses"]["fund-price"]
+        self.assertGreaterEqual(stats["hits"], 1)
+        self.assertGreaterEqual(stats["misses"], 3)
+        self.assertGreaterEqual(stats["bypassed"], 1)
+
+    def get_detail_from_es(self, es_nav_date):
+        es = mock.Mock()
+        es.get.return_value = {"_source": {"isin": "INF000CACHE1", "latest_nav_date": es_nav_date}}
+        with mock.patch("api.views.mutual_fund_detail_view.es_guard", contextlib.nullcontext), mock.patch(
+            "api.views.mutual_fund_detail_view.get_es_client", return_value=es
+        ):
+            return self.client.get("/api/mutualfund/INF000CACHE1/")
+
+    def test_lagging_elasticsearch_body_is_not_cached(self):
+        """
+        Test cache: a document older than the fund's latest_nav_date is served but not stored.
+        """
+        self.assertEqual(self.get_detail_from_es("2021-06-03")["X-Cache"], "MISS")
+        response = self.get_detail_from_es("2021-06-04")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["data"]["latest_nav_date"], "2021-06-04")
+        self.assertEqual(self.get_detail_from_es("2021-06-04")["X-Cache"], "HIT")
+
+    def test_fund_edits_and_drains_start_new_entries(self):
+        """
+        Test cache: saving a fund and draining the outbox change the catalogue version.
+        """
+        self.get_price()
+        self.assertEqual(self.get_price()["X-Cache"], "HIT")
+        fund = MutualFund.objects.get(isin_growth="INF000CACHE1")
+        fund.AUM = 2000
+        fund.save()
+        self.assertEqual(self.get_price()["X-Cache"], "MISS")
+        self.assertEqual(self.get_price()["X-Cache"], "HIT")
+
+        es = RecordingEs([NAV_INDEX_NAME, NAV_POINTS_INDEX_NAME, MUTUALFUND_INDEX_NAME])
+        with mock.patch("api.management.commands.drain_es_outbox.Elasticsearch", return_value=es):
+            call_command("drain_es_outbox", stdout=io.StringIO())
+        self.assertEqual(self.get_price()["X-Cache"], "MISS")
+
+    def test_search_is_cached_while_outbox_has_entries(self):
+        """
+        Test cache: Elasticsearch search results are cached even with entries waiting in the outbox.
+        """
+        enqueue_es_sync(["INF000CACHE1"])
+        es = mock.Mock()
+        es.search.return_value = {
+            "hits": {
+                "total": {"value": 1},
+                "hits": [{"_source": {"isin": "INF000CACHE1", "mf_name": "Cached Fund", "type": "Debt"}}],
+            }
+        }
+        with mock.patch("api.views.mutual_fund_search_view.es_guard", contextlib.nullcontext), mock.patch(
+            "api.views.mutual_fund_search_view.get_es_client", return_value=es
+        ), contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.client.get("/api/mutualfunds/search/", {"q": "cached"})["X-Cache"], "MISS")
+            self.assertEqual(self.client.get("/api/mutualfunds/search/", {"q": "cached"})["X-Cache"], "HIT")
+        self.assertEqual(es.search.call_count, 1)
+
+    def test_errors_and_unknown_funds_are_not_cached(self):
+        """
+        Test cache: missing prices and unknown ISINs are recomputed every time.
+        """
+        self.assertEqual(self.get_price(date="2021-06-05").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get_price(date="2021-06-05")["X-Cache"], "MISS")
+        response = self.client.get("/api/fund-price/", {"isin": "INF000UNKNOWN", "date": "2021-06-03"})
+        self.assertNotIn("X-Cache", response)
+
+
+class ConditionalGetTestCase(TestCase):
+
+    """
+    Test suite for ETag/Last-Modified revalidation of the public fund endpoints
+    """
+
+    def setUp(self):
+        cache.clear()
+        MutualFund.objects.create(
+            mf_name="Conditional Fund",
+            mf_schema_code=802,
+            start_date=date(2021, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000ETAG01",
+            latest_nav=Decimal("12.5"),
+            latest_nav_date=date(2021, 6, 4),
+            nav_last_updated=timezone.make_aware(datetime(2021, 6, 4, 22, 0)),
+        )
+        FundHistoricalNAV.objects.create(isin_growth="INF000ETAG01", date=date(2021, 6, 4), nav=Decimal("12.5"))
+        self.client = APIClient()
+        self.params = {"isin": "INF000ETAG01", "date": "2021-06-04"}
+
+    def test_revalidation_returns_304_after_one_query(self):
+        """
+        Test conditional GET: a matching If-None-Match is answered with 304 before any other work.
+        """
+        response = self.client.get("/api/fund-price/", self.params)
+        etag = response["ETag"]
+        self.assertEqual(response["Last-Modified"], "Fri, 04 Jun 2021 22:00:00 GMT")
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/fund-price/", self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        other = self.client.get("/api/fund-price/", {**self.params, "date": "2021-06-03"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lagging_elasticsearch_body_gets_no_validators(self):
+        """
+        Test conditional GET: a document older than the fund's latest_nav_date has no ETag or Last-Modified.
+        """
+        es = mock.Mock()
+        with mock.patch("api.views.mutual_fund_detail_view.es_guard", contextlib.nullcontext), mock.patch(
+            "api.views.mutual_fund_detail_view.get_es_client", return_value=es
+        ):
+            es.get.return_value = {"_source": {"isin": "INF000ETAG01", "latest_nav_date": "2021-06-03"}}
+            response = self.client.get("/api/mutualfund/INF000ETAG01/")
+            self.assertNotIn("ETag", response)
+            self.assertNotIn("Last-Modified", response)
+
+            es.get.return_value = {"_source": {"isin": "INF000ETAG01", "latest_nav_date": "2021-06-04"}}
+            self.assertIn("ETag", self.client.get("/api/mutualfund/INF000ETAG01/"))
+
+    def test_new_nav_changes_etag(self):
+        """
+        Test conditional GET: ingesting a newer NAV invalidates the client's copy.
+        """
+        etag = self.client.get("/api/mutualfund/INF000ETAG01/")["ETag"]
+        self.assertEqual(
+            self.client.get("/api/mutualfund/INF000ETAG01/", HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        MutualFund.objects.filter(isin_growth="INF000ETAG01").update(latest_nav_date=date(2021, 6, 7))
+        response = self.client.get("/api/mutualfund/INF000ETAG01/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class StubIndices:
+    """
+    Minimal stand-in for Elasticsearch.indices over a dict of alias -> indices.
+    """
+
+    def __init__(self, indices, aliases):
+        self.indices = set(indices)
+        self.aliases = aliases
+
+    def exists_alias(self, name):
+        return name in self.aliases
+
+    def get_alias(self, name):
+        return {index: {} for index in self.aliases[name]}
+
+    def exists(self, index):
+        return index in self.indices or index in self.aliases
+
+
+class StubEs:
+    def __init__(self, indices=(), aliases=None):
+        self.indices = StubIndices(indices, aliases or {})
+
+
+class RecordingEs(StubEs):
+    """
+    Stand-in client for the sync commands: mget finds only the NAV documents
+    of `synced_dates`, and bulk requests succeed and are recorded as
+    (op, index, id, body) tuples.
+    """
+
+    def __init__(self, indices=(), aliases=None, synced_dates=None):
+        super().__init__(indices, aliases)
+        # {isin: last_updated_date} already in the NAV index
+        self.synced_dates = synced_dates or {}
+        self.transport = SimpleNamespace(
+            serializers=SimpleNamespace(get_serializer=lambda mimetype: JsonSerializer())
+        )
+        self.operations = []
+
+    def options(self, **kwargs):
+        return self
+
+    def mget(self, index, ids, **kwargs):
+        return {
+            "docs": [
+                {"_id": _id, "found": True, "_source": {"last_updated_date": self.synced_dates[_id]}}
+                if _id in self.synced_dates
+                else {"_id": _id, "found": False}
+                for _id in ids
+            ]
+        }
+
+    def bulk(self, operations, **kwargs):
+        items = []
+        lines = iter(json.loads(line) for line in operations)
+        for header in lines:
+            (op, meta), = header.items()
+            body = next(lines) if op != "delete" else None
+            self.operations.append((op, meta["_index"], meta["_id"], body))
+            items.append({op: {"_index": meta["_index"], "_id": meta["_id"], "status": 200}})
+        return SimpleNamespace(body={"errors": False, "items": items})
+
+    def documents(self, index, op=None):
+        return [(_id, body) for o, i, _id, body in self.operations if i == index and op in (None, o)]
+
+
+class EsIndexAliasTestCase(TestCase):
+
+    """
+    Test suite for versioned Elasticsearch indices behind aliases
+    """
+
+    def test_swap_moves_both_aliases(self):
+        """
+        Test aliases: read and write aliases move from the old to the new version.
+        """
+        es = StubEs(
+            ["funds_v1", "funds_v2"],
+            {"funds": ["funds_v1"], "funds_write": ["funds_v1"]},
+        )
+        actions = swap_alias_actions(es, "funds", "funds_v2")
+        self.assertEqual(
+            actions,
+            [
+                {"remove": {"index": "funds_v1", "alias": "funds"}},
+                {"remove": {"index": "funds_v1", "alias": "funds_write"}},
+                {"add": {"index": "funds_v2", "alias": "funds"}},
+                {"add": {"index": "funds_v2", "alias": "funds_write", "is_write_index": True}},
+            ],
+        )
+        self.assertEqual(write_target(es, "funds"), "funds_write")
+
+    def test_swap_replaces_legacy_index(self):
+        """
+        Test aliases: an unversioned index with the alias name is removed in the same request.
+        """
+        es = StubEs(["funds", "funds_v1"])
+        actions = swap_alias_actions(es, "funds", "funds_v1")
+        self.assertEqual(actions[0], {"remove_index": {"index": "funds"}})
+        # Writers keep using the plain name until the aliases exist
+        self.assertEqual(write_target(es, "funds"), "funds")
+
+
+class NavWriterTestCase(TestCase):
+
+    """
+    Test suite for the bulk NAV writer
+    """
+
+    @skipUnless(connection.vendor == "postgresql", "COPY upsert path is PostgreSQL only")
+    def test_copy_upsert_inserts_and_updates_in_one_transaction(self):
+        """
+        Test writer: repeated COPY upserts inside an outer transaction insert, skip and overwrite rows.
+        """
+        with transaction.atomic():
+            written = bulk_upsert_navs(
+                [
+                    ("INF000COPY01", date(2024, 1, 1), Decimal("10.5")),
+                    ("INF000COPY01", date(2024, 1, 2), Decimal("11.25")),
+                ]
+            )
+            bulk_upsert_navs([("INF000COPY01", date(2024, 1, 1), Decimal("1"))])
+            bulk_upsert_navs(
+                [("INF000COPY01", date(2024, 1, 2), Decimal("12.75"))], update_existing=True
+            )
+
+        self.assertEqual(written, 2)
+        navs = dict(FundHistoricalNAV.objects.values_list("date", "nav"))
+        self.assertEqual(
+            navs, {date(2024, 1, 1): Decimal("10.5000"), date(2024, 1, 2): Decimal("12.7500")}
+        )
+
+
+class EsOutboxTestCase(TestCase):
+
+    """
+    Test suite for the Elasticsearch outbox
+    """
+
+    def create_fund(self, isin="INF000OUT001"):
+        return MutualFund.objects.create(
+            mf_name="Outbox Fund",
+            mf_schema_code=1,
+            start_date=date(2020, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth=isin,
+        )
+
+    def test_nav_writes_enqueue_isins(self):
+        """
+        Test outbox: bulk NAV writes queue each ISIN once.
+        """
+        bulk_upsert_navs(
+            [
+                ("INF000OUT001", date(2024, 1, 1), Decimal("10")),
+                ("INF000OUT001", date(2024, 1, 2), Decimal("11")),
+                ("INF000OUT002", date(2024, 1, 1), Decimal("12")),
+            ]
+        )
+        self.assertEqual(
+            sorted(EsOutbox.objects.values_list("isin", flat=True)),
+            ["INF000OUT001", "INF000OUT002"],
+        )
+
+    def test_requeue_moves_timestamp(self):
+        """
+        Test outbox: enqueueing an ISIN again updates its row instead of adding one.
+        """
+        enqueue_es_sync(["INF000OUT001"])
+        first = EsOutbox.objects.get().enqueued_at
+        enqueue_es_sync(["INF000OUT001"])
+        self.assertEqual(EsOutbox.objects.count(), 1)
+        self.assertGreaterEqual(EsOutbox.objects.get().enqueued_at, first)
+
+    def test_drain_resends_revised_navs(self):
+        """
+        Test outbox: NAVs overwritten after they were synced are re-sent by the next drain.
+        """
+        self.create_fund()
+        bulk_upsert_navs(
+            [("INF000OUT001", date(2024, 1, d), Decimal("10") + d) for d in range(1, 6)]
+        )
+        EsOutbox.objects.all().delete()
+        bulk_upsert_navs([("INF000OUT001", date(2024, 1, 2), Decimal("99"))], update_existing=True)
+        self.assertEqual(EsOutbox.objects.get().revised_since, date(2024, 1, 2))
+        # A later, newer revision does not move the date forward
+        bulk_upsert_navs([("INF000OUT001", date(2024, 1, 4), Decimal("98"))], update_existing=True)
+        self.assertEqual(EsOutbox.objects.get().revised_since, date(2024, 1, 2))
+
+        es = RecordingEs(
+            [NAV_INDEX_NAME, NAV_POINTS_INDEX_NAME, MUTUALFUND_INDEX_NAME],
+            synced_dates={"INF000OUT001": "2024-01-05"},
+        )
+        with mock.patch("api.management.commands.drain_es_outbox.Elasticsearch", return_value=es):
+            call_command("drain_es_outbox", stdout=io.StringIO())
+
+        points = dict(es.documents(NAV_POINTS_INDEX_NAME, "index"))
+        self.assertEqual(sorted(points), [f"INF000OUT001:2024-01-0{d}" for d in range(2, 6)])
+        self.assertEqual(points["INF000OUT001:2024-01-02"]["nav"], 99.0)
+        (_, summary), = es.documents(NAV_INDEX_NAME, "update")
+        self.assertEqual(summary["doc"]["last_updated_date"], "2024-01-05")
+        self.assertFalse(EsOutbox.objects.exists())
+
+    def test_drain_waits_for_index_rebuild(self):
+        """
+        Test outbox: entries queued during an index rebuild are drained only after it finishes.
+        """
+        self.create_fund()
+        rebuild = JobRun.objects.create(command=REBUILD_JOB_NAME)
+        es = RecordingEs([NAV_INDEX_NAME, NAV_POINTS_INDEX_NAME, MUTUALFUND_INDEX_NAME])
+        with mock.patch("api.management.commands.drain_es_outbox.Elasticsearch", return_value=es):
+            call_command("drain_es_outbox", stdout=io.StringIO())
+            self.assertEqual(es.operations, [])
+            self.assertTrue(EsOutbox.objects.exists())
+
+            rebuild.status = JobRun.STATUS_COMPLETED
+            rebuild.save()
+            call_command("drain_es_outbox", stdout=io.StringIO())
+        self.assertEqual(len(es.documents(MUTUALFUND_INDEX_NAME, "update")), 1)
+        self.assertFalse(EsOutbox.objects.exists())
+
+    def test_fund_saves_enqueue_only_indexed_fields(self):
+        """
+        Test outbox: saving fields that are not indexed does not queue the fund.
+        """
+        fund = self.create_fund()
+        self.assertTrue(EsOutbox.objects.filter(isin="INF000OUT001").exists())
+        EsOutbox.objects.all().delete()
+
+        fund.slug = "outbox-fund"
+        fund.save(update_fields=["slug"])
+        self.assertFalse(EsOutbox.objects.exists())
+
+        fund.AUM = 2000
+        fund.save(update_fields=["AUM"])
+        self.assertTrue(EsOutbox.objects.filter(isin="INF000OUT001").exists())
+
+        EsOutbox.objects.all().delete()
+        fund.delete()
+        self.assertTrue(EsOutbox.objects.filter(isin="INF000OUT001").exists())
+
+
+class SyncHistoricalDataCommandTestCase(TestCase):
+
+    """
+    Test suite for the sync_historical_data_es command
+    """
+
+    def test_command_writes_points_summary_and_risk_metrics(self):
+        """
+        Test command: a full run writes each fund's NAV points, its summary and its risk metrics.
+        """
+        rows = [(date(2024, 1, 1) + timedelta(days=i), Decimal("10") + i) for i in range(40)]
+        MutualFund.objects.create(
+            mf_name="Sync Fund",
+            mf_schema_code=901,
+            start_date=date(2024, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000SYNC01",
+            latest_nav=rows[-1][1],
+            latest_nav_date=rows[-1][0],
+        )
+        FundHistoricalNAV.objects.bulk_create(
+            [FundHistoricalNAV(isin_growth="INF000SYNC01", date=d, nav=n) for d, n in rows]
+        )
+        es = RecordingEs([NAV_INDEX_NAME, NAV_POINTS_INDEX_NAME, MUTUALFUND_INDEX_NAME])
+        with mock.patch(
+            "api.management.commands.sync_historical_data_es.Elasticsearch", return_value=es
+        ):
+            call_command("sync_historical_data_es", stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(len(es.documents(NAV_POINTS_INDEX_NAME, "index")), 40)
+        (_, summary), = es.documents(NAV_INDEX_NAME, "update")
+        self.assertEqual(summary["doc"]["last_updated_date"], rows[-1][0].isoformat())
+        (_, risk), = es.documents(MUTUALFUND_INDEX_NAME, "update")
+        self.assertIn("volatility", risk["doc"]["risk_metrics"])
+        run = JobRun.objects.get(command="sync_historical_data_es")
+        self.assertEqual(run.counts["synced"], 1)
+
+    def test_recompute_risk_backfills_up_to_date_funds(self):
+        """
+        Test command: --recompute-risk writes risk metrics for funds without new records.
+        """
+        rows = [(date(2024, 1, 1) + timedelta(days=i), Decimal("10") + i) for i in range(40)]
+        MutualFund.objects.create(
+            mf_name="Synced Fund",
+            mf_schema_code=902,
+            start_date=date(2024, 1, 1),
+            AUM=1000,
+            exit_load="0%",
+            isin_growth="INF000SYNC02",
+            latest_nav=rows[-1][1],
+            latest_nav_date=rows[-1][0],
+        )
+        FundHistoricalNAV.objects.bulk_create(
+            [FundHistoricalNAV(isin_growth="INF000SYNC02", date=d, nav=n) for d, n in rows]
+        )
+        for options, expected in (({}, 0), ({"recompute_risk": True}, 1)):
+            es = RecordingEs(
+                [NAV_INDEX_NAME, NAV_POINTS_INDEX_NAME, MUTUALFUND_INDEX_NAME],
+                synced_dates={"INF000SYNC02": rows[-1][0].isoformat()},
+            )
+            with mock.patch(
+                "api.management.commands.sync_historical_data_es.Elasticsearch", return_value=es
+            ):
+                call_command(
+                    "sync_historical_data_es", stdout=io.StringIO(), stderr=io.StringIO(), **options
+                )
+            self.assertEqual(es.documents(NAV_POINTS_INDEX_NAME), [])
+            self.assertEqual(len(es.documents(MUTUALFUND_INDEX_NAME, "update")), expected)
+
+
+class CircuitBreakerTestCase(TestCase):
+
+    """
+    Test suite for the Elasticsearch circuit breaker
+    """
+
+    def fail(self, breaker):
+        with self.assertRaises(EsConnectionError):
+            with es_guard(breaker):
+                raise EsConnectionError("connection refused")
+
+    def test_opens_after_consecutive_failures(self):
+        """
+        Test breaker: consecutive outages open it and later calls are skipped.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+        self.fail(breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.fail(breaker)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        calls = []
+        with self.assertRaises(ElasticsearchUnavailable):
+            with es_guard(breaker):
+                calls.append(1)
+        self.assertEqual(calls, [])
+        self.assertEqual(breaker.snapshot()["short_circuited"], 1)
+
+    def test_probe_after_cooldown(self):
+        """
+        Test breaker: after the cool-down one probe is allowed and success closes it.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+        self.fail(breaker)
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        # Only one probe at a time
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_interrupted_probe_is_released(self):
+        """
+        Test breaker: a probe interrupted by a BaseException lets the next call probe again.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+        self.fail(breaker)
+        time.sleep(0.06)
+        with self.assertRaises(KeyboardInterrupt):
+            with es_guard(breaker):
+                raise KeyboardInterrupt
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        with es_guard(breaker):
+            pass
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_application_errors_do_not_count(self):
+        """
+        Test breaker: errors other than outages leave it closed.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+        with self.assertRaises(KeyError):
+            with es_guard(breaker):
+                raise KeyError("_source")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_health_endpoint(self):
+        """
+        Test API: the breaker state is exposed for monitoring.
+        """
+        response = APIClient().get("/api/health/elasticsearch/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(response.json()["data"]["state"], ("closed", "open", "half_open"))
@@ -11,9 +11,13 @@ from api.views.fetch_mutual_funds_view import FetchMutualFundsView
 from api.views.mutual_fund_detail_view import MutualFundDetailView
 from api.views.portfolio_returns_view import PortfolioReturnsView
 from api.views.historical_profit_view import HistoricalProfitView
+from api.views.historical_scenarios_view import HistoricalScenariosView
 from api.views.transaction_import_view import TransactionImportView
 from api.views.fund_price_view import FundPriceView
 from api.views.import_mapping_view import ImportMappingView
+from api.views.es_health_view import EsHealthView
+from api.views.cache_health_view import CacheHealthView
+from api.views.rolling_returns_view import RollingReturnsView
 
 urlpatterns = [
     path("users/", include("api.routes.user_urls")),
@@ -32,6 +36,11 @@ urlpatterns = [
         MutualFundDetailView.as_view(),
         name="mf-detail-by-isin",
     ),
+    path(
+        "mutualfund/<str:isin_growth>/rolling-returns/",
+        RollingReturnsView.as_view(),
+        name="mf-rolling-returns",
+    ),
     path(
         "mutualfund/code/<int:mf_scheme_code>/",
         MutualFundDetailView.as_view(),
@@ -41,8 +50,11 @@ urlpatterns = [
     path("fetch-funds/", FetchMutualFundsView.as_view(), name="fetch-mutual-funds"),
     path("portfolio-returns/", PortfolioReturnsView.as_view()),
     path("historical-profit/", HistoricalProfitView.as_view()),
+    path("historical-profit/scenarios/", HistoricalScenariosView.as_view()),
     path("import-transactions/", TransactionImportView.as_view()),
     path("fund-price/", FundPriceView.as_view(), name="fund-price"),
+    path("health/elasticsearch/", EsHealthView.as_view(), name="es-health"),
+    path("health/cache/", CacheHealthView.as_view(), name="cache-health"),
     # User saved import-mapping (user JWT auth)
     path("users/me/import-mapping/", ImportMappingView.as_view()),
 ]
@@ -0,0 +1,59 @@
+# api/utils/amfi.py
+from collections import namedtuple
+from datetime import date
+from api.utils.http_client import get_http_client
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+NavAllRow = namedtuple("NavAllRow", ["scheme_code", "isins", "scheme_name", "nav", "nav_date"])
+
+
+def parse_amfi_date(value):
+    """
+    Parse an AMFI 'DD-Mon-YYYY' date, e.g. '15-Oct-2025'.
+    """
+    day, month, year = value.strip().split("-")
+    return date(int(year), MONTHS[month[:3].lower()], int(day))
+
+
+def open_navall(source, timeout=60):
+    """
+    Yield the text lines of a NAVAll file from a URL or a local path without
+    loading the whole file into memory.
+    """
+    if source.startswith(("http://", "https://")):
+        with get_http_client().get(source, stream=True, timeout=timeout) as resp:
+            resp.raise_for_status()
+            resp.encoding = resp.encoding or "utf-8"
+            for line in resp.iter_lines(decode_unicode=True):
+                yield line
+    else:
+        with open(source, encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                yield line
+
+
+def iter_navall_rows(lines):
+    """
+    Parse AMFI NAVAll lines into NavAllRow tuples.
+
+    Data lines look like
+    'Scheme Code;ISIN Div Payout/ ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date'.
+    Header, fund-house and scheme-category lines, and rows without a usable NAV
+    (e.g. 'N.A.'), are skipped.
+    """
+    for line in lines:
+        parts = line.strip().split(";")
+        if len(parts) != 6 or not parts[0].strip().isdigit():
+            continue
+        code, isin_1, isin_2, name, nav_str, date_str = (p.strip() for p in parts)
+        try:
+            nav = float(nav_str.replace(",", ""))
+            nav_date = parse_amfi_date(date_str)
+        except (ValueError, KeyError):
+            continue
+        isins = tuple(i for i in (isin_1, isin_2) if i and i != "-")
+        yield NavAllRow(int(code), isins, name, nav, nav_date)
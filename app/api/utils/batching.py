@@ -0,0 +1,62 @@
+# api/utils/batching.py
+import os
+from pathlib import Path
+
+
+class FileCheckpoint:
+    """
+    Stores the last processed primary key in a small text file so an interrupted
+    run can pick up where it stopped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        try:
+            return int(self.path.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def save(self, last_id):
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(str(last_id))
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def iter_keyset_batches(queryset, batch_size, start_after=None, checkpoint=None):
+    """
+    Yield lists of up to `batch_size` objects from `queryset` in primary-key order.
+
+    Each batch is fetched with `pk > <last pk of the previous batch>` instead of
+    re-running the filtered query with a growing exclude list, so every batch
+    costs the same and a row that keeps failing is never selected twice.
+
+    `checkpoint` is any object with load()/save(last_id)/clear(): the position is
+    loaded when `start_after` is not given, saved after the caller has finished
+    with each batch, and cleared once the queryset is exhausted.
+    """
+    last_id = start_after
+    if last_id is None and checkpoint is not None:
+        last_id = checkpoint.load()
+
+    queryset = queryset.order_by("pk")
+    while True:
+        qs = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        batch = list(qs[:batch_size])
+        if not batch:
+            break
+        # Read the position before yielding: the caller may delete the objects
+        last_id = batch[-1].pk
+        yield batch
+        if checkpoint is not None:
+            checkpoint.save(last_id)
+
+    if checkpoint is not None:
+        checkpoint.clear()
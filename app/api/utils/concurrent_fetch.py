@@ -0,0 +1,55 @@
+# api/utils/concurrent_fetch.py
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """
+    Spaces out requests so that at most `rate` requests per second are sent to
+    any single host. A rate of None (or 0) disables limiting.
+    Safe to share between worker threads.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        if not self.rate:
+            return
+        host = urlparse(url).netloc
+        interval = 1.0 / self.rate
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def fetch_in_order(items, fetch, executor=None):
+    """
+    Call `fetch(item)` for every item and yield (item, result, error) tuples in the
+    same order as `items`.
+
+    With an executor the fetches overlap on its worker threads while results are
+    still handed back in input order, so the caller can keep doing its DB writes
+    sequentially on the main thread. Exceptions raised by `fetch` are returned as
+    `error` instead of aborting the whole batch.
+    """
+
+    def _safe_fetch(item):
+        try:
+            return fetch(item), None
+        except Exception as e:
+            return None, e
+
+    if executor is None:
+        results = map(_safe_fetch, items)
+    else:
+        results = executor.map(_safe_fetch, items)
+    for item, (result, error) in zip(items, results):
+        yield item, result, error
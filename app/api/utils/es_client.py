@@ -0,0 +1,163 @@
+# api/utils/es_client.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from elasticsearch import ApiError, ConnectionError, Elasticsearch, TransportError
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_es_client():
+    """
+    Process-wide Elasticsearch client for request handling, created on first use.
+    Its connection pool is shared by every view and helper, and its short timeouts
+    keep a slow cluster from stalling requests that can fall back to the database.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Elasticsearch(
+                    getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200"),
+                    request_timeout=getattr(settings, "ES_REQUEST_TIMEOUT", 5),
+                    max_retries=getattr(settings, "ES_MAX_RETRIES", 1),
+                    retry_on_timeout=False,
+                    connections_per_node=getattr(settings, "ES_CONNECTIONS_PER_NODE", 10),
+                )
+    return _client
+
+
+class ElasticsearchUnavailable(ConnectionError):
+    """
+    Raised instead of calling Elasticsearch while the circuit breaker is open.
+    Subclasses ConnectionError so existing fallbacks handle it unchanged.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing service for `cooldown` seconds after
+    `failure_threshold` consecutive failures. After the cool-down one call is let
+    through as a probe: success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.stats = {"successes": 0, "failures": 0, "short_circuited": 0, "trips": 0}
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.stats["short_circuited"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.stats["trips"] += 1
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """
+        End a half-open probe that neither succeeded nor failed, so the next call can probe.
+        """
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            state = self.state
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(self.cooldown - (time.monotonic() - self._opened_at), 1)
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown,
+                "retry_in_seconds": retry_in,
+                **self.stats,
+            }
+
+
+es_breaker = CircuitBreaker(
+    failure_threshold=getattr(settings, "ES_BREAKER_FAILURE_THRESHOLD", 3),
+    cooldown=getattr(settings, "ES_BREAKER_COOLDOWN", 30.0),
+)
+
+
+def _is_outage(error):
+    # Connection problems and timeouts, or the cluster answering 5xx
+    if isinstance(error, TransportError):
+        return True
+    return isinstance(error, ApiError) and error.meta.status >= 500
+
+
+@contextmanager
+def es_guard(breaker=es_breaker):
+    """
+    Wrap Elasticsearch calls made while serving a request:
+
+        with es_guard():
+            doc = get_es_client().get(index=..., id=...)
+
+    Raises ElasticsearchUnavailable without touching the network while the
+    breaker is open. Only outages count as failures; errors such as a missing
+    document mean Elasticsearch answered.
+    """
+    if not breaker.allow():
+        raise ElasticsearchUnavailable("Elasticsearch circuit breaker is open")
+    try:
+        yield
+    except Exception as e:
+        if _is_outage(e):
+            breaker.record_failure()
+            if breaker.state != CircuitBreaker.CLOSED:
+                logger.warning(f"Elasticsearch unavailable, skipping it for {breaker.cooldown}s: {e}")
+        else:
+            breaker.record_success()
+        raise
+    except BaseException:
+        # Interrupted (KeyboardInterrupt, SystemExit, gevent Timeout): no verdict on
+        # Elasticsearch, but a probe left open would reject every later call
+        breaker.release_probe()
+        raise
+    breaker.record_success()
@@ -0,0 +1,178 @@
+# api/utils/es_indices.py
+import copy
+import re
+from api.config.es_config import (
+    NAV_INDEX_NAME,
+    NAV_INDEX_MAPPING,
+    NAV_POINTS_INDEX_NAME,
+    NAV_POINTS_INDEX_MAPPING,
+    MUTUALFUND_INDEX_NAME,
+    MUTUALFUND_INDEX_MAPPING,
+)
+from api.models import JobRun
+
+# Each logical index is a read alias (the name the views query) and a write
+# alias over a physical index "<name>_v<N>". A rebuild fills "<name>_v<N+1>"
+# and moves both aliases to it in one atomic request.
+INDEX_DEFINITIONS = {
+    NAV_INDEX_NAME: NAV_INDEX_MAPPING,
+    NAV_POINTS_INDEX_NAME: NAV_POINTS_INDEX_MAPPING,
+    MUTUALFUND_INDEX_NAME: MUTUALFUND_INDEX_MAPPING,
+}
+
+# JobRun command of rebuild_es_indices; drain_es_outbox waits while one is running
+REBUILD_JOB_NAME = "rebuild_es_indices"
+
+# Settings used while bulk loading a new version
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+DEFAULT_NUMBER_OF_REPLICAS = 1
+
+
+def write_alias(name):
+    return f"{name}_write"
+
+
+def versioned_name(name, version):
+    return f"{name}_v{version}"
+
+
+def _version_of(name, index):
+    match = re.fullmatch(re.escape(name) + r"_v(\d+)", index)
+    return int(match.group(1)) if match else None
+
+
+def index_versions(es, name):
+    """
+    Versions of the physical indices that exist for `name`, ascending.
+    """
+    indices = es.indices.get(index=f"{name}_v*", allow_no_indices=True, expand_wildcards="all")
+    return sorted(v for v in (_version_of(name, index) for index in indices) if v is not None)
+
+
+def live_index(es, name):
+    """
+    Physical index currently behind the read alias of `name`, the legacy
+    unversioned index called `name`, or None.
+    """
+    if es.indices.exists_alias(name=name):
+        return next(iter(es.indices.get_alias(name=name)))
+    if es.indices.exists(index=name):
+        return name
+    return None
+
+
+def next_generation(es, names=INDEX_DEFINITIONS):
+    """
+    A version number unused by every index in `names`, so a rebuild
+    creates all of them under the same version.
+    """
+    return max((max(index_versions(es, name), default=0) for name in names), default=0) + 1
+
+
+def write_target(es, name):
+    """
+    Index or alias that writers should use for `name`: the write alias when
+    the versioned layout is set up, the plain name on a legacy install.
+    """
+    alias = write_alias(name)
+    return alias if es.indices.exists_alias(name=alias) else name
+
+
+def create_version(es, name, version, bulk_load=False):
+    """
+    Create the physical index `<name>_v<version>` with the mapping of `name`.
+    With `bulk_load`, refresh and replicas are switched off until finish_bulk_load().
+    """
+    body = copy.deepcopy(INDEX_DEFINITIONS[name])
+    if bulk_load:
+        body.setdefault("settings", {}).setdefault("index", {}).update(BULK_LOAD_SETTINGS)
+    index = versioned_name(name, version)
+    es.indices.create(index=index, body=body)
+    return index
+
+
+def finish_bulk_load(es, index, number_of_replicas=DEFAULT_NUMBER_OF_REPLICAS):
+    """
+    Restore the settings switched off by create_version(bulk_load=True) and
+    make the loaded documents searchable.
+    """
+    es.indices.put_settings(
+        index=index,
+        settings={"index": {"refresh_interval": None, "number_of_replicas": number_of_replicas}},
+    )
+    es.indices.refresh(index=index)
+    es.cluster.health(index=index, wait_for_status="yellow", timeout="5m")
+
+
+def number_of_replicas(es, name):
+    """
+    Replica count of the live index for `name`, so a rebuild keeps it.
+    """
+    index = live_index(es, name)
+    if index is None:
+        return DEFAULT_NUMBER_OF_REPLICAS
+    index_settings = es.indices.get_settings(index=index)[index]["settings"]["index"]
+    return int(index_settings.get("number_of_replicas", DEFAULT_NUMBER_OF_REPLICAS))
+
+
+def swap_alias_actions(es, name, new_index):
+    """
+    update_aliases actions pointing the read and write aliases of `name` at
+    `new_index`. A legacy unversioned index called `name` is removed in the
+    same request, since an alias cannot share a name with an index.
+    """
+    actions = []
+    if es.indices.exists_alias(name=name):
+        for index in es.indices.get_alias(name=name):
+            actions.append({"remove": {"index": index, "alias": name}})
+    elif es.indices.exists(index=name):
+        actions.append({"remove_index": {"index": name}})
+    alias = write_alias(name)
+    if es.indices.exists_alias(name=alias):
+        for index in es.indices.get_alias(name=alias):
+            actions.append({"remove": {"index": index, "alias": alias}})
+    actions.append({"add": {"index": new_index, "alias": name}})
+    actions.append({"add": {"index": new_index, "alias": alias, "is_write_index": True}})
+    return actions
+
+
+def drop_old_versions(es, name, keep):
+    """
+    Delete all but the newest `keep` versions of `name` that are not live.
+    Returns the deleted index names.
+    """
+    live = live_index(es, name)
+    old = [versioned_name(name, v) for v in index_versions(es, name)]
+    old = [index for index in old if index != live]
+    doomed = old[: max(len(old) - keep, 0)]
+    for index in doomed:
+        es.indices.delete(index=index)
+    return doomed
+
+
+def running_rebuild():
+    """
+    JobRun of a rebuild_es_indices that is still loading a new version, or None.
+    """
+    return JobRun.objects.filter(
+        command=REBUILD_JOB_NAME, status=JobRun.STATUS_RUNNING
+    ).first()
+
+
+def sync_target(es, name, version=None):
+    """
+    Where a sync command writes `name`: the physical index of `version`
+    while rebuild_es_indices loads it, otherwise the live write target.
+    """
+    if version is not None:
+        return versioned_name(name, version)
+    return write_target(es, name)
+
+
+def add_index_version_argument(parser):
+    parser.add_argument(
+        "--index-version",
+        type=int,
+        default=None,
+        help="Write to the physical '<index>_v<N>' indices instead of the live aliases (used by rebuild_es_indices).",
+    )
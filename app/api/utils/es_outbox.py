@@ -0,0 +1,72 @@
+# api/utils/es_outbox.py
+from collections import defaultdict
+from django.db.models import Q
+from django.utils import timezone
+from api.models import EsOutbox
+
+# MutualFund fields that end up in an Elasticsearch document
+ES_DOCUMENT_FIELDS = {
+    "mf_name",
+    "mf_schema_code",
+    "start_date",
+    "AUM",
+    "exit_load",
+    "expense_ratio",
+    "type",
+    "latest_nav",
+    "latest_nav_date",
+    "isin_growth",
+}
+
+
+def enqueue_es_sync(isins, revised_since=None):
+    """
+    Mark `isins` for the next drain_es_outbox run with one upsert.
+
+    `revised_since` maps ISINs whose existing NAVs were overwritten to the
+    earliest revised date; an entry keeps the earliest date it is given.
+    """
+    revised_since = revised_since or {}
+    now = timezone.now()
+    rows = [
+        EsOutbox(isin=isin, enqueued_at=now, revised_since=revised_since.get(isin))
+        for isin in set(isins) | set(revised_since)
+        if isin
+    ]
+    if not rows:
+        return 0
+    EsOutbox.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["isin"],
+        update_fields=["enqueued_at"],
+    )
+    # Revisions are rare, so one update per distinct date is fine
+    by_date = defaultdict(list)
+    for isin, since in revised_since.items():
+        by_date[since].append(isin)
+    for since, date_isins in by_date.items():
+        EsOutbox.objects.filter(
+            Q(revised_since__isnull=True) | Q(revised_since__gt=since),
+            isin__in=date_isins,
+        ).update(revised_since=since)
+    return len(rows)
+
+
+def earliest_dates(rows):
+    """
+    {isin: earliest date} of (isin, date, nav) rows.
+    """
+    earliest = {}
+    for isin, nav_date, _ in rows:
+        if isin not in earliest or nav_date < earliest[isin]:
+            earliest[isin] = nav_date
+    return earliest
+
+
+def touches_es_document(update_fields):
+    """
+    Whether a save with `update_fields` (None for a full save) can change
+    a fund's Elasticsearch documents.
+    """
+    return update_fields is None or not ES_DOCUMENT_FIELDS.isdisjoint(update_fields)
@@ -0,0 +1,229 @@
+# api/utils/es_sync.py
+from collections import defaultdict
+from datetime import date, timedelta
+from django.db.models import Q
+from elasticsearch.helpers import streaming_bulk
+from api.models import FundHistoricalNAV
+from api.utils.nav_points import nav_point_actions
+from api.utils.risk_metrics import LOOKBACK_DAYS, calculate_risk_metrics_batch
+from api.utils.returns import (
+    calculate_returns_batch,
+    current_snapshot_returns,
+    load_nav_histories,
+    returns_for_funds,
+)
+
+
+def mutual_fund_document(fund, returns):
+    """
+    Document stored in MUTUALFUND_INDEX_NAME for `fund`.
+    """
+    return {
+        "isin": fund.isin_growth,
+        "mf_name": fund.mf_name,
+        "mf_schema_code": fund.mf_schema_code,
+        "start_date": fund.start_date.isoformat() if fund.start_date else None,
+        "aum": float(fund.AUM) if fund.AUM else None,
+        "exit_load": fund.exit_load,
+        "expense_ratio": fund.expense_ratio if fund.expense_ratio else None,
+        "type": fund.type,
+        "latest_nav": float(fund.latest_nav) if fund.latest_nav else None,
+        "latest_nav_date": fund.latest_nav_date.isoformat()
+        if fund.latest_nav_date
+        else None,
+        "returns": returns,
+    }
+
+
+def mutual_fund_actions(funds, index_name):
+    """
+    Bulk actions upserting the MUTUALFUND_INDEX_NAME documents of a batch of funds.
+    Returns come from current FundReturnsSnapshot rows; funds without one have
+    their NAV history read with one query for the whole batch.
+
+    Partial-document upserts leave fields written by other commands in place.
+    """
+    funds = [f for f in funds if f.isin_growth]
+    batch_returns = returns_for_funds(funds)
+    for fund in funds:
+        returns = batch_returns[fund.id]
+        yield {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": fund.isin_growth,
+            "doc": mutual_fund_document(fund, returns),
+            "doc_as_upsert": True,
+        }
+
+
+def fetch_last_synced_dates(es, index_name, isins):
+    """
+    One mget for the `last_updated_date` of each ISIN's NAV history document,
+    without returning the history itself. ISINs without a document map to None.
+    """
+    response = es.mget(
+        index=index_name, ids=list(isins), source_includes=["last_updated_date"]
+    )
+    last_dates = {}
+    for doc in response["docs"]:
+        source = doc.get("_source") if doc.get("found") else None
+        last_date = source.get("last_updated_date") if source else None
+        last_dates[doc["_id"]] = date.fromisoformat(last_date[:10]) if last_date else None
+    return last_dates
+
+
+def load_new_nav_rows(last_dates):
+    """
+    NAV rows newer than each ISIN's last synced date, for all ISINs in one query.
+    ISINs that share a last synced date are grouped into a single condition.
+    Returns {isin: [(date, nav), ...]} sorted by date.
+    """
+    by_last_date = defaultdict(list)
+    for isin, last_date in last_dates.items():
+        by_last_date[last_date].append(isin)
+
+    condition = Q()
+    for last_date, isins in by_last_date.items():
+        if last_date is None:
+            condition |= Q(isin_growth__in=isins)
+        else:
+            condition |= Q(isin_growth__in=isins, date__gt=last_date)
+
+    new_rows = defaultdict(list)
+    if not by_last_date:
+        return new_rows
+    rows = (
+        FundHistoricalNAV.objects.filter(condition)
+        .order_by("isin_growth", "date")
+        .values_list("isin_growth", "date", "nav")
+    )
+    for isin, nav_date, nav in rows.iterator(chunk_size=10000):
+        new_rows[isin].append((nav_date, nav))
+    return new_rows
+
+
+def nav_point_batch_actions(new_rows, index_name):
+    """
+    Bulk actions writing the new NAV rows of a batch as time-series points.
+    """
+    for isin, rows in new_rows.items():
+        yield from nav_point_actions(isin, rows, index_name)
+
+
+def nav_summary_actions(funds, index_name, last_dates, new_rows):
+    """
+    Bulk actions moving each fund's `last_updated_date` forward and refreshing its
+    returns in the NAV index. Funds without new rows are left out; re-sent revised
+    rows never move the date back. Returns come from current snapshots, else from
+    one history query covering the rest.
+    """
+    changed = [f for f in funds if new_rows.get(f.isin_growth)]
+    batch_returns = current_snapshot_returns(changed)
+    stale = [f for f in changed if f.id not in batch_returns]
+    # Never-synced funds already have their full history in new_rows
+    histories = load_nav_histories(
+        f.isin_growth for f in stale if last_dates.get(f.isin_growth) is not None
+    )
+    batch_returns.update(
+        calculate_returns_batch(
+            (
+                f.id,
+                histories.get(f.isin_growth) or new_rows[f.isin_growth],
+                f.latest_nav,
+                f.latest_nav_date,
+            )
+            for f in stale
+        )
+    )
+    for fund in changed:
+        isin = fund.isin_growth
+        rows = new_rows[isin]
+        last_date = max(rows[-1][0], last_dates.get(isin) or rows[-1][0])
+        returns = batch_returns[fund.id]
+        yield {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": isin,
+            "doc": {
+                "isin": isin,
+                "last_updated_date": last_date.isoformat(),
+                "returns": returns,
+            },
+            "doc_as_upsert": True,
+        }
+
+
+def risk_metric_actions(funds, index_name):
+    """
+    Bulk actions writing the risk metrics of a batch of funds into their
+    MUTUALFUND_INDEX_NAME documents. The lookback of the whole batch is read with
+    one query and the metrics computed in one vectorised pass.
+    """
+    funds = [f for f in funds if f.isin_growth and f.latest_nav_date]
+    if not funds:
+        return
+    since = min(f.latest_nav_date for f in funds) - timedelta(days=LOOKBACK_DAYS)
+    histories = load_nav_histories((f.isin_growth for f in funds), since=since)
+    batch_metrics = calculate_risk_metrics_batch(
+        (f.id, histories.get(f.isin_growth)) for f in funds
+    )
+    for fund in funds:
+        yield {
+            "_op_type": "update",
+            "_index": index_name,
+            "_id": fund.isin_growth,
+            "doc": {"risk_metrics": batch_metrics[fund.id] or None},
+            "doc_as_upsert": True,
+        }
+
+
+def bulk_results(es, actions, chunk_size, on_error=None):
+    """
+    streaming_bulk that keeps going on item errors and hands each failed
+    item's result to `on_error`.
+    """
+    for ok, item in streaming_bulk(
+        es, actions, chunk_size=chunk_size, raise_on_error=False
+    ):
+        if not ok and on_error is not None:
+            on_error(next(iter(item.values())))
+        yield ok, item
+
+
+def sync_nav_batch(
+    es, index_name, points_index_name, funds, chunk_size, on_error=None, revised_since=None
+):
+    """
+    Write the new NAV records of a batch of funds as time-series points, then
+    move their `last_updated_date` forward and refresh their returns: one mget,
+    two DB queries and the bulk requests. A fund whose points failed keeps its
+    old `last_updated_date`, so the next run sends them again.
+
+    `revised_since` ({isin: date}, from the outbox) re-sends a fund's points from
+    that date on, overwriting NAVs revised after they were synced.
+
+    Returns (synced_isins, failed_isins); funds in neither had no new records.
+    """
+    isins = [f.isin_growth for f in funds]
+    last_dates = fetch_last_synced_dates(es, index_name, isins)
+    send_after = dict(last_dates)
+    for isin, since in (revised_since or {}).items():
+        if send_after.get(isin) is not None and since <= send_after[isin]:
+            send_after[isin] = since - timedelta(days=1)
+    new_rows = load_new_nav_rows(send_after)
+
+    failed_isins = set()
+    points = nav_point_batch_actions(new_rows, points_index_name)
+    for ok, item in bulk_results(es, points, chunk_size, on_error):
+        if not ok:
+            failed_isins.add(item["index"]["_id"].split(":", 1)[0])
+
+    synced_funds = [f for f in funds if f.isin_growth not in failed_isins]
+    actions = nav_summary_actions(synced_funds, index_name, last_dates, new_rows)
+    synced_isins = set()
+    for ok, item in bulk_results(es, actions, chunk_size, on_error):
+        if ok:
+            synced_isins.add(item["update"]["_id"])
+        else:
+            failed_isins.add(item["update"]["_id"])
+    return synced_isins, failed_isins
@@ -0,0 +1,233 @@
+# api/utils/http_client.py
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the external-data commands and views.
+
+    - keep-alive connection pooling through a single requests.Session
+    - at most `max_per_host` requests in flight per host, across threads
+    - exponential backoff retries on connection errors, 429 and 5xx (honours Retry-After)
+    - optional on-disk cache that revalidates with If-None-Match / If-Modified-Since,
+      so an unchanged upstream response costs a 304 instead of the full body
+    """
+
+    def __init__(
+        self,
+        cache_dir=None,
+        max_per_host=8,
+        pool_size=32,
+        retries=3,
+        backoff_factor=0.5,
+        timeout=10,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._host_slots = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {
+                "requests": 0,
+                "cache_hits": 0,
+                "bytes_downloaded": 0,
+                "bytes_saved": 0,
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def get(self, url, timeout=None, use_cache=True, stream=False, **kwargs):
+        """
+        GET `url` and return a requests.Response. Streaming requests skip the cache
+        and keep their host slot until the response is closed, so use them as a
+        context manager. Responses served from the cache after a 304 have
+        `from_cache = True`.
+        """
+        cache_entry = None
+        headers = dict(kwargs.pop("headers", None) or {})
+        use_cache = use_cache and not stream and self.cache_dir is not None
+        if use_cache:
+            cache_entry = self._read_cache(url)
+            if cache_entry:
+                meta = cache_entry[0]
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+
+        slot = self._host_slot(url)
+        slot.acquire()
+        try:
+            resp = self.session.get(
+                url,
+                timeout=timeout or self.timeout,
+                headers=headers,
+                stream=stream,
+                **kwargs,
+            )
+        except BaseException:
+            slot.release()
+            raise
+        self._count(requests=1)
+        if stream:
+            resp.close = self._releasing(resp.close, slot)
+            return resp
+        slot.release()
+
+        if resp.status_code == 304 and cache_entry:
+            meta, body = cache_entry
+            self._count(cache_hits=1, bytes_saved=len(body))
+            return self._cached_response(url, meta, body)
+
+        resp.from_cache = False
+        self._count(bytes_downloaded=len(resp.content))
+        if use_cache and resp.status_code == 200:
+            self._write_cache(url, resp)
+        return resp
+
+    @staticmethod
+    def _releasing(close, slot):
+        # Acquired by the first close, so the slot is released exactly once
+        released = threading.Lock()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if released.acquire(blocking=False):
+                    slot.release()
+
+        return close_and_release
+
+    def summary(self, since=None):
+        """
+        One-line summary of the stats, or of the requests made after the
+        `since` snapshot.
+        """
+        stats = self.snapshot()
+        if since is not None:
+            stats = {key: value - since.get(key, 0) for key, value in stats.items()}
+        requests_made = stats["requests"]
+        hit_rate = (stats["cache_hits"] / requests_made * 100) if requests_made else 0
+        return (
+            f"HTTP: {requests_made} requests, {stats['cache_hits']} cache hits "
+            f"({hit_rate:.1f}%), {stats['bytes_downloaded'] / 1024:.1f} KiB downloaded, "
+            f"{stats['bytes_saved'] / 1024:.1f} KiB saved."
+        )
+
+    # --- On-disk cache ---
+
+    def _cache_paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def _read_cache(self, url):
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+            with open(body_path, "rb") as fh:
+                body = fh.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def _write_cache(self, url, resp):
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return  # Nothing to revalidate with
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": resp.encoding,
+            "headers": {"Content-Type": resp.headers.get("Content-Type", "")},
+        }
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write to temp files and rename, so concurrent readers never see partial data
+            for path, data, mode in (
+                (body_path, resp.content, "wb"),
+                (meta_path, json.dumps(meta), "w"),
+            ):
+                tmp_path = path.with_suffix(f"{path.suffix}.{threading.get_ident()}.tmp")
+                with open(tmp_path, mode) as fh:
+                    fh.write(data)
+                os.replace(tmp_path, path)
+        except OSError:
+            pass  # The cache is best-effort
+
+    def _cached_response(self, url, meta, body):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = body
+        resp.headers = CaseInsensitiveDict(meta.get("headers") or {})
+        resp.encoding = meta.get("encoding")
+        resp.url = url
+        resp.from_cache = True
+        return resp
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """
+    Return the process-wide HttpClient, creating it from settings on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient(
+                    cache_dir=getattr(settings, "HTTP_CACHE_DIR", None),
+                    max_per_host=getattr(settings, "HTTP_MAX_CONNECTIONS_PER_HOST", 8),
+                )
+    return _client
@@ -0,0 +1,109 @@
+# api/utils/job_runs.py
+from time import time
+from django.core.management.base import CommandError
+from django.utils import timezone
+from api.models import JobRun
+
+
+class JobRunTracker:
+    """
+    Records the progress of a management command in a JobRun row.
+
+    Doubles as the checkpoint for iter_keyset_batches: load() returns the last
+    processed id of the run, and save() persists it together with the current
+    counts and timings after every completed batch.
+    """
+
+    def __init__(self, run):
+        self.run = run
+        self.counts = dict(run.counts or {})
+        self.timings = dict(run.timings or {})
+        # Time spent by earlier attempts of a resumed run
+        self._previous_elapsed = self.timings.get("elapsed_seconds", 0)
+        self._started = time()
+
+    @classmethod
+    def start(cls, command, resume=False, run_id=None):
+        """
+        Start a new run of `command`, or with `resume` continue the given run
+        (or the most recent unfinished one) from its last checkpoint. A `run_id`
+        that matches no unfinished run raises CommandError instead of starting over.
+        """
+        run = None
+        if resume:
+            runs = JobRun.objects.filter(command=command).exclude(
+                status=JobRun.STATUS_COMPLETED
+            )
+            if run_id is not None:
+                runs = runs.filter(id=run_id)
+            run = runs.first()
+            if run is None and run_id is not None:
+                raise CommandError(f"run {run_id} not found or already completed")
+        if run is None:
+            run = JobRun.objects.create(command=command)
+        else:
+            run.status = JobRun.STATUS_RUNNING
+            run.error = None
+            run.save(update_fields=["status", "error", "updated_at"])
+        return cls(run)
+
+    @property
+    def resumed(self):
+        return self.run.last_processed_id is not None
+
+    def add(self, **increments):
+        for key, value in increments.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def add_time(self, key, seconds):
+        self.timings[key] = round(self.timings.get(key, 0) + seconds, 3)
+
+    def _sync(self):
+        self.timings["elapsed_seconds"] = round(
+            self._previous_elapsed + time() - self._started, 3
+        )
+        self.run.counts = self.counts
+        self.run.timings = self.timings
+
+    # --- Checkpoint protocol used by iter_keyset_batches ---
+
+    def load(self):
+        return self.run.last_processed_id
+
+    def save(self, last_id):
+        self.run.last_processed_id = last_id
+        self._sync()
+        self.run.save(
+            update_fields=["last_processed_id", "counts", "timings", "updated_at"]
+        )
+
+    def clear(self):
+        # Keep the last position on the row for inspection; finish() marks it done
+        pass
+
+    def finish(self, status=JobRun.STATUS_COMPLETED, error=None):
+        self._sync()
+        self.run.status = status
+        self.run.error = error
+        self.run.finished_at = timezone.now()
+        self.run.save()
+
+
+def describe_run(run):
+    """
+    Human readable summary of a JobRun, used by the --run-id option.
+    """
+    lines = [
+        f"Run #{run.id} of {run.command}: {run.status}",
+        f"  started:  {run.started_at}",
+        f"  updated:  {run.updated_at}",
+        f"  finished: {run.finished_at or '-'}",
+        f"  last processed fund id: {run.last_processed_id if run.last_processed_id is not None else '-'}",
+    ]
+    for key, value in sorted((run.counts or {}).items()):
+        lines.append(f"  {key}: {value}")
+    for key, value in sorted((run.timings or {}).items()):
+        lines.append(f"  {key}: {value}s")
+    if run.error:
+        lines.append(f"  error: {run.error}")
+    return "\n".join(lines)
@@ -0,0 +1,43 @@
+# api/utils/mfapi.py
+from datetime import date
+
+
+def parse_nav_date(value):
+    """
+    Parse an mfapi 'DD-MM-YYYY' date by slicing the fixed positions, which is
+    several times faster than datetime.strptime. Raises ValueError on malformed input.
+    """
+    if len(value) != 10 or value[2] != "-" or value[5] != "-":
+        raise ValueError(f"Invalid NAV date: {value!r}")
+    return date(int(value[6:10]), int(value[3:5]), int(value[0:2]))
+
+
+def parse_nav_value(value):
+    return float(value.replace(",", ""))  # in case commas present
+
+
+def iter_nav_entries(entries, since=None):
+    """
+    Yield (date, nav) for mfapi NAV entries, which arrive newest-first.
+
+    When `since` is given, parsing stops at the first entry dated on or before it,
+    so an incremental run only pays for the new rows instead of the full history.
+    Incomplete or malformed entries are skipped.
+    """
+    for entry in entries:
+        # entry: {'date': '24-07-2025', 'nav': '52.18300'}
+        dt_str = entry.get("date")
+        nav_str = entry.get("nav")
+        if not (dt_str and nav_str):
+            continue  # skip incomplete entries
+        try:
+            dt_obj = parse_nav_date(dt_str)
+        except ValueError:
+            continue  # skip malformed data
+        if since and dt_obj <= since:
+            break  # Everything from here on is already stored
+        try:
+            nav_val = parse_nav_value(nav_str)
+        except ValueError:
+            continue
+        yield dt_obj, nav_val
@@ -0,0 +1,85 @@
+# api/utils/nav_points.py
+from datetime import date
+from decimal import Decimal
+from elasticsearch import NotFoundError
+from api.config.es_config import NAV_POINTS_INDEX_NAME
+
+# Largest number of points returned by one search (index.max_result_window);
+# longer ranges are read in pages of this size
+MAX_POINTS_PER_SEARCH = 10000
+
+
+def nav_point_id(isin, nav_date):
+    if isinstance(nav_date, date):
+        nav_date = nav_date.isoformat()
+    return f"{isin}:{nav_date}"
+
+
+def nav_point_actions(isin, rows, index_name=NAV_POINTS_INDEX_NAME):
+    """
+    Bulk index actions for (date, nav) rows of one ISIN. Re-sending a point
+    overwrites it, so revised NAVs and retries are idempotent.
+    """
+    for nav_date, nav in rows:
+        nav_date = nav_date.isoformat() if isinstance(nav_date, date) else nav_date
+        yield {
+            "_op_type": "index",
+            "_index": index_name,
+            "_id": nav_point_id(isin, nav_date),
+            "_routing": isin,
+            "_source": {"isin": isin, "date": nav_date, "nav": float(nav)},
+        }
+
+
+def get_nav_point(es, isin, nav_date, index_name=NAV_POINTS_INDEX_NAME):
+    """
+    NAV of `isin` on `nav_date` as a Decimal, or None if there is no point.
+    A single routed get by id.
+    """
+    try:
+        doc = es.get(
+            index=index_name, id=nav_point_id(isin, nav_date), routing=isin
+        )
+    except NotFoundError:
+        return None
+    return Decimal(str(doc["_source"]["nav"]))
+
+
+def search_nav_points(es, isin, start=None, end=None, index_name=NAV_POINTS_INDEX_NAME):
+    """
+    (date, Decimal nav) points of `isin` between `start` and `end` inclusive,
+    oldest first, read from the fund's shard only. Ranges with more than
+    MAX_POINTS_PER_SEARCH points are paged with search_after on the date,
+    which is unique per ISIN.
+    """
+    date_range = {}
+    if start:
+        date_range["gte"] = start.isoformat()
+    if end:
+        date_range["lte"] = end.isoformat()
+    filters = [{"term": {"isin": isin}}]
+    if date_range:
+        filters.append({"range": {"date": date_range}})
+    points = []
+    search_after = None
+    while True:
+        response = es.search(
+            index=index_name,
+            routing=isin,
+            query={"bool": {"filter": filters}},
+            sort=[{"date": {"order": "asc"}}],
+            source_includes=["date", "nav"],
+            size=MAX_POINTS_PER_SEARCH,
+            search_after=search_after,
+        )
+        hits = response["hits"]["hits"]
+        points.extend(
+            (
+                date.fromisoformat(hit["_source"]["date"][:10]),
+                Decimal(str(hit["_source"]["nav"])),
+            )
+            for hit in hits
+        )
+        if len(hits) < MAX_POINTS_PER_SEARCH:
+            return points
+        search_after = hits[-1]["sort"]
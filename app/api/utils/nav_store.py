@@ -0,0 +1,235 @@
+# api/utils/nav_store.py
+import logging
+import threading
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from elasticsearch import ApiError, TransportError
+from api.models import MutualFund
+from api.utils.es_client import es_guard, get_es_client
+from api.utils.nav_points import search_nav_points
+from api.utils.returns import load_nav_histories
+
+logger = logging.getLogger(__name__)
+
+# FundHistoricalNAV.nav has 4 decimal places, so NAVs fit in int64 as ten-thousandths
+NAV_PLACES = 4
+
+
+class CompactSeries:
+    """
+    One fund's NAV history as two int64 arrays: day ordinals and NAVs in
+    ten-thousandths. 16 bytes per point instead of a list of tuples.
+    """
+
+    __slots__ = ("days", "ticks", "version")
+
+    def __init__(self, points, version=None):
+        self.days = np.fromiter((d.toordinal() for d, _ in points), dtype=np.int64, count=len(points))
+        self.ticks = np.fromiter(
+            (int(Decimal(n).scaleb(NAV_PLACES).to_integral_value()) for _, n in points),
+            dtype=np.int64,
+            count=len(points),
+        )
+        # latest_nav_date of the fund when the series was loaded
+        self.version = version
+
+    @property
+    def nbytes(self):
+        return self.days.nbytes + self.ticks.nbytes
+
+    def point(self, i):
+        return date.fromordinal(int(self.days[i])), Decimal(int(self.ticks[i])).scaleb(-NAV_PLACES)
+
+    def between(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.days, start.toordinal(), side="left")
+        hi = len(self.days) if end is None else np.searchsorted(self.days, end.toordinal(), side="right")
+        return [self.point(i) for i in range(lo, hi)]
+
+
+class DbNavBackend:
+    """
+    Reads NAV histories from FundHistoricalNAV; many ISINs in one query.
+    """
+
+    name = "db"
+
+    def load_many(self, versions):
+        histories = load_nav_histories(list(versions))
+        return {isin: histories.get(isin, []) for isin in versions}
+
+
+class EsNavBackend:
+    """
+    Reads NAV histories from the time-series points index, one routed search per
+    ISIN. ISINs it cannot serve completely (cluster unavailable, index missing,
+    no points, or points ending before the fund's latest_nav_date because the
+    outbox has not been drained yet) are left for the next backend.
+    """
+
+    name = "es"
+
+    def load_many(self, versions):
+        histories = {}
+        for isin, latest_nav_date in versions.items():
+            try:
+                with es_guard():
+                    points = search_nav_points(get_es_client(), isin)
+            except (TransportError, ApiError) as e:
+                logger.warning(f"Could not read NAVs of {isin} from Elasticsearch: {e}")
+                break
+            if not points:
+                continue
+            if latest_nav_date is None or points[-1][0] >= latest_nav_date:
+                histories[isin] = points
+        return histories
+
+
+class NavSeriesStore:
+    """
+    Single entry point for reading NAV history. Series come from the first
+    backend that has them (Elasticsearch, then the database, by default) and
+    are kept in a size-bounded LRU cache of CompactSeries.
+
+    A cached series is reused while its fund's latest_nav_date is unchanged;
+    pass `latest_nav_date` when the caller already has the fund, otherwise it is
+    looked up with one small query.
+    """
+
+    def __init__(self, backends=None, max_bytes=None):
+        self.backends = backends if backends is not None else [EsNavBackend(), DbNavBackend()]
+        self.max_bytes = (
+            max_bytes
+            if max_bytes is not None
+            else getattr(settings, "NAV_STORE_MAX_BYTES", 64 * 1024 * 1024)
+        )
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_series(self, isin, start=None, end=None, latest_nav_date=None):
+        """
+        (date, Decimal nav) pairs of `isin` between `start` and `end` inclusive, oldest first.
+        """
+        return self._series({isin: latest_nav_date})[isin].between(start, end)
+
+    def get_series_bulk(self, latest_nav_dates, start=None, end=None):
+        """
+        {isin: (date, nav) pairs between `start` and `end`} for many funds, given
+        as {isin: latest_nav_date or None}; series missing from the cache are
+        loaded together.
+        """
+        series = self._series(dict(latest_nav_dates))
+        return {isin: s.between(start, end) for isin, s in series.items()}
+
+    def nav_on(self, isin, nav_date, latest_nav_date=None):
+        """
+        NAV of `isin` on exactly `nav_date`, or None.
+        """
+        series = self._series({isin: latest_nav_date})[isin]
+        i = np.searchsorted(series.days, nav_date.toordinal(), side="left")
+        if i < len(series.days) and series.days[i] == nav_date.toordinal():
+            return series.point(i)[1]
+        return None
+
+    def nav_on_or_after(self, isin, nav_date, latest_nav_date=None):
+        """
+        (date, nav) of the first NAV of `isin` on or after `nav_date`, or None.
+        """
+        series = self._series({isin: latest_nav_date})[isin]
+        i = np.searchsorted(series.days, nav_date.toordinal(), side="left")
+        return series.point(i) if i < len(series.days) else None
+
+    def navs_bulk(self, pairs):
+        """
+        {(isin, date): NAV on that exact date or None} for many pairs; series
+        missing from the cache are loaded together.
+        """
+        pairs = list(pairs)
+        series = self._series({isin: None for isin, _ in pairs})
+        navs = {}
+        for isin, nav_date in pairs:
+            days = series[isin].days
+            i = np.searchsorted(days, nav_date.toordinal(), side="left")
+            found = i < len(days) and days[i] == nav_date.toordinal()
+            navs[(isin, nav_date)] = series[isin].point(i)[1] if found else None
+        return navs
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "series": len(self._cache),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self.stats,
+            }
+
+    def _series(self, versions):
+        """
+        {isin: CompactSeries} for the ISINs in `versions` ({isin: latest_nav_date
+        or None to look it up}), loading stale or missing ones.
+        """
+        unknown = [isin for isin, version in versions.items() if version is None]
+        if unknown:
+            versions.update(
+                MutualFund.objects.filter(isin_growth__in=unknown).values_list(
+                    "isin_growth", "latest_nav_date"
+                )
+            )
+
+        result, missing = {}, []
+        with self._lock:
+            for isin, version in versions.items():
+                entry = self._cache.get(isin)
+                if entry is not None and version is not None and entry.version == version:
+                    self._cache.move_to_end(isin)
+                    self.stats["hits"] += 1
+                    result[isin] = entry
+                else:
+                    self.stats["misses"] += 1
+                    missing.append(isin)
+        if missing:
+            for isin, points in self._load({isin: versions[isin] for isin in missing}).items():
+                series = CompactSeries(points, versions[isin])
+                result[isin] = series
+                # Funds unknown to the database are served but not cached
+                if versions[isin] is not None:
+                    self._put(isin, series)
+        return result
+
+    def _load(self, versions):
+        loaded = {}
+        remaining = dict(versions)
+        for backend in self.backends:
+            if not remaining:
+                break
+            loaded.update(backend.load_many(remaining))
+            remaining = {isin: v for isin, v in remaining.items() if isin not in loaded}
+        for isin in remaining:
+            loaded[isin] = []
+        return loaded
+
+    def _put(self, isin, series):
+        with self._lock:
+            old = self._cache.pop(isin, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            if series.nbytes > self.max_bytes:
+                return
+            self._cache[isin] = series
+            self._bytes += series.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.stats["evictions"] += 1
+
+
+nav_store = NavSeriesStore()
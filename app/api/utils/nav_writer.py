@@ -0,0 +1,126 @@
+# api/utils/nav_writer.py
+import csv
+import io
+from django.db import connection, transaction, IntegrityError
+from api.models import FundHistoricalNAV
+from api.utils.es_outbox import earliest_dates, enqueue_es_sync
+
+CHUNK_SIZE = 5000
+
+
+def _dedupe(rows):
+    """
+    Collapse rows to one per (isin, date); the last value wins.
+    """
+    unique = {}
+    for isin, nav_date, nav in rows:
+        unique[(isin, nav_date)] = nav
+    return [(isin, nav_date, nav) for (isin, nav_date), nav in unique.items()]
+
+
+def _enqueue(rows, update_existing):
+    enqueue_es_sync(
+        (isin for isin, _, _ in rows),
+        revised_since=earliest_dates(rows) if update_existing else None,
+    )
+
+
+def bulk_upsert_navs(rows, update_existing=False, chunk_size=CHUNK_SIZE):
+    """
+    Write (isin_growth, date, nav) rows to FundHistoricalNAV in large chunks.
+
+    Existing (isin_growth, date) rows are left alone unless `update_existing` is set,
+    in which case their nav is overwritten. On PostgreSQL the rows are COPY'd into a
+    temporary staging table and merged with INSERT ... ON CONFLICT; other databases
+    use bulk_create with conflict handling.
+
+    The ISINs written are queued in the Elasticsearch outbox; with
+    `update_existing` the earliest date per ISIN is queued as revised, so the
+    overwritten points are re-sent.
+
+    Returns the number of rows sent to the database.
+    """
+    rows = _dedupe(rows)
+    if not rows:
+        return 0
+    if connection.vendor == "postgresql":
+        return _copy_upsert_postgres(rows, update_existing)
+
+    objs = [
+        FundHistoricalNAV(isin_growth=isin, date=nav_date, nav=nav)
+        for isin, nav_date, nav in rows
+    ]
+    with transaction.atomic():
+        for start in range(0, len(objs), chunk_size):
+            chunk = objs[start : start + chunk_size]
+            if update_existing:
+                FundHistoricalNAV.objects.bulk_create(
+                    chunk,
+                    update_conflicts=True,
+                    unique_fields=["isin_growth", "date"],
+                    update_fields=["nav"],
+                )
+            else:
+                FundHistoricalNAV.objects.bulk_create(chunk, ignore_conflicts=True)
+        _enqueue(rows, update_existing)
+    return len(rows)
+
+
+def _copy_upsert_postgres(rows, update_existing):
+    table = FundHistoricalNAV._meta.db_table
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for isin, nav_date, nav in rows:
+        writer.writerow([isin, nav_date.isoformat(), nav])
+    buffer.seek(0)
+
+    if update_existing:
+        conflict_action = (
+            f"DO UPDATE SET nav = EXCLUDED.nav "
+            f"WHERE {table}.nav IS DISTINCT FROM EXCLUDED.nav"
+        )
+    else:
+        conflict_action = "DO NOTHING"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE nav_staging ("
+            "isin_growth varchar(20), date date, nav numeric(20, 4)"
+            ") ON COMMIT DROP"
+        )
+        cursor.copy_expert(
+            "COPY nav_staging (isin_growth, date, nav) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            f"INSERT INTO {table} (isin_growth, date, nav) "
+            f"SELECT isin_growth, date, nav FROM nav_staging "
+            f"ON CONFLICT (isin_growth, date) {conflict_action}"
+        )
+        # ON COMMIT DROP only fires at the outermost commit; drop it now so a
+        # caller's enclosing transaction can write again
+        cursor.execute("DROP TABLE nav_staging")
+        _enqueue(rows, update_existing)
+    return len(rows)
+
+
+def upsert_navs_row_by_row(rows, update_existing=False):
+    """
+    The original one-query-per-row write path, kept for comparison runs.
+    """
+    rows = _dedupe(rows)
+    for isin, nav_date, nav in rows:
+        try:
+            if update_existing:
+                FundHistoricalNAV.objects.update_or_create(
+                    isin_growth=isin, date=nav_date, defaults={"nav": nav}
+                )
+            else:
+                FundHistoricalNAV.objects.get_or_create(
+                    isin_growth=isin, date=nav_date, defaults={"nav": nav}
+                )
+        except IntegrityError:
+            # Already exists
+            pass
+    _enqueue(rows, update_existing)
+    return len(rows)
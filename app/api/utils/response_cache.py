@@ -0,0 +1,231 @@
+# api/utils/response_cache.py
+import hashlib
+import threading
+import uuid
+from datetime import date
+from collections import defaultdict, namedtuple
+from functools import wraps
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+from api.models import MutualFund
+
+# ?nocache=1 skips the cache for one request, for debugging
+BYPASS_PARAM = "nocache"
+CATALOGUE_VERSION_KEY = "response:catalogue-version"
+
+
+class ResponseCacheStats:
+    """
+    Per-process hit/miss/bypass counters of the cached endpoints.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {"hits": 0, "misses": 0, "bypassed": 0})
+
+    def record(self, namespace, outcome):
+        with self._lock:
+            self._counts[namespace][outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {namespace: dict(counts) for namespace, counts in self._counts.items()}
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+# What a cached or conditional response depends on: the newest NAV date and when
+# NAVs were last refreshed
+NavState = namedtuple("NavState", ["latest_nav_date", "nav_last_updated"])
+
+
+def fund_nav_state(request, **lookup):
+    """
+    NavState of the fund matching `lookup`, or None when it is unknown. Memoised
+    on the request, so the conditional-GET check and the response cache share
+    one small query.
+    """
+    if None in lookup.values():
+        return None
+    memo = request.__dict__.setdefault("_nav_states", {})
+    key = tuple(sorted(lookup.items()))
+    if key not in memo:
+        row = (
+            MutualFund.objects.filter(**lookup)
+            .values_list("latest_nav_date", "nav_last_updated")
+            .first()
+        )
+        memo[key] = NavState(*row) if row else None
+    return memo[key]
+
+
+def catalogue_nav_state(request):
+    """
+    NavState of the whole catalogue (newest dates of any fund), for responses
+    covering many funds.
+    """
+    memo = request.__dict__.setdefault("_nav_states", {})
+    if None not in memo:
+        memo[None] = NavState(
+            **MutualFund.objects.aggregate(
+                latest_nav_date=Max("latest_nav_date"),
+                nav_last_updated=Max("nav_last_updated"),
+            )
+        )
+    return memo[None]
+
+
+def mark_served_nav_date(response, nav_date):
+    """
+    Record on `response` the latest_nav_date of the data it was built from (a
+    date or ISO string), e.g. of the Elasticsearch document served. Responses
+    built from data older than the database's latest_nav_date (Elasticsearch
+    not yet drained) are not cached.
+    """
+    if isinstance(nav_date, str):
+        nav_date = date.fromisoformat(nav_date[:10])
+    response.served_nav_date = nav_date
+    return response
+
+
+def _response_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def catalogue_version(request):
+    """
+    Token that changes whenever fund documents change other than by a new NAV
+    date: MutualFund saves and deletes, and every drain of the Elasticsearch
+    outbox. It is part of every cache key and ETag, so edited fields (AUM, exit
+    load, returns) and newly drained documents are served at once. Memoised on
+    the request.
+    """
+    memo = request.__dict__
+    if "_catalogue_version" not in memo:
+        # A token rather than a counter: if it is evicted, every entry is dropped
+        memo["_catalogue_version"] = _response_cache().get_or_set(
+            CATALOGUE_VERSION_KEY, lambda: uuid.uuid4().hex, None
+        )
+    return memo["_catalogue_version"]
+
+
+def bump_catalogue_version():
+    _response_cache().set(CATALOGUE_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _serves_current_nav(response, state):
+    return getattr(response, "served_nav_date", None) == state.latest_nav_date
+
+
+def _digest(namespace, nav_date, request, kwargs):
+    raw = urlencode(sorted(kwargs.items()) + sorted(request.query_params.lists()), doseq=True)
+    version = catalogue_version(request)
+    return hashlib.sha1(
+        f"{namespace}:{nav_date.isoformat()}:{version}:{raw}".encode()
+    ).hexdigest()
+
+
+def _cacheable(response):
+    # Errors are also returned as 200 with a statusCode in the body by some views
+    if response.status_code != 200:
+        return False
+    data = response.data
+    return not isinstance(data, dict) or (
+        "error" not in data and data.get("statusCode", 200) == 200
+    )
+
+
+def cache_response(namespace, nav_state):
+    """
+    Cache successful responses of a view's get/retrieve method in the
+    RESPONSE_CACHE_ALIAS cache. `nav_state(request, **kwargs)` returns the
+    NavState of the data; its latest_nav_date and the catalogue_version are part
+    of the key, so entries stop being used as soon as new NAVs are ingested or
+    fund documents change. Without a NAV date the
+    request is not cached, nor is a response whose mark_served_nav_date differs
+    from it, so a stale Elasticsearch body never lands under the new key.
+
+    The X-Cache header reports HIT, MISS or BYPASS.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.query_params.get(BYPASS_PARAM) in ("1", "true"):
+                response_cache_stats.record(namespace, "bypassed")
+                response = method(view, request, *args, **kwargs)
+                response["X-Cache"] = "BYPASS"
+                return response
+
+            state = nav_state(request, **kwargs)
+            if state is None or state.latest_nav_date is None:
+                return method(view, request, *args, **kwargs)
+            cache = _response_cache()
+            key = f"response:{_digest(namespace, state.latest_nav_date, request, kwargs)}"
+            cached = cache.get(key)
+            if cached is not None:
+                response_cache_stats.record(namespace, "hits")
+                response = Response(cached, headers={"X-Cache": "HIT"})
+                return mark_served_nav_date(response, state.latest_nav_date)
+
+            response_cache_stats.record(namespace, "misses")
+            response = method(view, request, *args, **kwargs)
+            if _cacheable(response) and _serves_current_nav(response, state):
+                cache.set(key, response.data, getattr(settings, "RESPONSE_CACHE_TIMEOUT", 6 * 3600))
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def conditional_get(namespace, nav_state):
+    """
+    ETag and Last-Modified for a view's get/retrieve method via Django's
+    condition decorator, answering If-None-Match/If-Modified-Since with 304
+    before the view (and any cache, Elasticsearch or NAV lookup) runs.
+
+    The ETag hashes the endpoint, latest_nav_date, catalogue_version and request
+    parameters;
+    Last-Modified is nav_last_updated. Both describe the database, so they are
+    left off a response whose mark_served_nav_date is older (Elasticsearch not
+    yet drained); otherwise clients would revalidate stale bodies with 304
+    until the next NAV day. Apply it above cache_response.
+    """
+
+    def etag(request, *args, **kwargs):
+        state = nav_state(request, **kwargs)
+        if state is None or state.latest_nav_date is None:
+            return None
+        return _digest(namespace, state.latest_nav_date, request, kwargs)
+
+    def last_modified(request, *args, **kwargs):
+        state = nav_state(request, **kwargs)
+        return state.nav_last_updated if state is not None else None
+
+    def decorator(method):
+        conditional = method_decorator(
+            condition(etag_func=etag, last_modified_func=last_modified)
+        )(method)
+
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            response = conditional(view, request, *args, **kwargs)
+            state = nav_state(request, **kwargs)
+            if response.status_code == 200 and (
+                state is None or not _serves_current_nav(response, state)
+            ):
+                response.headers.pop("ETag", None)
+                response.headers.pop("Last-Modified", None)
+            return response
+
+        return wrapper
+
+    return decorator
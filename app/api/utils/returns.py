@@ -0,0 +1,229 @@
+# api/utils/returns.py
+import math
+from collections import defaultdict
+import numpy as np
+from api.models import FundHistoricalNAV, FundReturnsSnapshot, MutualFund
+
+RETURN_WINDOWS = [
+    ("xirr_6m", 182),
+    ("xirr_1y", 365),
+    ("xirr_3y", 1095),
+    ("xirr_5y", 1825),
+    ("xirr_10y", 3650),
+    ("xirr_all", None),
+]
+# A window starts on the first NAV found within this many days of its nominal start
+ANCHOR_SEARCH_DAYS = 31
+# Windows reported as a simple (not annualised) return
+SIMPLE_RETURN_WINDOWS = {"xirr_6m"}
+
+_WINDOW_KEYS = [key for key, _ in RETURN_WINDOWS]
+_WINDOW_DAYS = np.array([days for _, days in RETURN_WINDOWS if days is not None], dtype=np.int64)
+# Day ordinals stay far below this, so fund i's days can be shifted by i * stride
+# and the NAV series of a whole batch searched as one sorted array
+_FUND_STRIDE = 1 << 21
+
+
+def load_nav_histories(isins, since=None):
+    """
+    Read the NAV history of every ISIN in `isins` with a single query,
+    optionally only from the date `since` on.
+    Returns {isin: [(date, nav), ...]} sorted by date.
+    """
+    histories = defaultdict(list)
+    rows = FundHistoricalNAV.objects.filter(isin_growth__in=list(isins))
+    if since is not None:
+        rows = rows.filter(date__gte=since)
+    rows = (
+        rows.order_by("isin_growth", "date")
+        .values_list("isin_growth", "date", "nav")
+    )
+    for isin, nav_date, nav in rows.iterator(chunk_size=10000):
+        histories[isin].append((nav_date, nav))
+    return histories
+
+
+def nav_arrays(history):
+    """
+    (day ordinals as int64, navs as float64) arrays for (date, nav) pairs.
+    """
+    days = np.fromiter((d.toordinal() for d, _ in history), dtype=np.int64, count=len(history))
+    navs = np.fromiter((float(n) for _, n in history), dtype=np.float64, count=len(history))
+    return days, navs
+
+
+def annualised_return(start_nav, end_nav, days_held):
+    """
+    XIRR of investing `start_nav` and redeeming `end_nav` `days_held` days later,
+    in percent. With two cash flows XIRR has the closed form
+    (end / start) ** (365 / days) - 1, the same ACT/365 convention pyxirr uses.
+    Works element-wise on arrays; invalid inputs give NaN.
+    """
+    start_nav = np.asarray(start_nav, dtype=np.float64)
+    end_nav = np.asarray(end_nav, dtype=np.float64)
+    days_held = np.asarray(days_held, dtype=np.float64)
+    valid = (start_nav > 0) & (end_nav > 0) & (days_held != 0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        rate = (np.power(end_nav / start_nav, 365.0 / days_held) - 1.0) * 100
+    return np.where(valid, rate, np.nan)
+
+
+def calculate_returns_batch(items):
+    """
+    Returns for many funds in one vectorised pass.
+
+    `items` yields (key, history, latest_nav, latest_nav_date) with `history` a list
+    of (date, nav) pairs sorted by date. Every window anchor of every fund is found
+    with a single searchsorted over the concatenated series: a window starts on the
+    first NAV within ANCHOR_SEARCH_DAYS of its nominal start. 6m is a simple return,
+    longer windows are annualised.
+
+    Returns {key: {window: percent rounded to 2 places, or None}}.
+    """
+    results = {}
+    keys, day_chunks, nav_chunks, end_navs, end_days = [], [], [], [], []
+    for key, history, latest_nav, latest_nav_date in items:
+        if not history or not latest_nav or not latest_nav_date:
+            results[key] = {}
+            continue
+        days, navs = nav_arrays(history)
+        day_chunks.append(days + len(keys) * _FUND_STRIDE)
+        nav_chunks.append(navs)
+        end_navs.append(float(latest_nav))
+        end_days.append(latest_nav_date.toordinal())
+        keys.append(key)
+    if not keys:
+        return results
+
+    all_days = np.concatenate(day_chunks)
+    all_navs = np.concatenate(nav_chunks)
+    lengths = np.array([len(chunk) for chunk in day_chunks])
+    fund_start = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    fund_end = fund_start + lengths
+    base = np.arange(len(keys), dtype=np.int64)[:, None] * _FUND_STRIDE
+    end_nav = np.array(end_navs)[:, None]
+    end_day = np.array(end_days, dtype=np.int64)[:, None]
+
+    # Fixed windows: (funds, windows) matrix of nominal start days
+    window_start = end_day - _WINDOW_DAYS[None, :]
+    idx = np.searchsorted(all_days, base + window_start, side="left")
+    safe_idx = np.minimum(idx, len(all_days) - 1)
+    found = (idx < fund_end[:, None]) & (
+        all_days[safe_idx] - base <= window_start + ANCHOR_SEARCH_DAYS - 1
+    )
+    # "all" starts at each fund's first NAV
+    idx = np.hstack([safe_idx, fund_start[:, None]])
+    found = np.hstack([found, np.ones((len(keys), 1), dtype=bool)])
+
+    start_nav = all_navs[idx]
+    days_held = end_day - (all_days[idx] - base)
+    annualised = annualised_return(start_nav, end_nav, days_held)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        simple = np.where(start_nav > 0, (end_nav - start_nav) / start_nav * 100, np.nan)
+
+    for row, key in enumerate(keys):
+        returns = {}
+        for col, window in enumerate(_WINDOW_KEYS):
+            if not found[row, col]:
+                returns[window] = None
+                continue
+            value = simple[row, col] if window in SIMPLE_RETURN_WINDOWS else annualised[row, col]
+            returns[window] = round(float(value), 2) if math.isfinite(value) else None
+        results[key] = returns
+    return results
+
+
+def calculate_returns(history, latest_nav, latest_nav_date):
+    """
+    Point-to-point returns for every window in RETURN_WINDOWS, ending at
+    `latest_nav`/`latest_nav_date`. `history` is a list of (date, nav) pairs
+    sorted by date.
+    """
+    return calculate_returns_batch([(None, history, latest_nav, latest_nav_date)])[None]
+
+
+def snapshot_returns(fund):
+    """
+    Returns stored in the fund's FundReturnsSnapshot, or None when there is no
+    snapshot or it predates the fund's latest NAV. Free when the snapshot was
+    loaded with select_related("returns_snapshot"), one query otherwise.
+    """
+    try:
+        snapshot = fund.returns_snapshot
+    except FundReturnsSnapshot.DoesNotExist:
+        return None
+    if snapshot.as_of_date != fund.latest_nav_date:
+        return None
+    return snapshot.as_dict()
+
+
+def current_snapshot_returns(funds):
+    """
+    {fund.id: returns} for the funds in `funds` whose snapshot is current.
+    Snapshots not already loaded with select_related are read with one query.
+    """
+    results, unloaded = {}, {}
+    for fund in funds:
+        if MutualFund.returns_snapshot.is_cached(fund):
+            returns = snapshot_returns(fund)
+            if returns is not None:
+                results[fund.id] = returns
+        else:
+            unloaded[fund.id] = fund
+    if unloaded:
+        for snapshot in FundReturnsSnapshot.objects.filter(fund_id__in=list(unloaded)):
+            if snapshot.as_of_date == unloaded[snapshot.fund_id].latest_nav_date:
+                results[snapshot.fund_id] = snapshot.as_dict()
+    return results
+
+
+def returns_for_funds(funds):
+    """
+    {fund.id: returns} for a batch of funds: current snapshots where available,
+    computed from one history query for the rest.
+    """
+    results = current_snapshot_returns(funds)
+    missing = [f for f in funds if f.id not in results]
+    if missing:
+        histories = load_nav_histories(f.isin_growth for f in missing if f.isin_growth)
+        results.update(
+            calculate_returns_batch(
+                (f.id, histories.get(f.isin_growth), f.latest_nav, f.latest_nav_date)
+                for f in missing
+            )
+        )
+    return results
+
+
+def refresh_returns_snapshots(funds):
+    """
+    Recompute and upsert the FundReturnsSnapshot of every fund in `funds` that
+    has a latest NAV: one history query, one vectorised pass and one bulk upsert.
+    Returns the number of snapshots written.
+    """
+    # A fund listed twice would make the upsert touch the same row twice
+    funds = list(
+        {f.id: f for f in funds if f.isin_growth and f.latest_nav and f.latest_nav_date}.values()
+    )
+    if not funds:
+        return 0
+    histories = load_nav_histories(f.isin_growth for f in funds)
+    batch_returns = calculate_returns_batch(
+        (f.id, histories.get(f.isin_growth), f.latest_nav, f.latest_nav_date)
+        for f in funds
+    )
+    snapshots = [
+        FundReturnsSnapshot(
+            fund_id=f.id,
+            as_of_date=f.latest_nav_date,
+            **{field: batch_returns[f.id].get(field) for field in FundReturnsSnapshot.WINDOW_FIELDS},
+        )
+        for f in funds
+    ]
+    FundReturnsSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=["fund"],
+        update_fields=["as_of_date", *FundReturnsSnapshot.WINDOW_FIELDS, "updated_at"],
+    )
+    return len(snapshots)
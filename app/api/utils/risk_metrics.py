@@ -0,0 +1,141 @@
+# api/utils/risk_metrics.py
+import math
+from datetime import date
+import numpy as np
+from django.conf import settings
+from api.utils.returns import annualised_return, nav_arrays
+
+# Metrics cover the trailing three years of each fund's NAV history
+LOOKBACK_DAYS = 1095
+# NAVs are published on trading days only
+TRADING_DAYS_PER_YEAR = 252
+# Funds with fewer NAVs in the lookback get no metrics
+MIN_OBSERVATIONS = 30
+# Log NAVs stay far below this, so fund i's log NAVs can be shifted by i * offset
+# and running maxima of a whole batch taken in one pass
+_LOG_NAV_OFFSET = 1000.0
+
+
+def _round(value, places=2):
+    value = float(value)
+    return round(value, places) if math.isfinite(value) else None
+
+
+def _iso(ordinal):
+    return date.fromordinal(int(ordinal)).isoformat()
+
+
+def calculate_risk_metrics_batch(items, risk_free_rate=None, lookback_days=LOOKBACK_DAYS):
+    """
+    Risk metrics for many funds in one vectorised pass over their concatenated
+    NAV series.
+
+    `items` yields (key, history) with `history` a list of (date, nav) pairs sorted
+    by date; only the `lookback_days` before each fund's last NAV are used.
+    `risk_free_rate` is an annual percentage, RISK_FREE_RATE by default.
+
+    Volatility and downside deviation (below the daily risk-free rate) are
+    annualised from daily returns. Sharpe and Sortino divide the annualised return
+    over the period in excess of the risk-free rate by them. Max drawdown is the
+    largest peak-to-trough fall, with the peak, trough and recovery dates
+    (recovery is None while the NAV is still below the peak).
+
+    Returns {key: metrics}, with {} for funds with too little history.
+    """
+    if risk_free_rate is None:
+        risk_free_rate = getattr(settings, "RISK_FREE_RATE", 6.5)
+    results = {}
+    keys, day_chunks, nav_chunks = [], [], []
+    for key, history in items:
+        if not history or len(history) < MIN_OBSERVATIONS:
+            results[key] = {}
+            continue
+        days, navs = nav_arrays(history)
+        recent = days >= days[-1] - lookback_days
+        days, navs = days[recent], navs[recent]
+        if len(days) < MIN_OBSERVATIONS or (navs <= 0).any():
+            results[key] = {}
+            continue
+        keys.append(key)
+        day_chunks.append(days)
+        nav_chunks.append(navs)
+    if not keys:
+        return results
+
+    count = len(keys)
+    all_days = np.concatenate(day_chunks)
+    all_navs = np.concatenate(nav_chunks)
+    lengths = np.array([len(chunk) for chunk in day_chunks])
+    fund_start = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    fund_end = fund_start + lengths
+    fund_of = np.repeat(np.arange(count), lengths)
+
+    # Daily returns, dropping the pairs that straddle two funds
+    same_fund = fund_of[1:] == fund_of[:-1]
+    daily = (all_navs[1:] / all_navs[:-1] - 1.0)[same_fund]
+    daily_fund = fund_of[1:][same_fund]
+    n = np.bincount(daily_fund, minlength=count)
+    mean = np.bincount(daily_fund, weights=daily, minlength=count) / n
+    variance = np.bincount(
+        daily_fund, weights=(daily - mean[daily_fund]) ** 2, minlength=count
+    ) / (n - 1)
+    volatility = np.sqrt(variance * TRADING_DAYS_PER_YEAR) * 100
+    daily_risk_free = (1 + risk_free_rate / 100) ** (1 / TRADING_DAYS_PER_YEAR) - 1
+    shortfall = np.minimum(daily - daily_risk_free, 0.0)
+    downside = (
+        np.sqrt(
+            np.bincount(daily_fund, weights=shortfall**2, minlength=count)
+            / n
+            * TRADING_DAYS_PER_YEAR
+        )
+        * 100
+    )
+
+    period_return = annualised_return(
+        all_navs[fund_start],
+        all_navs[fund_end - 1],
+        all_days[fund_end - 1] - all_days[fund_start],
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = (period_return - risk_free_rate) / volatility
+        sortino = (period_return - risk_free_rate) / downside
+
+    # Drawdowns against the running peak of each fund
+    log_nav = np.log(all_navs) + fund_of * _LOG_NAV_OFFSET
+    running_peak = np.maximum.accumulate(log_nav)
+    drawdown = np.expm1(log_nav - running_peak)
+    positions = np.arange(len(log_nav))
+    last_peak = np.maximum.accumulate(np.where(log_nav == running_peak, positions, 0))
+    # Deepest point of each fund: first entry of its group when sorted by (fund, drawdown)
+    trough = np.lexsort((drawdown, fund_of))[fund_start]
+    peak = last_peak[trough]
+
+    for row, key in enumerate(keys):
+        t, p = trough[row], peak[row]
+        recovery = None
+        if drawdown[t] < 0:
+            recovered = np.flatnonzero(log_nav[t:fund_end[row]] >= running_peak[t])
+            if len(recovered):
+                recovery = _iso(all_days[t + recovered[0]])
+        results[key] = {
+            "volatility": _round(volatility[row]),
+            "downside_deviation": _round(downside[row]),
+            "annualised_return": _round(period_return[row]),
+            "sharpe_ratio": _round(sharpe[row], 3),
+            "sortino_ratio": _round(sortino[row], 3),
+            "max_drawdown": _round(drawdown[t] * 100),
+            "max_drawdown_peak_date": _iso(all_days[p]),
+            "max_drawdown_trough_date": _iso(all_days[t]),
+            "max_drawdown_recovery_date": recovery,
+            "risk_free_rate": risk_free_rate,
+            "period_start": _iso(all_days[fund_start[row]]),
+            "period_end": _iso(all_days[fund_end[row] - 1]),
+        }
+    return results
+
+
+def calculate_risk_metrics(history, risk_free_rate=None):
+    """
+    Risk metrics of a single NAV history; see calculate_risk_metrics_batch.
+    """
+    return calculate_risk_metrics_batch([(None, history)], risk_free_rate)[None]
@@ -0,0 +1,110 @@
+# api/utils/rolling_returns.py
+import re
+from datetime import date
+import numpy as np
+from api.utils.returns import ANCHOR_SEARCH_DAYS, annualised_return, nav_arrays
+
+PERIOD_UNITS = {"d": 1, "w": 7, "m": 365 / 12, "y": 365}
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+DEFAULT_THRESHOLDS = [0.0, 5.0, 10.0, 15.0]
+_PERIOD_RE = re.compile(r"^(\d+)([dwmy])$")
+
+
+def parse_period(value):
+    """
+    Number of days in a period such as "3y", "6m", "2w" or "1d".
+    Months are a twelfth of a year, so "6m" is 182 days like the 6m return window.
+    Raises ValueError for anything else.
+    """
+    match = _PERIOD_RE.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid period '{value}'. Use a number followed by d, w, m or y.")
+    return int(int(match.group(1)) * PERIOD_UNITS[match.group(2)])
+
+
+def rolling_returns(history, window_days, step_days=1):
+    """
+    Return of every `window_days` holding period in `history`, a list of
+    (date, nav) pairs sorted by date, with start dates `step_days` apart.
+
+    All periods are found with two searchsorted calls: a period starts on the
+    first NAV at or after each step of the calendar grid and ends on the last NAV
+    at or before start + window, which must lie within ANCHOR_SEARCH_DAYS of it
+    and not after the last NAV.
+    Periods of a year or longer are annualised (CAGR), shorter ones are simple
+    returns, as in RETURN_WINDOWS.
+
+    Returns (start ordinals, end ordinals, returns in percent) as arrays.
+    """
+    empty = np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+    if len(history) < 2:
+        return empty
+    days, navs = nav_arrays(history)
+    grid = np.arange(days[0], days[-1] - window_days + 1, step_days, dtype=np.int64)
+    # Grid days falling on holidays map to the next NAV; keep each start once
+    start = np.unique(np.searchsorted(days, grid, side="left"))
+    target = days[start] + window_days
+    end = np.searchsorted(days, target, side="right") - 1
+    # Periods still running at the last NAV are incomplete
+    valid = (end > start) & (target <= days[-1]) & (target - days[end] < ANCHOR_SEARCH_DAYS)
+    start, end = start[valid], end[valid]
+    if not len(start):
+        return empty
+
+    if window_days >= 365:
+        values = annualised_return(navs[start], navs[end], days[end] - days[start])
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = (navs[end] - navs[start]) / navs[start] * 100
+    finite = np.isfinite(values)
+    return days[start][finite], days[end][finite], values[finite]
+
+
+def summarise_rolling_returns(starts, ends, values, thresholds=None, points=0):
+    """
+    Distribution of rolling returns: count, min and max (with their start dates),
+    mean, percentiles and the share of periods above each threshold in percent.
+    With `points`, also a series of at most that many evenly spaced periods.
+    """
+    thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+    summary = {
+        "count": int(len(values)),
+        "min": None,
+        "max": None,
+        "mean": None,
+        "percentiles": {},
+        "above": {},
+    }
+    if len(values):
+        lowest, highest = int(np.argmin(values)), int(np.argmax(values))
+        summary.update(
+            {
+                "min": {
+                    "return": round(float(values[lowest]), 2),
+                    "start_date": date.fromordinal(int(starts[lowest])).isoformat(),
+                },
+                "max": {
+                    "return": round(float(values[highest]), 2),
+                    "start_date": date.fromordinal(int(starts[highest])).isoformat(),
+                },
+                "mean": round(float(values.mean()), 2),
+                "percentiles": {
+                    f"p{p}": round(float(v), 2)
+                    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+                },
+                "above": {
+                    f"{t:g}": round(float((values > t).mean() * 100), 2) for t in thresholds
+                },
+            }
+        )
+    if points:
+        picked = np.unique(np.linspace(0, len(values) - 1, min(points, len(values))).astype(int))
+        summary["series"] = [
+            {
+                "start_date": date.fromordinal(int(starts[i])).isoformat(),
+                "end_date": date.fromordinal(int(ends[i])).isoformat(),
+                "return": round(float(values[i]), 2),
+            }
+            for i in picked
+        ]
+    return summary
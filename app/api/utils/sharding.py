@@ -0,0 +1,116 @@
+# api/utils/sharding.py
+import argparse
+import subprocess
+import sys
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Mod
+
+# Options that describe the launcher itself and are never forwarded to workers
+LAUNCHER_OPTIONS = {"processes", "shard", "help", "version"}
+
+
+def parse_shard(value):
+    """
+    argparse type for '--shard i/N': returns (i, N) with 0 <= i < N.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Shard must look like i/N, e.g. 0/4.")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("Shard index must satisfy 0 <= i < N.")
+    return index, count
+
+
+def shard_queryset(queryset, shard):
+    """
+    Restrict `queryset` to the rows whose id falls into `shard` = (i, N).
+    Every row belongs to exactly one of the N shards.
+    """
+    if shard is None:
+        return queryset
+    index, count = shard
+    if count == 1:
+        return queryset
+    return queryset.annotate(_shard=Mod(F("id"), count)).filter(_shard=index)
+
+
+def shard_job_name(job_name, shard):
+    """
+    Name under which a shard records its JobRun, so each shard resumes on its own.
+    """
+    if shard is None:
+        return job_name
+    return f"{job_name}[{shard[0]}/{shard[1]}]"
+
+
+def add_shard_arguments(parser):
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="i/N",
+        help="Only process funds whose id modulo N equals i (0-based).",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Launch N worker processes, one per shard, each with its own DB and ES connections.",
+    )
+
+
+def _forwarded_argv(parser, options):
+    """
+    Rebuild command-line arguments for a worker from the parsed options,
+    so the launcher works the same from manage.py and from call_command.
+    """
+    argv = []
+    for action in parser._actions:
+        if not action.option_strings or action.dest in LAUNCHER_OPTIONS:
+            continue
+        value = options.get(action.dest, action.default)
+        if value == action.default or value is None:
+            continue
+        flag = action.option_strings[-1]
+        if isinstance(action, argparse._StoreTrueAction):
+            argv.append(flag)
+        elif isinstance(action, argparse._StoreFalseAction):
+            continue
+        else:
+            argv.append(f"{flag}={value}")
+    return argv
+
+
+def launch_shard_workers(command, processes, options, stdout, stderr):
+    """
+    Run `command` in `processes` child processes with --shard 0/N .. N-1/N and wait
+    for all of them. Returns the number of workers that exited with an error.
+    """
+    command_name = command.__module__.rsplit(".", 1)[-1]
+    parser = command.create_parser("manage.py", command_name)
+    argv = _forwarded_argv(parser, options)
+    manage_py = str(settings.BASE_DIR / "manage.py")
+    workers = []
+    for index in range(processes):
+        cmd = [
+            sys.executable,
+            manage_py,
+            command_name,
+            *argv,
+            f"--shard={index}/{processes}",
+        ]
+        stdout.write(f"Starting shard {index}/{processes}: {' '.join(cmd[2:])}")
+        workers.append((index, subprocess.Popen(cmd)))
+
+    failures = 0
+    for index, proc in workers:
+        code = proc.wait()
+        if code != 0:
+            failures += 1
+            stderr.write(f"Shard {index}/{processes} exited with code {code}.")
+    stdout.write(
+        f"{processes - failures}/{processes} shard worker(s) finished successfully."
+    )
+    return failures
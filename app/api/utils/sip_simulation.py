@@ -0,0 +1,214 @@
+# api/utils/sip_simulation.py
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from api.utils.xirr import xirr
+
+# Purchases of one simulated investment, oldest first: NAV dates, NAVs,
+# amounts and units bought, as Decimals like the rest of the money maths
+Simulation = namedtuple("Simulation", ["dates", "navs", "amounts", "units"])
+# One what-if: "sip" or "lumpsum" from start_date, invested up to end_date
+Scenario = namedtuple("Scenario", ["type", "start_date", "end_date", "amount", "stepup"])
+
+
+class NavSeries:
+    """
+    A fund's NAV series held as aligned arrays: day ordinals (int64) for
+    lookups and Decimal NAVs (object array) so amounts stay exact.
+    """
+
+    def __init__(self, points):
+        """
+        `points` is a list of (date, Decimal nav) pairs sorted by date.
+        """
+        self.dates = [d for d, _ in points]
+        self.days = np.fromiter(
+            (d.toordinal() for d in self.dates), dtype=np.int64, count=len(points)
+        )
+        self.navs = np.empty(len(points), dtype=object)
+        self.navs[:] = [nav for _, nav in points]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def first_on_or_after(self, ordinals):
+        """
+        Index of the first NAV on or after each of the day `ordinals`, in one
+        searchsorted. len(self) marks days after the last NAV.
+        """
+        return np.searchsorted(self.days, ordinals, side="left")
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def sip_schedule(start_date, end_date, amount, stepup=Decimal("0")):
+    """
+    Monthly SIP instalments from `start_date` to `end_date` on the start date's
+    day of month (the month's last day when it is shorter), as day ordinals
+    (int64) and the Decimal amount of each. With `stepup` (percent) the amount
+    rises every January, rounded to paise.
+    """
+    if end_date < start_date:
+        return np.array([], dtype=np.int64), np.array([], dtype=object)
+    first_month = start_date.year * 12 + start_date.month - 1
+    count = end_date.year * 12 + end_date.month - 1 - first_month + 1
+    months = np.arange(first_month, first_month + count) - 1970 * 12
+    month_start = months.astype("datetime64[M]").astype("datetime64[D]")
+    next_month_start = (months + 1).astype("datetime64[M]").astype("datetime64[D]")
+    month_days = (next_month_start - month_start).astype(np.int64)
+    day = np.minimum(start_date.day, month_days)
+    ordinals = month_start.astype(np.int64) + day - 1 + _EPOCH_ORDINAL
+    keep = ordinals <= end_date.toordinal()
+    ordinals = ordinals[keep]
+
+    # One amount per calendar year, compounded with the same rounding as before
+    years = (months[keep] + 1970 * 12) // 12 - start_date.year
+    yearly = [amount]
+    for _ in range(int(years[-1]) if len(years) else 0):
+        step = yearly[-1]
+        if stepup:
+            step += round(step * (stepup / 100), 2)
+        yearly.append(step)
+    yearly_amounts = np.empty(len(yearly), dtype=object)
+    yearly_amounts[:] = yearly
+    return ordinals, yearly_amounts[years]
+
+
+def _buy(series, idx, amounts):
+    """
+    Simulation of buying `amounts` at the NAVs at `idx`; instalments whose index
+    is past the last NAV are skipped.
+    """
+    found = idx < len(series)
+    idx, amounts = idx[found], amounts[found]
+    navs = series.navs[idx]
+    return Simulation(
+        dates=[series.dates[i] for i in idx],
+        navs=navs.tolist(),
+        amounts=amounts.tolist(),
+        units=(amounts / navs).tolist(),
+    )
+
+
+def simulate_lumpsum(series, amount):
+    """
+    Invest `amount` at the first NAV of `series`.
+    """
+    if not len(series):
+        return Simulation([], [], [], [])
+    amounts = np.empty(1, dtype=object)
+    amounts[0] = amount
+    return _buy(series, np.array([0]), amounts)
+
+
+def simulate_sip(series, start_date, end_date, amount, stepup=Decimal("0")):
+    """
+    Monthly SIP from `start_date` to `end_date`: each instalment buys at the
+    first NAV on or after its date, all found with one searchsorted.
+    """
+    ordinals, amounts = sip_schedule(start_date, end_date, amount, stepup)
+    return _buy(series, series.first_on_or_after(ordinals), amounts)
+
+
+def simulate_scenarios(series, scenarios):
+    """
+    Simulations of many scenarios on one NAV series in a single pass: the
+    instalments of every scenario are concatenated, matched to their NAVs with
+    one searchsorted and converted to units with one array division. Purchases
+    that would fall after a scenario's end_date are dropped.
+    """
+    ordinal_chunks, amount_chunks, end_chunks = [], [], []
+    for scenario in scenarios:
+        if scenario.type == "sip":
+            ordinals, amounts = sip_schedule(
+                scenario.start_date, scenario.end_date, scenario.amount, scenario.stepup
+            )
+        else:
+            ordinals = np.array([scenario.start_date.toordinal()], dtype=np.int64)
+            amounts = np.empty(1, dtype=object)
+            amounts[0] = scenario.amount
+        ordinal_chunks.append(ordinals)
+        amount_chunks.append(amounts)
+        end_chunks.append(np.full(len(ordinals), scenario.end_date.toordinal(), dtype=np.int64))
+    if not len(series):
+        return [Simulation([], [], [], []) for _ in scenarios]
+    if not scenarios:
+        return []
+
+    idx = series.first_on_or_after(np.concatenate(ordinal_chunks))
+    amounts = np.concatenate(amount_chunks)
+    safe_idx = np.minimum(idx, max(len(series) - 1, 0))
+    found = (idx < len(series)) & (series.days[safe_idx] <= np.concatenate(end_chunks))
+    units = np.empty(len(idx), dtype=object)
+    if found.any():
+        units[found] = amounts[found] / series.navs[idx[found]]
+
+    simulations = []
+    offsets = np.cumsum([0] + [len(chunk) for chunk in ordinal_chunks])
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        bought = np.flatnonzero(found[start:end]) + start
+        simulations.append(
+            Simulation(
+                dates=[series.dates[i] for i in idx[bought]],
+                navs=series.navs[idx[bought]].tolist(),
+                amounts=amounts[bought].tolist(),
+                units=units[bought].tolist(),
+            )
+        )
+    return simulations
+
+
+def monthly_growth(simulation):
+    """
+    Invested amount, corpus, profit and units after every instalment, from
+    cumulative sums over the purchases.
+    """
+    if not simulation.dates:
+        return []
+    total_units = np.cumsum(np.array(simulation.units, dtype=object))
+    invested = np.cumsum(np.array(simulation.amounts, dtype=object))
+    corpus = total_units * np.array(simulation.navs, dtype=object)
+    profit = corpus - invested
+    return [
+        {
+            "date": nav_date,
+            "invested": round(float(invested_i), 2),
+            "corpus": round(float(corpus_i), 2),
+            "profit": round(float(profit_i), 2),
+            "units": round(float(units_i), 4),
+            "sip_amount": round(float(amount_i), 2),
+            "abs_return_pct": (
+                round(float(profit_i / invested_i * 100), 2) if invested_i else None
+            ),
+        }
+        for nav_date, invested_i, corpus_i, profit_i, units_i, amount_i in zip(
+            simulation.dates,
+            invested.tolist(),
+            corpus.tolist(),
+            profit.tolist(),
+            total_units.tolist(),
+            simulation.amounts,
+        )
+    ]
+
+
+def valuation(simulation, latest_nav, redemption_date):
+    """
+    Value of the simulated holding at `latest_nav` on `redemption_date`:
+    invested amount, corpus, profit, absolute return and XIRR.
+    """
+    units = sum(simulation.units, Decimal("0"))
+    invested = sum(simulation.amounts, Decimal("0"))
+    corpus = units * Decimal(latest_nav)
+    profit = corpus - invested
+    cashflows = [-a for a in simulation.amounts] + [corpus]
+    return {
+        "units": units,
+        "invested": invested,
+        "corpus": corpus,
+        "profit": profit,
+        "absolute_return": float(profit / invested * 100) if invested else None,
+        "xirr": xirr(cashflows, simulation.dates + [redemption_date]),
+    }
@@ -6,7 +6,8 @@ from collections import defaultdict
 from typing import Optional
 from django.db.models import Q
 
-from api.models import MutualFund, FundHistoricalNAV, MFHolding, Account
+from api.models import MutualFund, MFHolding, Account
+from api.utils.nav_store import nav_store
 
 SUPPORTED_ORDER_TYPES = {"buy": MFHolding.TYPE_BUY, "sell": MFHolding.TYPE_SELL}
 
@@ -36,16 +37,14 @@ def parse_date_safe(date_str):
 
 
 def validate_nav(fund, nav_date, nav_val, tolerance=0.1):
-    nav_record = FundHistoricalNAV.objects.filter(
-        isin_growth=fund.isin_growth, date=nav_date
-    ).first()
-    if not nav_record:
+    nav = nav_store.nav_on(fund.isin_growth, nav_date, latest_nav_date=fund.latest_nav_date)
+    if nav is None:
         return (
             False,
             f"No historical NAV for {fund.kuvera_name or fund.mf_name} on {nav_date}",
         )
     try:
-        nav_db_val = float(nav_record.nav)
+        nav_db_val = float(nav)
         if abs(nav_db_val - nav_val) > tolerance:
             return (
                 False,
@@ -0,0 +1,23 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny
+from api.utils.nav_store import nav_store
+from api.utils.response_cache import response_cache_stats
+
+
+class CacheHealthView(APIView):
+    """
+    Hit/miss counters of the response cache and the NAV series cache of this
+    process, for monitoring.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response(
+            {
+                "responses": response_cache_stats.snapshot(),
+                "nav_series": nav_store.snapshot(),
+            }
+        )
@@ -0,0 +1,17 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny
+from api.utils.es_client import es_breaker
+
+
+class EsHealthView(APIView):
+    """
+    State of the Elasticsearch circuit breaker used by the public endpoints,
+    for monitoring. Does not contact Elasticsearch.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response(es_breaker.snapshot())
@@ -1,6 +1,7 @@
-import requests
+import logging
 import random
 from datetime import date, timedelta
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import (
@@ -8,6 +9,7 @@ from rest_framework.permissions import (
 )  # restrict to admin, change as needed
 
 from api.models import MutualFund
+from api.utils.http_client import get_http_client
 
 FUND_TYPE_CHOICES = ["Debt", "Equity", "Hybrid", "Others"]
 
@@ -17,9 +19,14 @@ class FetchMutualFundsView(APIView):
 
     def post(self, request):
         # Fetch schemes
-        url = "https://api.mfapi.in/mf"
-        api_response = requests.get(url)
+        logger = logging.getLogger(__name__)
+        base_url = getattr(settings, "MFAPI_BASE_URL", "https://api.mfapi.in")
+        http = get_http_client()
+        # The client is shared, so report only this request's traffic
+        stats_before = http.snapshot()
+        api_response = http.get(f"{base_url}/mf", timeout=30)
         funds = api_response.json()
+        logger.info(http.summary(since=stats_before))
         total_funds = len(funds)
 
         # Date gap calculation
@@ -0,0 +1,117 @@
+from collections import defaultdict
+import numpy as np
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny
+from rest_framework import status
+from api.models import MutualFund
+from api.serializers.scenario_serializer import ScenarioBatchSerializer
+from api.utils.nav_store import nav_store
+from api.utils.sip_simulation import (
+    NavSeries,
+    Scenario,
+    monthly_growth,
+    simulate_scenarios,
+    valuation,
+)
+
+
+class HistoricalScenariosView(APIView):
+    """
+    Evaluates many SIP/lumpsum what-ifs in one request, e.g. every position of
+    an amount or start-date slider:
+
+        POST /api/historical-profit/scenarios/
+        {"scenarios": [{"isin": "...", "type": "sip", "start_date": "2015-01-01",
+                        "amount": 5000, "stepup": 10, "end_date": "2020-12-31"}, ...],
+         "include_growth": false}
+
+    The funds are read with one query and their NAV histories together from the
+    NAV series store, and all scenarios of a fund are simulated together. Results come back in request
+    order; without end_date a scenario is valued at the fund's latest NAV.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        serializer = ScenarioBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        scenarios = serializer.validated_data["scenarios"]
+        include_growth = serializer.validated_data["include_growth"]
+
+        positions = defaultdict(list)
+        for position, scenario in enumerate(scenarios):
+            positions[scenario["isin"]].append(position)
+        funds = {
+            fund.isin_growth: fund
+            for fund in MutualFund.objects.filter(isin_growth__in=list(positions))
+        }
+        histories = nav_store.get_series_bulk(
+            {isin: fund.latest_nav_date for isin, fund in funds.items()},
+            start=min(s["start_date"] for s in scenarios),
+        )
+
+        results = [None] * len(scenarios)
+        for isin, fund_positions in positions.items():
+            fund = funds.get(isin)
+            if fund is None or not fund.latest_nav or not fund.latest_nav_date:
+                for position in fund_positions:
+                    results[position] = {
+                        "index": position,
+                        "isin": isin,
+                        "error": "Fund or its latest NAV not found.",
+                    }
+                continue
+
+            series = NavSeries(histories.get(isin, []))
+            batch = [
+                Scenario(
+                    type=scenarios[p]["type"],
+                    start_date=scenarios[p]["start_date"],
+                    end_date=min(
+                        scenarios[p]["end_date"] or fund.latest_nav_date,
+                        fund.latest_nav_date,
+                    ),
+                    amount=scenarios[p]["amount"],
+                    stepup=scenarios[p]["stepup"],
+                )
+                for p in fund_positions
+            ]
+            for position, scenario, simulation in zip(
+                fund_positions, batch, simulate_scenarios(series, batch)
+            ):
+                results[position] = self._result(
+                    position, isin, fund, series, scenario, simulation, include_growth
+                )
+        return Response({"results": results})
+
+    def _result(self, position, isin, fund, series, scenario, simulation, include_growth):
+        redemption_date, redemption_nav = fund.latest_nav_date, fund.latest_nav
+        if scenario.end_date < fund.latest_nav_date and len(series):
+            # Value at the last NAV on or before end_date
+            last = np.searchsorted(series.days, scenario.end_date.toordinal(), side="right") - 1
+            if last >= 0:
+                redemption_date, redemption_nav = series.dates[last], series.navs[last]
+        value = valuation(simulation, redemption_nav, redemption_date)
+        result = {
+            "index": position,
+            "isin": isin,
+            "type": scenario.type,
+            "start_date": scenario.start_date,
+            "end_date": redemption_date,
+            "instalments": len(simulation.dates),
+            "amount_invested": round(float(value["invested"]), 2),
+            "corpus": round(float(value["corpus"]), 2),
+            "profit": round(float(value["profit"]), 2),
+            "absolute_return": (
+                round(value["absolute_return"], 2)
+                if value["absolute_return"] is not None
+                else None
+            ),
+            "xirr": value["xirr"] if simulation.dates else None,
+        }
+        if include_growth:
+            result["monthly_growth"] = monthly_growth(simulation)
+        return result
@@ -83,7 +83,7 @@ class MFHoldingViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, viewsets.
     def list(self, request, *args, **kwargs):
         fund_id = self.request.query_params.get("fund")
         account_id = self.request.query_params.get("account")
-        base_qs = MFHolding.objects.filter(user=self.request.user).select_related("fund").order_by("fund", "transacted_at", "id")
+        base_qs = MFHolding.objects.filter(user=self.request.user).select_related("fund", "fund__returns_snapshot").order_by("fund", "transacted_at", "id")
         if fund_id:
             base_qs = base_qs.filter(fund_id=fund_id)
         if account_id:
@@ -3,12 +3,27 @@ from rest_framework.response import Response
 from api.models import MutualFund
 from api.serializers.mutual_fund_detail_serializer import MutualFundDetailSerializer
 from rest_framework.permissions import AllowAny
-from django.conf import settings
-from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch import NotFoundError
+from api.utils.es_client import es_guard, get_es_client
+from api.utils.nav_store import nav_store
+from api.utils.response_cache import (
+    cache_response,
+    conditional_get,
+    fund_nav_state,
+    mark_served_nav_date,
+)
+from api.utils.risk_metrics import LOOKBACK_DAYS, calculate_risk_metrics
+from datetime import timedelta
 import logging
 from api.config.es_config import MUTUALFUND_INDEX_NAME
 
 
+def _nav_state(request, isin_growth=None, mf_scheme_code=None):
+    if isin_growth:
+        return fund_nav_state(request, isin_growth=isin_growth)
+    return fund_nav_state(request, mf_schema_code=mf_scheme_code)
+
+
 class MutualFundDetailView(RetrieveAPIView):
     authentication_classes = []  # Disable authentication
     permission_classes = [AllowAny]  # Allow any user (even unauthenticated)
@@ -16,7 +31,7 @@ class MutualFundDetailView(RetrieveAPIView):
     lookup_field = "isin_growth"
 
     def get_queryset(self):
-        return MutualFund.objects.all()
+        return MutualFund.objects.select_related("returns_snapshot")
 
     def get_object(self):
         qs = self.get_queryset()
@@ -28,10 +43,11 @@ class MutualFundDetailView(RetrieveAPIView):
             return qs.get(mf_schema_code=mf_scheme_code)
         raise Exception("Must provide isin_growth or mf_scheme_code")
 
+    @conditional_get("mutualfund-detail", _nav_state)
+    @cache_response("mutualfund-detail", _nav_state)
     def retrieve(self, request, *args, **kwargs):
-        es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200")
         index_name = MUTUALFUND_INDEX_NAME
-        es = Elasticsearch(es_host)
+        es = get_es_client()
 
         # Set up logging
         logger = logging.getLogger(__name__)
@@ -41,19 +57,22 @@ class MutualFundDetailView(RetrieveAPIView):
 
         # Attempt to fetch from Elasticsearch
         try:
-            if isin:
-                doc = es.get(index=index_name, id=isin)
-            elif mf_scheme_code:
-                # If mf_scheme_code is provided, search by it
-                query = {"query": {"term": {"mf_schema_code": mf_scheme_code}}}
-                search_result = es.search(index=index_name, body=query)
-                if search_result["hits"]["total"]["value"] > 0:
-                    doc = search_result["hits"]["hits"][0]
-                else:
-                    raise NotFoundError
+            with es_guard():
+                if isin:
+                    doc = es.get(index=index_name, id=isin)
+                elif mf_scheme_code:
+                    # If mf_scheme_code is provided, search by it
+                    query = {"query": {"term": {"mf_schema_code": mf_scheme_code}}}
+                    search_result = es.search(index=index_name, body=query)
+                    if search_result["hits"]["total"]["value"] > 0:
+                        doc = search_result["hits"]["hits"][0]
+                    else:
+                        raise NotFoundError
 
             # Return the Elasticsearch document
-            return Response(doc["_source"])
+            return mark_served_nav_date(
+                Response(doc["_source"]), doc["_source"].get("latest_nav_date")
+            )
 
         except:
             # Fallback to database if not found in Elasticsearch
@@ -62,4 +81,20 @@ class MutualFundDetailView(RetrieveAPIView):
             )
             obj = self.get_object()
             serializer = self.get_serializer(obj)
-            return Response(serializer.data)
+            return mark_served_nav_date(
+                Response({**serializer.data, "risk_metrics": self._risk_metrics(obj)}),
+                obj.latest_nav_date,
+            )
+
+    def _risk_metrics(self, obj):
+        """
+        Risk metrics computed from the database, as stored in the fund index by
+        sync_historical_data_es.
+        """
+        if not obj.isin_growth or not obj.latest_nav_date:
+            return None
+        since = obj.latest_nav_date - timedelta(days=LOOKBACK_DAYS)
+        history = nav_store.get_series(
+            obj.isin_growth, since, latest_nav_date=obj.latest_nav_date
+        )
+        return calculate_risk_metrics(history) or None
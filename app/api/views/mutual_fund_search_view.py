@@ -6,8 +6,14 @@ from django.db.models import Q
 from rest_framework.permissions import AllowAny
 from api.mixins import PaginationMixin
 from api.pagination import StandardResultsSetPagination
-from django.conf import settings
-from elasticsearch import Elasticsearch, NotFoundError, ConnectionError
+from elasticsearch import NotFoundError, ConnectionError
+from api.utils.es_client import es_guard, get_es_client
+from api.utils.response_cache import (
+    cache_response,
+    catalogue_nav_state,
+    conditional_get,
+    mark_served_nav_date,
+)
 from api.config.es_config import MUTUALFUND_INDEX_NAME
 import traceback
 import logging
@@ -18,6 +24,8 @@ class MutualFundSearchView(PaginationMixin, APIView):
     permission_classes = [AllowAny]  # Allow any user (even unauthenticated)
     pagination_class = StandardResultsSetPagination
 
+    @conditional_get("mutualfund-search", catalogue_nav_state)
+    @cache_response("mutualfund-search", catalogue_nav_state)
     def get(self, request):
         # Set up logging
         logger = logging.getLogger(__name__)
@@ -27,8 +35,7 @@ class MutualFundSearchView(PaginationMixin, APIView):
             return Response(
                 {"error": "Query must be at least 3 characters long."}, status=400
             )
-        es_host = getattr(settings, "ELASTICSEARCH_HOST", "http://elasticsearch:9200")
-        es = Elasticsearch(es_host)
+        es = get_es_client()
 
         try:
             # Get pagination parameters for Elasticsearch
@@ -65,7 +72,8 @@ class MutualFundSearchView(PaginationMixin, APIView):
                     {"term": {"mf_schema_code": int(query)}}
                 )
 
-            es_response = es.search(index=MUTUALFUND_INDEX_NAME, body=es_query)
+            with es_guard():
+                es_response = es.search(index=MUTUALFUND_INDEX_NAME, body=es_query)
 
             print(f"Elasticsearch query: {es_query}")  # Debugging output
             print(f"Elasticsearch response: {es_response}")  # Debugging output
@@ -83,7 +91,7 @@ class MutualFundSearchView(PaginationMixin, APIView):
                 grouped.setdefault(fund_type, []).append(fund)
 
             # Return the paginated response with grouped results
-            return Response(
+            response = Response(
                 {
                     "count": paginated_data["count"],
                     "current_count": paginated_data["current_count"],
@@ -92,6 +100,9 @@ class MutualFundSearchView(PaginationMixin, APIView):
                     "results": grouped,
                 }
             )
+            return mark_served_nav_date(
+                response, catalogue_nav_state(request).latest_nav_date
+            )
 
         except (NotFoundError, ConnectionError, Exception) as e:
             logger.warning(
@@ -127,4 +138,7 @@ class MutualFundSearchView(PaginationMixin, APIView):
                 }
                 grouped.setdefault(fund_type, []).append(mapped)
 
-            return self.get_paginated_response(grouped)
+            return mark_served_nav_date(
+                self.get_paginated_response(grouped),
+                catalogue_nav_state(request).latest_nav_date,
+            )
@@ -0,0 +1,68 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny
+from rest_framework import status
+from api.models import MutualFund
+from api.utils.nav_store import nav_store
+from api.utils.rolling_returns import (
+    DEFAULT_THRESHOLDS,
+    parse_period,
+    rolling_returns,
+    summarise_rolling_returns,
+)
+
+# Upper bound for the optional downsampled series
+MAX_SERIES_POINTS = 1000
+
+
+class RollingReturnsView(APIView):
+    """
+    Distribution of the rolling returns of a fund over its stored NAV history.
+
+    GET /api/mutualfund/<isin>/rolling-returns/?window=3y&step=1d
+    Optional: thresholds=0,8,12 (percent) and points=N for a downsampled series.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, isin_growth):
+        params = request.query_params
+        try:
+            window_days = parse_period(params.get("window", "3y"))
+            step_days = parse_period(params.get("step", "1d"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            thresholds = (
+                [float(t) for t in params["thresholds"].split(",") if t.strip()]
+                if params.get("thresholds")
+                else DEFAULT_THRESHOLDS
+            )
+            points = int(params.get("points", 0))
+        except ValueError:
+            return Response(
+                {"error": "thresholds must be comma-separated numbers and points an integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 0 <= points <= MAX_SERIES_POINTS:
+            return Response(
+                {"error": f"points must be between 0 and {MAX_SERIES_POINTS}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fund = MutualFund.objects.filter(isin_growth=isin_growth).only("latest_nav_date").first()
+        if fund is None:
+            return Response({"error": "Fund not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        history = nav_store.get_series(isin_growth, latest_nav_date=fund.latest_nav_date)
+        starts, ends, values = rolling_returns(history, window_days, step_days)
+        return Response(
+            {
+                "isin": isin_growth,
+                "window": params.get("window", "3y"),
+                "step": params.get("step", "1d"),
+                "annualised": window_days >= 365,
+                **summarise_rolling_returns(starts, ends, values, thresholds, points),
+            }
+        )
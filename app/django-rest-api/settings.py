@@ -154,6 +154,38 @@ EMAIL_HOST = "mailhog"  # or 'localhost' if running MailHog outside Docker
 EMAIL_PORT = 1025
 DEFAULT_FROM_EMAIL = "no-reply@example.com"
 ELASTICSEARCH_HOST = "http://elasticsearch:9200"
+# Shared Elasticsearch client used while serving requests (api/utils/es_client.py)
+ES_REQUEST_TIMEOUT = float(environ.get("ES_REQUEST_TIMEOUT", 5))
+ES_MAX_RETRIES = int(environ.get("ES_MAX_RETRIES", 1))
+ES_CONNECTIONS_PER_NODE = int(environ.get("ES_CONNECTIONS_PER_NODE", 10))
+# Skip Elasticsearch for ES_BREAKER_COOLDOWN seconds after this many consecutive failures
+ES_BREAKER_FAILURE_THRESHOLD = int(environ.get("ES_BREAKER_FAILURE_THRESHOLD", 3))
+ES_BREAKER_COOLDOWN = float(environ.get("ES_BREAKER_COOLDOWN", 30))
+# Annual risk-free rate in percent used for Sharpe and Sortino ratios (api/utils/risk_metrics.py)
+RISK_FREE_RATE = float(environ.get("RISK_FREE_RATE", 6.5))
+# Memory bound of the per-process NAV history cache (api/utils/nav_store.py)
+NAV_STORE_MAX_BYTES = int(environ.get("NAV_STORE_MAX_BYTES", 64 * 1024 * 1024))
+# Per-process memory cache by default; point CACHE_BACKEND/CACHE_LOCATION at a
+# shared backend (e.g. django.core.cache.backends.redis.RedisCache) in production
+CACHES = {
+    "default": {
+        "BACKEND": environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": environ.get("CACHE_LOCATION", "mf-api"),
+    }
+}
+# Cached public fund responses (api/utils/response_cache.py); keys carry the NAV date
+# and a catalogue version bumped by fund saves and drain_es_outbox, so use a cache
+# shared by the web and worker processes (e.g. Redis) in production
+RESPONSE_CACHE_ALIAS = environ.get("RESPONSE_CACHE_ALIAS", "default")
+RESPONSE_CACHE_TIMEOUT = int(environ.get("RESPONSE_CACHE_TIMEOUT", 6 * 3600))
+MFAPI_BASE_URL = environ.get("MFAPI_BASE_URL", "https://api.mfapi.in")
+KUVERA_BASE_URL = environ.get("KUVERA_BASE_URL", "https://mf.captnemo.in")
+AMFI_NAVALL_URL = environ.get(
+    "AMFI_NAVALL_URL", "https://www.amfiindia.com/spages/NAVAll.txt"
+)
+# Shared HTTP client used by the external-data commands (api/utils/http_client.py)
+HTTP_CACHE_DIR = environ.get("HTTP_CACHE_DIR", BASE_DIR / ".http_cache")
+HTTP_MAX_CONNECTIONS_PER_HOST = int(environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", 8))
 
 LOGGING = {
     "version": 1,